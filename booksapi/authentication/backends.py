@@ -0,0 +1,177 @@
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+
+class UserCache:
+    """
+    Two-level cache of User rows keyed by id: a small per-process LRU with a
+    short TTL, in front of the shared Django cache.
+
+    Only the FIELDS that authorization needs are cached, never the password
+    hash. Hits are rebuilt as deferred User instances: any other field is
+    loaded from the database on first access, and save() writes only the
+    loaded fields.
+
+    Invalidation clears the shared entry and this process's LRU. Other
+    processes may keep serving their local copy for up to local_ttl seconds.
+    QuerySet.update() sends no signal, so call invalidate() after it or the
+    old row is served for up to shared_ttl seconds.
+    """
+    FIELDS = ('id', 'username', 'is_active', 'is_staff', 'is_superuser')
+
+    def __init__(self, maxsize=1024, local_ttl=5, shared_ttl=60):
+        self.maxsize = maxsize
+        self.local_ttl = local_ttl
+        self.shared_ttl = shared_ttl
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(user_id):
+        return f'auth:user:{user_id}'
+
+    def _get_local(self, user_id):
+        with self._lock:
+            entry = self._local.get(user_id)
+            if entry is None:
+                return None
+            values, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._local[user_id]
+                return None
+            self._local.move_to_end(user_id)
+            return values
+
+    def _set_local(self, user_id, values):
+        with self._lock:
+            self._local[user_id] = (values, time.monotonic() + self.local_ttl)
+            self._local.move_to_end(user_id)
+            while len(self._local) > self.maxsize:
+                self._local.popitem(last=False)
+
+    def _build(self, values):
+        # A fresh instance per request, so views can't mutate shared state.
+        # from_db() expects the loaded values in model field order.
+        User = get_user_model()
+        cached = dict(zip(self.FIELDS, values))
+        names = [field.attname for field in User._meta.concrete_fields if field.attname in cached]
+        return User.from_db(None, names, [cached[name] for name in names])
+
+    def get(self, user_id):
+        """Return the cached user, or None on a miss."""
+        user_id = str(user_id)
+        values = self._get_local(user_id)
+        if values is None:
+            values = cache.get(self.key(user_id))
+            if values is None:
+                return None
+            self._set_local(user_id, values)
+        return self._build(values)
+
+    async def aget(self, user_id):
+        user_id = str(user_id)
+        values = self._get_local(user_id)
+        if values is None:
+            values = await cache.aget(self.key(user_id))
+            if values is None:
+                return None
+            self._set_local(user_id, values)
+        return self._build(values)
+
+    def set(self, user_id, user):
+        user_id = str(user_id)
+        values = tuple(getattr(user, field) for field in self.FIELDS)
+        cache.set(self.key(user_id), values, self.shared_ttl)
+        self._set_local(user_id, values)
+
+    async def aset(self, user_id, user):
+        user_id = str(user_id)
+        values = tuple(getattr(user, field) for field in self.FIELDS)
+        await cache.aset(self.key(user_id), values, self.shared_ttl)
+        self._set_local(user_id, values)
+
+    def invalidate(self, user_id):
+        user_id = str(user_id)
+        cache.delete(self.key(user_id))
+        with self._lock:
+            self._local.pop(user_id, None)
+
+    def clear_local(self):
+        with self._lock:
+            self._local.clear()
+
+
+user_cache = UserCache(
+    maxsize=settings.AUTH_USER_CACHE['LOCAL_MAXSIZE'],
+    local_ttl=settings.AUTH_USER_CACHE['LOCAL_TTL'],
+    shared_ttl=settings.AUTH_USER_CACHE['SHARED_TTL'],
+)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that resolves the token's user through user_cache
+    instead of querying the users table on every request. The active
+    check runs against the cached row; with CHECK_REVOKE_TOKEN on, the
+    revoked-password check loads the password with one query.
+    """
+
+    def get_user(self, validated_token):
+        user_id = self._get_user_id(validated_token)
+        user = user_cache.get(user_id)
+        if user is None:
+            User = get_user_model()
+            try:
+                user = User.objects.get(**{api_settings.USER_ID_FIELD: user_id})
+            except User.DoesNotExist as e:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found") from e
+            user_cache.set(user_id, user)
+        return self._check_user(validated_token, user)
+
+    async def aauthenticate(self, request):
+        """Async authenticate() for async views; token validation itself never touches the database."""
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        user_id = self._get_user_id(validated_token)
+        user = await user_cache.aget(user_id)
+        if user is None:
+            User = get_user_model()
+            try:
+                user = await User.objects.aget(**{api_settings.USER_ID_FIELD: user_id})
+            except User.DoesNotExist as e:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found") from e
+            await user_cache.aset(user_id, user)
+        return self._check_user(validated_token, user)
+
+    def _get_user_id(self, validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+    def _check_user(self, validated_token, user):
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        return user
@@ -0,0 +1,144 @@
+import hashlib
+import logging
+import math
+import threading
+import time
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    """A fixed-size Bloom filter over strings."""
+
+    def __init__(self, capacity, error_rate=0.01):
+        capacity = max(capacity, 1)
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, value):
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return ((first + i * second) % self.size for i in range(self.hash_count))
+
+    def add(self, value):
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, value):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+
+class BlacklistIndex:
+    """
+    Answers "is this JTI blacklisted?" without a database query for the
+    common case of a token that isn't.
+
+    Each process holds a Bloom filter of unexpired blacklisted JTIs. It is
+    loaded from the database on first use and topped up every sync_interval
+    seconds. Tokens blacklisted by another process since the last top-up are
+    announced through short-lived markers in the shared cache. A Bloom or
+    marker hit is always confirmed against the database, so false positives
+    never reject a valid token.
+
+    The markers only reach other processes through a shared cache. With a
+    process-private cache (local memory or dummy) every check goes to the
+    database instead, so a token revoked by one worker is refused by all of
+    them at once. shared_cache=None detects this from the default cache.
+    """
+
+    def __init__(self, capacity=100000, error_rate=0.01, sync_interval=30, shared_cache=None):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.sync_interval = sync_interval
+        self.shared_cache = shared_cache
+        self._lock = threading.Lock()
+        self._bloom = None
+        self._count = 0
+        self._watermark = None
+        self._synced_at = 0.0
+
+    @staticmethod
+    def marker_key(jti):
+        return f'auth:blacklisted:{jti}'
+
+    def _load(self, since=None):
+        tokens = BlacklistedToken.objects.filter(token__expires_at__gt=timezone.now())
+        if since is not None:
+            tokens = tokens.filter(blacklisted_at__gte=since)
+        return list(tokens.values_list('token__jti', 'blacklisted_at'))
+
+    def _sync(self):
+        now = time.monotonic()
+        if self._bloom is not None and now - self._synced_at < self.sync_interval:
+            return
+        with self._lock:
+            if self._bloom is not None and now - self._synced_at < self.sync_interval:
+                return
+            full = self._bloom is None
+            rows = self._load(None if full else self._watermark)
+            if full or self._count + len(rows) > self.capacity:
+                if not full:
+                    rows = self._load()
+                self.capacity = max(self.capacity, 2 * len(rows))
+                self._bloom = BloomFilter(self.capacity, self.error_rate)
+                self._count = 0
+            for jti, blacklisted_at in rows:
+                # Rows at the watermark itself are loaded again; count them once.
+                if jti not in self._bloom:
+                    self._bloom.add(jti)
+                    self._count += 1
+                if self._watermark is None or blacklisted_at > self._watermark:
+                    self._watermark = blacklisted_at
+            self._synced_at = now
+            if full:
+                logger.info("Loaded %s blacklisted tokens into the blacklist filter", len(rows))
+
+    def enabled(self):
+        """Whether the filter may answer for the database: only when the marker cache is shared."""
+        if self.shared_cache is None:
+            self.shared_cache = not isinstance(caches['default'], (LocMemCache, DummyCache))
+            if not self.shared_cache:
+                logger.info("Blacklist filter disabled: the default cache is not shared between processes")
+        return self.shared_cache
+
+    def add(self, jti):
+        """Record a newly blacklisted JTI locally and announce it to other processes."""
+        if not self.enabled():
+            return
+        self._sync()
+        with self._lock:
+            self._bloom.add(jti)
+            self._count += 1
+        # Other processes pick the row up on their next sync; the marker only
+        # has to outlive that window.
+        cache.set(self.marker_key(jti), True, self.sync_interval * 2)
+
+    def is_blacklisted(self, jti):
+        if not self.enabled():
+            return BlacklistedToken.objects.filter(token__jti=jti).exists()
+        self._sync()
+        if jti not in self._bloom and not cache.get(self.marker_key(jti)):
+            return False
+        return BlacklistedToken.objects.filter(token__jti=jti).exists()
+
+    def reset(self):
+        with self._lock:
+            self._bloom = None
+            self._count = 0
+            self._watermark = None
+            self._synced_at = 0.0
+
+
+blacklist_index = BlacklistIndex(
+    capacity=settings.TOKEN_BLACKLIST_FILTER['CAPACITY'],
+    error_rate=settings.TOKEN_BLACKLIST_FILTER['ERROR_RATE'],
+    sync_interval=settings.TOKEN_BLACKLIST_FILTER['SYNC_INTERVAL'],
+)
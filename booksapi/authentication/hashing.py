@@ -0,0 +1,19 @@
+"""
+Password hashing for process pool workers. Kept free of model imports so
+a freshly spawned worker can import it before Django is set up.
+"""
+import os
+import django
+from django.apps import apps
+from django.contrib.auth.hashers import make_password
+
+
+def init_worker(settings_module):
+    """ProcessPoolExecutor initializer; needed where workers are spawned, not forked."""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    if not apps.ready:
+        django.setup()
+
+
+def hash_passwords(passwords):
+    return [make_password(password) for password in passwords]
@@ -0,0 +1,48 @@
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from booksapi.feeds import IMPORT_FORMATS, detect_import_format
+from authentication.provisioning import provision_users
+
+
+class Command(BaseCommand):
+    help = (
+        "Create user accounts in bulk from an NDJSON or CSV feed with the columns "
+        "username, email, password, first_name and last_name."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Feed file, or '-' to read from stdin.")
+        parser.add_argument('--format', dest='input_format', choices=IMPORT_FORMATS,
+                            help="Feed format. Defaults to the file extension.")
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--workers', type=int, help="Password hashing processes. Defaults to the CPU count, at most 4.")
+        parser.add_argument('--max-errors', type=int, default=100, help="Maximum number of row errors to print.")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        input_format = options['input_format'] or detect_import_format(filename=path)
+        if input_format is None:
+            raise CommandError("Could not detect the feed format, pass --format.")
+
+        kwargs = {
+            'batch_size': options['batch_size'],
+            'workers': options['workers'],
+            'max_reported_errors': options['max_errors'],
+        }
+        if path == '-':
+            report = provision_users(sys.stdin.buffer, input_format, **kwargs)
+        else:
+            try:
+                with open(path, 'rb') as feed:
+                    report = provision_users(feed, input_format, **kwargs)
+            except OSError as e:
+                raise CommandError(str(e))
+
+        for error in report['errors']:
+            self.stderr.write(f"line {error['line']}: {error['errors']}")
+        if report['errors_truncated']:
+            self.stderr.write("... more errors not shown")
+        self.stdout.write(self.style.SUCCESS(
+            f"Processed {report['processed']} rows: {report['created']} created, "
+            f"{report['duplicates']} duplicates, {report['invalid']} invalid."
+        ))
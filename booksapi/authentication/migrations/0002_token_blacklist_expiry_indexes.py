@@ -0,0 +1,32 @@
+from django.db import migrations
+
+# token_blacklist belongs to simplejwt, so its purge indexes are created here.
+INDEXES = {
+    'outstandingtoken_expires_at_idx': ('token_blacklist_outstandingtoken', 'expires_at'),
+    'blacklistedtoken_blacklisted_at_idx': ('token_blacklist_blacklistedtoken', 'blacklisted_at'),
+}
+
+
+def create_indexes(apps, schema_editor):
+    concurrently = 'CONCURRENTLY ' if schema_editor.connection.vendor == 'postgresql' else ''
+    for name, (table, column) in INDEXES.items():
+        schema_editor.execute(f'CREATE INDEX {concurrently}IF NOT EXISTS {name} ON {table} ({column})')
+
+
+def drop_indexes(apps, schema_editor):
+    for name in INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction.
+    atomic = False
+
+    dependencies = [
+        ('authentication', '0001_initial'),
+        ('token_blacklist', '0012_alter_outstandingtoken_user'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
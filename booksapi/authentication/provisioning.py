@@ -0,0 +1,155 @@
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from booksapi.feeds import iter_decoded_lines, parse_csv, parse_ndjson
+from .hashing import hash_passwords, init_worker
+from .models import User
+from .serializers import UserProvisionRowSerializer
+
+logger = logging.getLogger(__name__)
+
+DUPLICATE_USERNAME_ERROR = "A user with that username already exists."
+DUPLICATE_EMAIL_ERROR = "A user with this email already exists."
+
+
+class UserProvisioner:
+    """
+    Validates and creates a stream of user rows in fixed-size batches.
+
+    Each batch costs one query to find taken usernames and emails and one
+    bulk INSERT. Password hashing, which is slow by design, is spread over
+    a process pool so throughput scales with the number of cores. Workers
+    are spawned rather than forked, so a pool started inside a web worker
+    doesn't inherit its threads, locks or database connections; without an
+    explicit count, at most max_workers are started.
+    """
+    max_workers = 4
+
+    def __init__(self, batch_size=1000, workers=None, max_reported_errors=1000):
+        self.batch_size = batch_size
+        self.workers = workers or min(os.cpu_count() or 1, self.max_workers)
+        self.max_reported_errors = max_reported_errors
+        self.processed = 0
+        self.created = 0
+        self.duplicates = 0
+        self.invalid = 0
+        self.errors = []
+        self.errors_truncated = False
+        self.executor = None
+
+    def _report_error(self, line_number, errors):
+        if len(self.errors) < self.max_reported_errors:
+            self.errors.append({"line": line_number, "errors": errors})
+        else:
+            self.errors_truncated = True
+
+    def _hash(self, passwords):
+        if self.executor is None or not passwords:
+            return hash_passwords(passwords)
+        # One chunk per worker keeps pickling overhead to a few messages per batch.
+        size = -(-len(passwords) // self.workers)
+        chunks = [passwords[start:start + size] for start in range(0, len(passwords), size)]
+        return [hashed for chunk in self.executor.map(hash_passwords, chunks) for hashed in chunk]
+
+    def _partition(self, entries, identity):
+        """Split (line_number, entry) pairs into new ones and duplicates of existing or earlier users."""
+        usernames, emails = zip(*(identity(entry) for _, entry in entries))
+        taken = User.objects.filter(Q(username__in=usernames) | Q(email__in=emails)).values_list('username', 'email')
+        taken_usernames, taken_emails = set(), set()
+        for username, email in taken:
+            taken_usernames.add(username)
+            taken_emails.add(email)
+
+        fresh, duplicates = [], []
+        for line_number, entry in entries:
+            username, email = identity(entry)
+            errors = {}
+            if username in taken_usernames:
+                errors['username'] = [DUPLICATE_USERNAME_ERROR]
+            if email in taken_emails:
+                errors['email'] = [DUPLICATE_EMAIL_ERROR]
+            if errors:
+                duplicates.append((line_number, errors))
+                continue
+            taken_usernames.add(username)
+            taken_emails.add(email)
+            fresh.append((line_number, entry))
+        return fresh, duplicates
+
+    def _insert(self, users):
+        with transaction.atomic():
+            User.objects.bulk_create([user for _, user in users])
+
+    def _flush(self, batch):
+        if not batch:
+            return
+        rows, duplicates = self._partition(batch, lambda data: (data['username'], data['email']))
+        hashed = self._hash([data['password'] for _, data in rows])
+        users = [(line_number, User(**{**data, 'password': password})) for (line_number, data), password in zip(rows, hashed)]
+        try:
+            self._insert(users)
+        except IntegrityError:
+            # A concurrent registration took one of these names after the
+            # check. Check the hashed users again against the committed rows.
+            users, late_duplicates = self._partition(users, lambda user: (user.username, user.email))
+            duplicates += late_duplicates
+            if users:
+                self._insert(users)
+
+        self.created += len(users)
+        self.duplicates += len(duplicates)
+        for line_number, errors in duplicates:
+            self._report_error(line_number, errors)
+
+    def run(self, rows):
+        """Consume (line_number, row, error) tuples and return the report."""
+        if self.workers > 1:
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=init_worker,
+                initargs=(os.environ.get('DJANGO_SETTINGS_MODULE', 'booksapi.settings'),),
+            )
+        try:
+            batch = []
+            for line_number, row, error in rows:
+                self.processed += 1
+                if error is None:
+                    serializer = UserProvisionRowSerializer(data=row)
+                    if serializer.is_valid():
+                        batch.append((line_number, serializer.validated_data))
+                    else:
+                        error = serializer.errors
+                if error is not None:
+                    self.invalid += 1
+                    self._report_error(line_number, error)
+                if len(batch) >= self.batch_size:
+                    self._flush(batch)
+                    batch = []
+            self._flush(batch)
+        finally:
+            if self.executor is not None:
+                self.executor.shutdown()
+                self.executor = None
+
+        logger.info("User provisioning finished: %s created, %s duplicates, %s invalid", self.created, self.duplicates, self.invalid)
+        return self.report()
+
+    def report(self):
+        return {
+            "processed": self.processed,
+            "created": self.created,
+            "duplicates": self.duplicates,
+            "invalid": self.invalid,
+            "errors": sorted(self.errors, key=lambda error: error["line"]),
+            "errors_truncated": self.errors_truncated,
+        }
+
+
+def provision_users(byte_lines, input_format, **kwargs):
+    lines = iter_decoded_lines(byte_lines)
+    rows = parse_csv(lines) if input_format == 'csv' else parse_ndjson(lines)
+    return UserProvisioner(**kwargs).run(rows)
@@ -1,10 +1,15 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from django.contrib.auth.password_validation import validate_password
+from django.contrib.auth.validators import UnicodeUsernameValidator
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from .tokens import FastBlacklistRefreshToken
 import re
 
 User = get_user_model()
 
+EMAIL_PATTERN = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
+
 class UserRegistrationSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, required=True, validators=[validate_password])
     password2 = serializers.CharField(write_only=True, required=True)
@@ -23,7 +28,7 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
         """Ensure email is unique and follows a valid format."""
         if User.objects.filter(email=value).exists():
             raise serializers.ValidationError("A user with this email already exists.")
-        if not re.match(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$', value):
+        if not re.match(EMAIL_PATTERN, value):
             raise serializers.ValidationError("Enter a valid email address.")
         return value
 
@@ -52,9 +57,37 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
         return user
 
 
+class UserProvisionRowSerializer(UserRegistrationSerializer):
+    """
+    Registration rules for one bulk-provisioned row, without the per-row
+    username and email uniqueness queries; the provisioner checks those a
+    batch at a time. password2 is optional but must match when given.
+    """
+    password2 = serializers.CharField(write_only=True, required=False)
+
+    class Meta(UserRegistrationSerializer.Meta):
+        extra_kwargs = {
+            'username': {'validators': [UnicodeUsernameValidator()]},
+            'email': {'validators': []},
+        }
+
+    def validate_email(self, value):
+        if not re.match(EMAIL_PATTERN, value):
+            raise serializers.ValidationError("Enter a valid email address.")
+        return value
+
+    def validate(self, attrs):
+        if attrs['password'] != attrs.pop('password2', attrs['password']):
+            raise serializers.ValidationError({"password": "Passwords do not match."})
+        return attrs
+
+
 class UserProfileSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['username', 'email', 'first_name', 'last_name']
         read_only_fields = ['username', 'email']
 
+
+class FastBlacklistTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = FastBlacklistRefreshToken
@@ -0,0 +1,19 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+from .backends import user_cache
+from .blacklist import blacklist_index
+from .models import User
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    # Covers profile updates, deactivation and password changes made through save().
+    user_cache.invalidate(instance.pk)
+
+
+@receiver(post_save, sender=BlacklistedToken)
+def announce_blacklisted_token(sender, instance, created, **kwargs):
+    if created:
+        blacklist_index.add(instance.token.jti)
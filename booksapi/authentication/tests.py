@@ -1,3 +1,208 @@
+import datetime
+import io
+import json
+import tempfile
+from unittest import mock
+from django.core.cache import cache
+from django.core.management import call_command
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+from .backends import CachedJWTAuthentication, user_cache
+from .blacklist import BlacklistIndex, BloomFilter
+from .hashing import hash_passwords
+from .models import User
+from .provisioning import UserProvisioner, provision_users
 
-# Create your tests here.
+
+class UserCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        user_cache.clear_local()
+        self.addCleanup(cache.clear)
+        self.addCleanup(user_cache.clear_local)
+        self.user = User.objects.create_user(username='reader', email='reader@example.com', password='Secure123!')
+        self.token = AccessToken.for_user(self.user)
+        self.auth = CachedJWTAuthentication()
+
+    def test_hits_serve_the_auth_fields_without_queries(self):
+        with self.assertNumQueries(1):
+            self.auth.get_user(self.token)
+        with self.assertNumQueries(0):
+            user = self.auth.get_user(self.token)
+        self.assertEqual((user.pk, user.username, user.is_active, user.is_staff), (self.user.pk, 'reader', True, False))
+        self.assertNotIn(self.user.password, cache.get(user_cache.key(self.user.pk)))
+        user_cache.clear_local()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.auth.get_user(self.token).username, 'reader')
+
+        # Other fields are loaded on demand, and the profile keeps the password.
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        self.assertEqual(client.get('/api/users/profile/').data['email'], 'reader@example.com')
+        self.assertEqual(client.put('/api/users/profile/', {'first_name': 'Ada'}, format='json').status_code, 200)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.first_name, 'Ada')
+        self.assertTrue(self.user.check_password('Secure123!'))
+
+    def test_save_and_delete_evict_the_entry(self):
+        self.auth.get_user(self.token)
+        self.user.is_active = False
+        self.user.save()
+        self.assertIsNone(cache.get(user_cache.key(self.user.pk)))
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.get_user(self.token)
+
+        self.user.is_active = True
+        self.user.save()
+        self.auth.get_user(self.token)
+        self.user.delete()
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.get_user(self.token)
+
+    def test_other_processes_reject_a_deactivated_user_after_the_local_ttl(self):
+        now = 1000.0
+        with mock.patch('authentication.backends.time.monotonic', side_effect=lambda: now):
+            self.auth.get_user(self.token)
+            # Another process deactivates the user: the shared entry is
+            # dropped, but this process's copy lives on until it expires.
+            User.objects.filter(pk=self.user.pk).update(is_active=False)
+            cache.delete(user_cache.key(self.user.pk))
+            self.assertTrue(self.auth.get_user(self.token).is_active)
+            now += user_cache.local_ttl + 1
+            with self.assertRaises(AuthenticationFailed):
+                self.auth.get_user(self.token)
+
+
+class BlacklistIndexTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = User.objects.create_user(username='reader', email='reader@example.com', password='Secure123!')
+
+    def blacklist(self):
+        token = RefreshToken.for_user(self.user)
+        token.blacklist()
+        return token['jti']
+
+    def test_bloom_filter_has_no_false_negatives(self):
+        bloom = BloomFilter(1000, error_rate=0.01)
+        for number in range(1000):
+            bloom.add(f'jti-{number}')
+        self.assertTrue(all(f'jti-{number}' in bloom for number in range(1000)))
+        false_positives = sum(f'other-{number}' in bloom for number in range(10000))
+        self.assertLess(false_positives, 300)
+
+    def test_only_new_rows_are_loaded_after_the_watermark(self):
+        first = self.blacklist()
+        index = BlacklistIndex(capacity=10, sync_interval=0, shared_cache=True)
+        self.assertTrue(index.is_blacklisted(first))
+        watermark = index._watermark
+        self.assertEqual(watermark, BlacklistedToken.objects.get().blacklisted_at)
+
+        second = self.blacklist()
+        self.assertTrue(index.is_blacklisted(second))
+        self.assertEqual(index._count, 2)
+        self.assertGreater(index._watermark, watermark)
+        self.assertFalse(index.is_blacklisted('never-issued'))
+
+        # Outgrowing the capacity rebuilds the filter from every unexpired row.
+        for _ in range(10):
+            self.blacklist()
+        self.assertFalse(index.is_blacklisted('never-issued'))
+        self.assertEqual(index._count, 12)
+        self.assertGreaterEqual(index.capacity, 24)
+
+    def test_fresh_indexes_reject_a_token_blacklisted_elsewhere(self):
+        # With a shared cache the revoking process announces the token.
+        revoking, other = BlacklistIndex(shared_cache=True), BlacklistIndex(shared_cache=True)
+        other.is_blacklisted('never-issued')
+        jti = self.blacklist()
+        revoking.add(jti)
+        with self.assertNumQueries(1):
+            self.assertTrue(other.is_blacklisted(jti))
+        with self.assertNumQueries(0):
+            self.assertFalse(other.is_blacklisted('never-issued'))
+
+        # The local memory cache isn't shared, so every check asks the database.
+        index = BlacklistIndex()
+        self.assertFalse(index.enabled())
+        self.assertTrue(index.is_blacklisted(jti))
+        with self.assertNumQueries(1):
+            self.assertFalse(index.is_blacklisted('never-issued'))
+
+    def test_purge_deletes_only_expired_tokens(self):
+        live = self.blacklist()
+        expired = [RefreshToken.for_user(self.user) for _ in range(3)]
+        expired[0].blacklist()
+        OutstandingToken.objects.filter(jti__in=[token['jti'] for token in expired]).update(expires_at=timezone.now() - datetime.timedelta(minutes=1))
+
+        out = io.StringIO()
+        call_command('purge_expired_tokens', dry_run=True, stdout=out)
+        self.assertIn("3 expired outstanding tokens", out.getvalue())
+        self.assertEqual(OutstandingToken.objects.count(), 4)
+
+        out = io.StringIO()
+        call_command('purge_expired_tokens', batch_size=2, sleep=0, stdout=out)
+        self.assertIn("Deleted 3 expired outstanding tokens and 1 blacklist entries.", out.getvalue())
+        self.assertEqual(list(OutstandingToken.objects.values_list('jti', flat=True)), [live])
+        self.assertEqual(list(BlacklistedToken.objects.values_list('token__jti', flat=True)), [live])
+
+
+def user_feed(*usernames):
+    return [
+        json.dumps({'username': username, 'email': f'{username}@example.com', 'password': 'Secure123!'}).encode() + b'\n'
+        for username in usernames
+    ]
+
+
+class UserProvisioningTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username='admin', email='admin@example.com', password='Secure123!')
+
+    def test_report_counts_duplicates_and_invalid_rows(self):
+        feed = user_feed('ada', 'admin', 'grace', 'ada') + [b'not json\n', b'{"username": "x"}\n']
+        report = provision_users(feed, 'ndjson', batch_size=2, workers=1)
+        self.assertEqual({key: report[key] for key in ('processed', 'created', 'duplicates', 'invalid')},
+                         {'processed': 6, 'created': 2, 'duplicates': 2, 'invalid': 2})
+        self.assertEqual([error['line'] for error in report['errors']], [2, 4, 5, 6])
+        self.assertEqual(report['errors'][0]['errors'], {'username': ["A user with that username already exists."],
+                                                         'email': ["A user with this email already exists."]})
+        self.assertTrue(User.objects.get(username='grace').check_password('Secure123!'))
+
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        response = client.post('/api/users/provision/?input=ndjson', b''.join(user_feed('alan', 'grace')), content_type='application/x-ndjson')
+        self.assertEqual((response.data['created'], response.data['duplicates']), (1, 1))
+        client.force_authenticate(User.objects.get(username='alan'))
+        self.assertEqual(client.post('/api/users/provision/', b''.join(user_feed('eve')), content_type='application/x-ndjson').status_code, 403)
+
+    def test_a_name_taken_mid_batch_is_rechecked_without_rehashing(self):
+        calls = []
+
+        def hash_while_someone_registers(passwords):
+            calls.append(len(passwords))
+            User.objects.create_user(username='grace', email='other@example.com', password='Secure123!')
+            return hash_passwords(passwords)
+
+        provisioner = UserProvisioner(workers=1)
+        with mock.patch.object(provisioner, '_hash', side_effect=hash_while_someone_registers):
+            report = provisioner.run((number, {'username': username, 'email': f'{username}@example.com', 'password': 'Secure123!'}, None)
+                                     for number, username in enumerate(('ada', 'grace', 'alan'), start=1))
+        self.assertEqual(calls, [3])
+        self.assertEqual((report['created'], report['duplicates']), (2, 1))
+        self.assertEqual(report['errors'], [{'line': 2, 'errors': {'username': ["A user with that username already exists."]}}])
+        self.assertEqual(User.objects.get(username='grace').email, 'other@example.com')
+
+    def test_command_hashes_in_spawned_workers(self):
+        with tempfile.NamedTemporaryFile(suffix='.ndjson') as feed:
+            feed.writelines(user_feed('ada', 'grace', 'alan', 'admin'))
+            feed.flush()
+            out, err = io.StringIO(), io.StringIO()
+            call_command('provision_users', feed.name, workers=2, batch_size=3, stdout=out, stderr=err)
+        self.assertIn("Processed 4 rows: 3 created, 1 duplicates, 0 invalid.", out.getvalue())
+        self.assertIn("line 4:", err.getvalue())
+        self.assertTrue(User.objects.get(username='alan').check_password('Secure123!'))
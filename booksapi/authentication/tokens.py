@@ -0,0 +1,14 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from .blacklist import blacklist_index
+
+
+class FastBlacklistRefreshToken(RefreshToken):
+    """RefreshToken whose blacklist check goes through blacklist_index."""
+
+    def check_blacklist(self):
+        jti = self.payload[api_settings.JTI_CLAIM]
+        if blacklist_index.is_blacklisted(jti):
+            raise TokenError(_("Token is blacklisted"))
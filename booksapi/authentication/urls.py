@@ -1,12 +1,14 @@
 from django.urls import path
-from .views import UserRegistrationView, UserProfileView,UserLogoutView
-from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+from .views import UserRegistrationView, UserProvisionView, UserProfileView, UserLibraryStatsView, UserLoginView, UserLogoutView
+from rest_framework_simplejwt.views import TokenRefreshView
 
 urlpatterns = [
     path('users/register/', UserRegistrationView.as_view(), name='user-register'),
-    path('users/login/', TokenObtainPairView.as_view(), name='token-obtain-pair'),
+    path('users/provision/', UserProvisionView.as_view(), name='user-provision'),
+    path('users/login/', UserLoginView.as_view(), name='token-obtain-pair'),
     path('users/token/refresh/', TokenRefreshView.as_view(), name='token-refresh'),
     path('users/profile/', UserProfileView.as_view(), name='user-profile'),
+    path('users/profile/stats/', UserLibraryStatsView.as_view(), name='user-library-stats'),
     path('users/logout/', UserLogoutView.as_view(), name='user-logout'),
    
 ]
\ No newline at end of file
@@ -1,52 +1,117 @@
 import logging
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework import status
+from rest_framework_simplejwt.views import TokenObtainPairView
+from .models import User
 from .serializers import UserRegistrationSerializer, UserProfileSerializer
-from rest_framework_simplejwt.tokens import RefreshToken
+from .tokens import FastBlacklistRefreshToken
+from .provisioning import provision_users
+from booksapi.feeds import IMPORT_FORMATS, detect_import_format
+from books_manage.serializers import UserLibraryStatsSerializer
+from books_manage.stats import get_library_stats
 
 logger = logging.getLogger(__name__)
 
 class UserRegistrationView(APIView):
+    throttle_scope = 'register'
+
     def post(self, request):
         serializer = UserRegistrationSerializer(data=request.data)
         if serializer.is_valid():
             serializer.save()
-            logger.info(f"User registered successfully: {serializer.data.get('username')}")
+            logger.info("User registered successfully: %s", serializer.data.get('username'))
             return Response({"message": "User registered successfully"}, status=status.HTTP_201_CREATED)
-        logger.error(f"User registration failed: {serializer.errors}")
+        logger.error("User registration failed: %s", serializer.errors)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+class UserProvisionView(APIView):
+    """
+    Admin-only bulk account creation from an NDJSON or CSV feed with the
+    columns username, email, password, first_name and last_name, sent as
+    the raw body or as a multipart upload in the 'file' field.
+    """
+    permission_classes = [IsAdminUser]
+    batch_size = 1000
+
+    def post(self, request):
+        upload = None
+        if request.content_type.startswith('multipart/form-data'):
+            upload = request.FILES.get('file')
+            if upload is None:
+                return Response({"error": "Upload the feed in the 'file' field."}, status=status.HTTP_400_BAD_REQUEST)
+
+        input_format = request.query_params.get('input') or detect_import_format(
+            upload.content_type if upload else request.content_type,
+            upload.name if upload else '',
+        )
+        if input_format not in IMPORT_FORMATS:
+            return Response({"error": "Send the feed as NDJSON or CSV, or set ?input=ndjson|csv."}, status=status.HTTP_400_BAD_REQUEST)
+
+        stream = upload if upload is not None else request.stream
+        if stream is None:
+            return Response({"error": "The provisioning feed is empty."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            report = provision_users(stream, input_format, batch_size=self.batch_size)
+            logger.info("Users provisioned by %s: %s created", request.user.username, report['created'])
+            return Response(report, status=status.HTTP_200_OK)
+        except Exception as e:
+            logger.error("User provisioning error for %s: %s", request.user.username, e)
+            return Response({"error": "Something went wrong"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
 class UserProfileView(APIView):
     permission_classes = [IsAuthenticated]
 
+    def get_profile(self, request):
+        # request.user comes from the user cache with only the auth fields loaded.
+        return User.objects.get(pk=request.user.pk)
+
     def get(self, request):
-        serializer = UserProfileSerializer(request.user)
-        logger.info(f"User profile retrieved: {request.user.username}")
+        serializer = UserProfileSerializer(self.get_profile(request))
+        logger.info("User profile retrieved: %s", request.user.username)
         return Response(serializer.data)
 
     def put(self, request):
-        serializer = UserProfileSerializer(request.user, data=request.data, partial=True)
+        serializer = UserProfileSerializer(self.get_profile(request), data=request.data, partial=True)
         if serializer.is_valid():
             serializer.save()
-            logger.info(f"User profile updated: {request.user.username}")
+            logger.info("User profile updated: %s", request.user.username)
             return Response(serializer.data)
-        logger.error(f"User profile update failed for {request.user.username}: {serializer.errors}")
+        logger.error("User profile update failed for %s: %s", request.user.username, serializer.errors)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class UserLibraryStatsView(APIView):
+    """Counts of the books a user added, their reading lists and the items in them."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            serializer = UserLibraryStatsSerializer(get_library_stats(request.user.id))
+            return Response(serializer.data, status=status.HTTP_200_OK)
+        except Exception as e:
+            logger.error("Library stats retrieval error for %s: %s", request.user.username, e)
+            return Response({"error": "Something went wrong"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class UserLoginView(TokenObtainPairView):
+    """simplejwt's token pair view, throttled before the password is checked."""
+    throttle_scope = 'login'
+
     
 class UserLogoutView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
         try:
-            print(request.data)
             refresh_token = request.data["refresh"]
-            token = RefreshToken(refresh_token)
+            token = FastBlacklistRefreshToken(refresh_token)
             token.blacklist()
 
-            logger.info(f"User logged out successfully: {request.user.username}")
+            logger.info("User logged out successfully: %s", request.user.username)
             return Response({"message": "Logout successful"}, status=status.HTTP_200_OK)
         except Exception as e:
-            logger.error(f"Logout failed for {request.user.username}: {str(e)}")
+            logger.error("Logout failed for %s: %s", request.user.username, e)
             return Response({"error": "Invalid refresh token"}, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
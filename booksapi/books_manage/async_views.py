@@ -0,0 +1,199 @@
+"""
+Async variants of the book and reading list read endpoints.
+
+Under ASGI these run on the event loop instead of being handed to the sync
+thread pool one request at a time. They share the sync views' caching,
+filters, pagination and serializers, so the responses are the same.
+"""
+import logging
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from django.views import View
+from rest_framework import exceptions, status
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly
+from rest_framework.renderers import BrowsableAPIRenderer
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from authentication.backends import CachedJWTAuthentication
+from .models import Book, ReadingList
+from .serializers import ReadingListDetailSerializer
+from .filters import filter_books
+from .caching import aget_cached_book, aget_cached_book_list, cached_response, sparse_entry
+from .fieldsets import ALWAYS_LOADED, book_fieldset
+from .rows import book_rows
+from .pagination import BookPageNumberPagination, wants_cursor_pagination
+from .views import BookListCreateView, reading_list_item_values, reading_list_read_options, reading_lists_for_read
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncAPIView(View):
+    """
+    A small async counterpart of APIView. Authenticates with
+    CachedJWTAuthentication.aauthenticate(), checks permission_classes,
+    and renders Response objects itself so Django never has to push the
+    rendering back onto a sync thread. Handlers are async and receive a
+    DRF Request; only safe methods are supported.
+    """
+    authentication_classes = [CachedJWTAuthentication]
+    permission_classes = [IsAuthenticatedOrReadOnly]
+    # The browsable API renderer calls back into sync view machinery.
+    renderer_classes = [renderer for renderer in api_settings.DEFAULT_RENDERER_CLASSES if not issubclass(renderer, BrowsableAPIRenderer)]
+    negotiator = DefaultContentNegotiation()
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args, self.kwargs = args, kwargs
+        request = Request(request, authenticators=[])
+        self.request = request
+        try:
+            await self.initial(request)
+            handler = getattr(self, request.method.lower(), None) if request.method.lower() in self.http_method_names else None
+            if handler is None:
+                raise exceptions.MethodNotAllowed(request.method)
+            response = await handler(request, *args, **kwargs)
+        except exceptions.APIException as exc:
+            response = self.handle_exception(request, exc)
+        return self.finalize_response(request, response)
+
+    def perform_content_negotiation(self, request):
+        renderers = [renderer() for renderer in self.renderer_classes]
+        try:
+            return self.negotiator.select_renderer(request, renderers)
+        except exceptions.NotAcceptable:
+            return renderers[0], renderers[0].media_type
+
+    async def initial(self, request):
+        # Negotiate first, as APIView does: cached ETags vary by the accepted media type.
+        request.accepted_renderer, request.accepted_media_type = self.perform_content_negotiation(request)
+        request.user, request.auth = AnonymousUser(), None
+        for authenticator in self.authentication_classes:
+            result = await authenticator().aauthenticate(request)
+            if result is not None:
+                request.user, request.auth = result
+                break
+
+        for permission_class in self.permission_classes:
+            permission = permission_class()
+            if not permission.has_permission(request, self):
+                if request.auth is None:
+                    raise exceptions.NotAuthenticated()
+                raise exceptions.PermissionDenied(getattr(permission, 'message', None))
+
+    def handle_exception(self, request, exc):
+        headers = {}
+        if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+            headers['WWW-Authenticate'] = self.authentication_classes[0]().authenticate_header(request)
+        if isinstance(exc, exceptions.MethodNotAllowed):
+            headers['Allow'] = ', '.join(method.upper() for method in self._allowed_methods())
+        data = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+        return Response(data, status=exc.status_code, headers=headers)
+
+    def finalize_response(self, request, response):
+        if isinstance(response, Response):
+            if not hasattr(request, 'accepted_renderer'):
+                request.accepted_renderer, request.accepted_media_type = self.perform_content_negotiation(request)
+            response.accepted_renderer = request.accepted_renderer
+            response.accepted_media_type = request.accepted_media_type
+            response.renderer_context = {'view': self, 'args': self.args, 'kwargs': self.kwargs, 'request': request, 'response': response}
+            content = response.rendered_content
+            rendered = HttpResponse(content, status=response.status_code, content_type=response['Content-Type'])
+            for header, value in response.items():
+                rendered[header] = value
+            response = rendered
+        patch_vary_headers(response, ('Accept',))
+        return response
+
+
+class AsyncBookListView(AsyncAPIView):
+    pagination_class = BookPageNumberPagination
+
+    async def build_page(self, request):
+        if wants_cursor_pagination(request):
+            # CursorPagination has no async form; build that page on a worker thread.
+            return await sync_to_async(BookListCreateView().build_page)(request)
+        rows = book_rows(book_fieldset(request.query_params))
+        books = rows.values(filter_books(Book.objects.all(), request.query_params), *ALWAYS_LOADED)
+        paginator = self.pagination_class()
+        page = await paginator.apaginate_queryset(books, request)
+        last_modified = max((book['updated_at'] for book in page), default=None)
+        return paginator.get_paginated_response(rows.serialize(page)).data, last_modified
+
+    async def get(self, request):
+        try:
+            entry = await aget_cached_book_list(request, lambda: self.build_page(request))
+            logger.info("Retrieved paginated book list by %s", request.user.username if request.user.is_authenticated else 'anonymous')
+            return cached_response(request, entry)
+        except exceptions.ValidationError as e:
+            logger.warning("Invalid book list filters: %s", e.detail)
+            return Response({"error": e.detail}, status=status.HTTP_400_BAD_REQUEST)
+        except exceptions.NotFound as e:
+            logger.warning("Invalid book list page requested: %s", e)
+            return Response({"error": str(e.detail)}, status=status.HTTP_404_NOT_FOUND)
+        except Exception as e:
+            logger.error("Book list retrieval error: %s", e)
+            return Response({"error": "Something went wrong"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class AsyncBookDetailView(AsyncAPIView):
+
+    async def get(self, request, pk):
+        try:
+            fieldset = book_fieldset(request.query_params)
+            return cached_response(request, sparse_entry(await aget_cached_book(pk), fieldset))
+        except exceptions.ValidationError as e:
+            return Response({"error": e.detail}, status=status.HTTP_400_BAD_REQUEST)
+        except Book.DoesNotExist:
+            logger.error("Book not found: ID %s", pk)
+            return Response({"error": "Book not found."}, status=status.HTTP_404_NOT_FOUND)
+
+
+class AsyncReadingListListView(AsyncAPIView):
+    permission_classes = [IsAuthenticated]
+
+    async def get(self, request):
+        try:
+            options = reading_list_read_options(request)
+        except exceptions.ValidationError as e:
+            return Response({"error": e.detail}, status=status.HTTP_400_BAD_REQUEST)
+        reading_lists = [reading_list async for reading_list in reading_lists_for_read(request.user, **options)]
+        serializer = ReadingListDetailSerializer(reading_lists, many=True, **options)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+class AsyncReadingListDetailView(AsyncAPIView):
+    permission_classes = [IsAuthenticated]
+
+    async def get(self, request, pk):
+        try:
+            options = reading_list_read_options(request)
+            reading_list = await reading_lists_for_read(request.user, **options).aget(pk=pk)
+            serializer = ReadingListDetailSerializer(reading_list, **options)
+            return Response(serializer.data, status=status.HTTP_200_OK)
+        except exceptions.ValidationError as e:
+            return Response({"error": e.detail}, status=status.HTTP_400_BAD_REQUEST)
+        except ReadingList.DoesNotExist:
+            logger.error("Reading list not found or unauthorized: ID %s", pk)
+            return Response({"error": "Reading list not found or you do not have permission to access it."}, status=status.HTTP_404_NOT_FOUND)
+
+
+class AsyncReadingListItemListView(AsyncAPIView):
+    permission_classes = [IsAuthenticated]
+
+    async def get(self, request, pk):
+        try:
+            book_fields = book_fieldset(request.query_params)
+            reading_list = await ReadingList.objects.aget(pk=pk, user=request.user)
+        except exceptions.ValidationError as e:
+            return Response({"error": e.detail}, status=status.HTTP_400_BAD_REQUEST)
+        except ReadingList.DoesNotExist:
+            logger.error("Reading list not found or unauthorized: ID %s", pk)
+            return Response({"error": "Reading list not found or you do not have permission to access it."}, status=status.HTTP_404_NOT_FOUND)
+
+        rows, items = reading_list_item_values(reading_list, book_fields)
+        data = rows.serialize([item async for item in items])
+        logger.info("Retrieved items for reading list by %s: List ID %s", request.user.username, pk)
+        return Response(data, status=status.HTTP_200_OK)
@@ -0,0 +1,398 @@
+"""
+In-process benchmark scenarios for every API route.
+
+Each scenario prepares whatever state its request needs outside the timed
+section (a fresh refresh token, a book to delete, ...), then times a single
+request through the full middleware, authentication and view stack and
+counts its queries. Results can be saved and used as the baseline for a
+later run, which then fails on regressions.
+"""
+import datetime
+import importlib.util
+import io
+import json
+import statistics
+import time
+import timeit
+from django.conf import settings
+from django.db import connection, connections
+from django.db.utils import load_backend
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+from authentication import urls as authentication_urls
+from authentication.models import User
+from . import urls as books_urls
+from .models import Book, ReadingList, ReadingListItem
+from .ordering import next_order
+from .serializers import BookSerializer, ReadingListSerializer, ReadingListItemSerializer
+from .seeding import SEED_PASSWORD, SEED_USERNAME_PREFIX, letters
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def api_route_names():
+    """URL names of every route in the authentication and books_manage apps."""
+    patterns = list(authentication_urls.urlpatterns) + list(books_urls.urlpatterns)
+    return {pattern.name for pattern in patterns if pattern.name}
+
+
+class Scenario:
+    def __init__(self, url_name, method, prepare, auth='user', expect=(200,), max_iterations=None):
+        self.url_name = url_name
+        self.method = method
+        self.prepare = prepare
+        self.auth = auth
+        self.expect = expect
+        self.max_iterations = max_iterations
+
+    @property
+    def key(self):
+        return f'{self.method.upper()} {self.url_name}'
+
+
+class BenchmarkContext:
+    """Users, clients and ids the scenarios work with, taken from seeded data."""
+
+    def __init__(self):
+        self.user = (
+            User.objects.filter(username__startswith=SEED_USERNAME_PREFIX, reading_lists__items__isnull=False)
+            .order_by('id').first()
+        )
+        if self.user is None:
+            raise ValueError("The benchmark needs seeded users with reading list items; run seed_data first.")
+        self.admin = User.objects.filter(is_staff=True).first() or User.objects.create_superuser(
+            username='benchadmin', email='benchadmin@example.com', password=SEED_PASSWORD,
+        )
+        self.reading_list = ReadingList.objects.filter(user=self.user, items__isnull=False).order_by('id').first()
+        self.book_ids = list(Book.objects.order_by('id').values_list('id', flat=True)[:500])
+        # Book list pages to cycle through; at most 20 so they stay cached after warm-up.
+        self.book_pages = max(1, min(20, Book.objects.count() // 10))
+        self.clients = {'anon': APIClient(), 'user': self.client_for(self.user), 'admin': self.client_for(self.admin)}
+        self.counter = 0
+
+    @staticmethod
+    def client_for(user):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+        return client
+
+    def unique(self):
+        self.counter += 1
+        return self.counter
+
+    def new_book(self):
+        number = self.unique()
+        return Book.objects.create(
+            title=f'Benchmark Book {number}', authors='Benchmark Author', genre='Fiction',
+            publication_date='2020-01-01', created_by=self.user,
+        )
+
+    def new_reading_list(self):
+        return ReadingList.objects.create(user=self.user, name=f'Benchmark List {self.unique()}')
+
+    def book_not_in(self, reading_list):
+        listed = set(reading_list.items.values_list('book_id', flat=True))
+        return next(book_id for book_id in self.book_ids if book_id not in listed)
+
+
+def _book_feed(ctx, rows=5):
+    number = ctx.unique()
+    lines = [
+        json.dumps({'title': f'Imported {number}-{row}', 'authors': 'Importer', 'genre': 'Fiction', 'publication_date': '2021-05-01'})
+        for row in range(rows)
+    ]
+    return ('\n'.join(lines) + '\n').encode()
+
+
+SCENARIOS = [
+    # Authentication
+    Scenario('user-register', 'post', lambda ctx, i: {
+        'path': reverse('user-register'),
+        'data': {
+            'username': f'benchreg{letters(ctx.unique())}', 'email': f'benchreg{ctx.counter}@example.com',
+            'password': 'Bench#Pass123', 'password2': 'Bench#Pass123',
+        },
+    }, auth='anon', expect=(201,), max_iterations=10),
+    Scenario('user-provision', 'post', lambda ctx, i: {
+        'path': reverse('user-provision') + '?input=csv',
+        'data': f'username,email,password\nbenchprov{letters(ctx.unique())},benchprov{ctx.counter}@example.com,Bench#Pass123\n'.encode(),
+        'content_type': 'text/csv',
+    }, auth='admin', max_iterations=5),
+    Scenario('token-obtain-pair', 'post', lambda ctx, i: {
+        'path': reverse('token-obtain-pair'),
+        'data': {'username': ctx.user.username, 'password': SEED_PASSWORD},
+    }, auth='anon', max_iterations=10),
+    Scenario('token-refresh', 'post', lambda ctx, i: {
+        'path': reverse('token-refresh'),
+        'data': {'refresh': str(RefreshToken.for_user(ctx.user))},
+    }, auth='anon'),
+    Scenario('user-profile', 'get', lambda ctx, i: {'path': reverse('user-profile')}),
+    Scenario('user-library-stats', 'get', lambda ctx, i: {'path': reverse('user-library-stats')}),
+    Scenario('user-logout', 'post', lambda ctx, i: {
+        'path': reverse('user-logout'),
+        'data': {'refresh': str(RefreshToken.for_user(ctx.user))},
+    }),
+    # Books
+    Scenario('book-list-create', 'get', lambda ctx, i: {'path': reverse('book-list-create') + f'?page={i % ctx.book_pages + 1}'}, auth='anon'),
+    Scenario('book-list-create', 'post', lambda ctx, i: {
+        'path': reverse('book-list-create'),
+        'data': {'title': f'Benchmark Post {ctx.unique()}', 'authors': 'Benchmark Author', 'genre': 'Fiction', 'publication_date': '2022-02-02'},
+    }, expect=(201,)),
+    Scenario('book-search', 'get', lambda ctx, i: {'path': reverse('book-search') + '?q=river'}, auth='anon'),
+    Scenario('book-autocomplete', 'get', lambda ctx, i: {
+        'path': reverse('book-autocomplete') + '?q=' + ('the', 'riv', 's', 'mo')[i % 4],
+    }, auth='anon'),
+    Scenario('book-import', 'post', lambda ctx, i: {
+        'path': reverse('book-import') + '?input=ndjson', 'data': _book_feed(ctx), 'content_type': 'application/x-ndjson',
+    }),
+    Scenario('book-export', 'get', lambda ctx, i: {'path': reverse('book-export') + '?output=ndjson&genre=Poetry'}, auth='anon'),
+    Scenario('book-facets', 'get', lambda ctx, i: {'path': reverse('book-facets')}, auth='anon'),
+    Scenario('book-popular', 'get', lambda ctx, i: {'path': reverse('book-popular') + ('?days=7' if i % 2 else '')}, auth='anon'),
+    Scenario('book-detail', 'get', lambda ctx, i: {
+        'path': reverse('book-detail', kwargs={'pk': ctx.book_ids[i % len(ctx.book_ids)]}),
+    }, auth='anon'),
+    Scenario('book-related', 'get', lambda ctx, i: {
+        'path': reverse('book-related', kwargs={'pk': ctx.book_ids[i % len(ctx.book_ids)]}),
+    }, auth='anon'),
+    Scenario('book-detail', 'delete', lambda ctx, i: {
+        'path': reverse('book-detail', kwargs={'pk': ctx.new_book().pk}),
+    }, expect=(204,)),
+    # Reading lists
+    Scenario('reading-list-list-create', 'get', lambda ctx, i: {
+        'path': reverse('reading-list-list-create') + '?expand=items&include=counts',
+    }),
+    Scenario('reading-list-list-create', 'post', lambda ctx, i: {
+        'path': reverse('reading-list-list-create'), 'data': {'name': f'Benchmark Post List {ctx.unique()}'},
+    }, expect=(201,)),
+    Scenario('reading-list-detail', 'get', lambda ctx, i: {
+        'path': reverse('reading-list-detail', kwargs={'pk': ctx.reading_list.pk}) + '?expand=items&include=counts',
+    }),
+    Scenario('reading-list-detail', 'put', lambda ctx, i: {
+        'path': reverse('reading-list-detail', kwargs={'pk': ctx.new_reading_list().pk}),
+        'data': {'name': f'Renamed {ctx.unique()}'},
+    }),
+    Scenario('reading-list-detail', 'delete', lambda ctx, i: {
+        'path': reverse('reading-list-detail', kwargs={'pk': ctx.new_reading_list().pk}),
+    }, expect=(204,)),
+    Scenario('reading-list-item-create', 'get', lambda ctx, i: {
+        'path': reverse('reading-list-item-create', kwargs={'pk': ctx.reading_list.pk}),
+    }),
+    Scenario('reading-list-item-create', 'post', lambda ctx, i: {
+        'path': reverse('reading-list-item-create', kwargs={'pk': ctx.reading_list.pk}),
+        'data': {'book_id': ctx.book_not_in(ctx.reading_list)},
+    }, expect=(201,)),
+    Scenario('reading-list-item-create', 'patch', lambda ctx, i: {
+        'path': reverse('reading-list-item-create', kwargs={'pk': ctx.reading_list.pk}),
+        'data': {'move': [{'book_id': ctx.reading_list.items.order_by('order').values_list('book_id', flat=True).first()}]},
+    }),
+    Scenario('reading-list-item-delete', 'delete', lambda ctx, i: {
+        'path': reverse('reading-list-item-delete', kwargs={'pk': ctx.reading_list.pk, 'book_id': _listed_book(ctx)}),
+    }, expect=(204,)),
+    Scenario('reading-list-recommendations', 'get', lambda ctx, i: {
+        'path': reverse('reading-list-recommendations', kwargs={'pk': ctx.reading_list.pk}),
+    }),
+    # Async read paths
+    Scenario('async-book-list', 'get', lambda ctx, i: {'path': reverse('async-book-list') + f'?page={i % ctx.book_pages + 1}'}, auth='anon'),
+    Scenario('async-book-detail', 'get', lambda ctx, i: {
+        'path': reverse('async-book-detail', kwargs={'pk': ctx.book_ids[i % len(ctx.book_ids)]}),
+    }, auth='anon'),
+    Scenario('async-reading-list-list', 'get', lambda ctx, i: {'path': reverse('async-reading-list-list') + '?expand=items&include=counts'}),
+    Scenario('async-reading-list-detail', 'get', lambda ctx, i: {
+        'path': reverse('async-reading-list-detail', kwargs={'pk': ctx.reading_list.pk}) + '?expand=items&include=counts',
+    }),
+    Scenario('async-reading-list-items', 'get', lambda ctx, i: {
+        'path': reverse('async-reading-list-items', kwargs={'pk': ctx.reading_list.pk}),
+    }),
+]
+
+
+def _listed_book(ctx):
+    book_id = ctx.book_not_in(ctx.reading_list)
+    ReadingListItem.objects.create(reading_list=ctx.reading_list, book_id=book_id, order=next_order(ctx.reading_list))
+    return book_id
+
+
+def missing_scenarios(scenarios=SCENARIOS):
+    return sorted(api_route_names() - {scenario.url_name for scenario in scenarios})
+
+
+def run_scenario(ctx, scenario, iterations, warmup):
+    client = ctx.clients[scenario.auth]
+    total = min(iterations, scenario.max_iterations or iterations)
+    latencies, queries, errors = [], [], []
+    for i in range(-min(warmup, total), total):
+        request = scenario.prepare(ctx, i)
+        path = request.pop('path')
+        if 'content_type' not in request:
+            request['format'] = 'json'
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = getattr(client, scenario.method)(path, **request)
+            if response.streaming:
+                b''.join(response.streaming_content)
+            elapsed = time.perf_counter() - started
+        if i < 0:
+            continue
+        latencies.append(elapsed * 1000)
+        queries.append(len(captured.captured_queries))
+        if response.status_code not in scenario.expect:
+            errors.append(f'{response.status_code} from {scenario.method.upper()} {path}')
+
+    return {
+        'iterations': total,
+        'p50_ms': statistics.median(latencies),
+        'p95_ms': percentile(latencies, 95),
+        'p99_ms': percentile(latencies, 99),
+        'throughput_rps': total / (sum(latencies) / 1000),
+        'queries_p50': statistics.median(queries),
+        'queries_max': max(queries),
+        'errors': errors[:5],
+        'error_count': len(errors),
+    }
+
+
+def run_benchmark(iterations=50, warmup=3, only=None):
+    """Run every scenario (or those whose key or URL name is in only) and return results by scenario key."""
+    ctx = BenchmarkContext()
+    results = {}
+    # Every request comes from one client, so give each throttle scope a
+    # budget no run can spend; the buckets are still checked and timed.
+    rates = {scope: '1000000/s' for scope in settings.REST_FRAMEWORK.get('DEFAULT_THROTTLE_RATES', {})}
+    with override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': rates}):
+        for scenario in SCENARIOS:
+            if only and scenario.key not in only and scenario.url_name not in only:
+                continue
+            results[scenario.key] = run_scenario(ctx, scenario, iterations, warmup)
+    return results
+
+
+def compare_to_baseline(results, baseline, threshold=0.25, min_delta_ms=2.0):
+    """
+    List regressions against a saved run. Latency regresses when p95 grows
+    by more than threshold (a fraction) and by at least min_delta_ms, so
+    sub-millisecond noise doesn't fail a run. Query counts are deterministic,
+    so any increase in the median is a regression.
+    """
+    regressions = []
+    for key, result in results.items():
+        previous = baseline.get(key)
+        if previous is None:
+            continue
+        delta = result['p95_ms'] - previous['p95_ms']
+        if result['p95_ms'] > previous['p95_ms'] * (1 + threshold) and delta >= min_delta_ms:
+            regressions.append(f"{key}: p95 {previous['p95_ms']:.2f}ms -> {result['p95_ms']:.2f}ms")
+        if result['queries_p50'] > previous['queries_p50']:
+            regressions.append(f"{key}: queries {previous['queries_p50']:g} -> {result['queries_p50']:g}")
+    return regressions
+
+
+def sample_payloads(books=100):
+    """
+    Response bodies shaped like the book list, an expanded reading list and
+    a values() page with raw dates, built in memory from unsaved models.
+    """
+    created = datetime.datetime(2024, 3, 1, 12, 30, 15, 123456, tzinfo=datetime.timezone.utc)
+    instances = [
+        Book(
+            id=number, title=f"The Silent River \u00e9dition {number}", authors="Ada Chen, Omar Diaz",
+            genre='Fiction', publication_date=datetime.date(1990, 1, 1) + datetime.timedelta(days=number * 37),
+            description="A long description of the book \u2014 with \"quotes\" and a line separator \u2028. " * 4,
+            created_by_id=number % 7 + 1, created_at=created, updated_at=created + datetime.timedelta(seconds=number),
+        )
+        for number in range(1, books + 1)
+    ]
+    reading_list = ReadingList(id=1, user_id=1, name="Favorites", created_at=created, updated_at=created)
+    items = [
+        ReadingListItem(id=book.id, reading_list=reading_list, book=book, order=position * 1024, added_at=created)
+        for position, book in enumerate(instances, start=1)
+    ]
+    return {
+        'book list': {'count': books, 'next': None, 'previous': None, 'results': BookSerializer(instances, many=True).data},
+        'reading list': {**ReadingListSerializer(reading_list).data, 'items': ReadingListItemSerializer(items, many=True).data},
+        'book values': [
+            {field: getattr(book, field) for field in ('id', 'title', 'authors', 'publication_date', 'created_at', 'updated_at')}
+            for book in instances
+        ],
+    }
+
+
+def benchmark_json(renderer_class, parser_class, payloads, number=200):
+    """
+    Time renderer_class against DRF's JSONRenderer on each payload, and
+    parser_class against DRF's JSONParser on the rendered bytes.
+    Returns per-payload timings in microseconds and whether the bytes match.
+    """
+    results = {}
+    baseline_renderer, renderer = JSONRenderer(), renderer_class()
+    baseline_parser, parser = JSONParser(), parser_class()
+    for name, payload in payloads.items():
+        expected = baseline_renderer.render(payload)
+        timings = {
+            'render_stdlib_us': timeit.timeit(lambda: baseline_renderer.render(payload), number=number),
+            'render_fast_us': timeit.timeit(lambda: renderer.render(payload), number=number),
+            'parse_stdlib_us': timeit.timeit(lambda: baseline_parser.parse(io.BytesIO(expected)), number=number),
+            'parse_fast_us': timeit.timeit(lambda: parser.parse(io.BytesIO(expected)), number=number),
+        }
+        results[name] = {
+            'bytes': len(expected),
+            'identical': renderer.render(payload) == expected,
+            **{key: seconds / number * 1e6 for key, seconds in timings.items()},
+        }
+    return results
+
+
+def connection_modes(alias='default'):
+    """
+    {mode: settings} for alias: a new connection per request, a persistent
+    one that is health-checked by each request, and, on PostgreSQL with
+    psycopg_pool installed, a pool (the configured one, or a small default).
+    """
+    configured = connections[alias].settings_dict
+    options = {key: value for key, value in configured['OPTIONS'].items() if key != 'pool'}
+    modes = {
+        'connect': {**configured, 'OPTIONS': options, 'CONN_MAX_AGE': 0},
+        'persistent': {**configured, 'OPTIONS': options, 'CONN_MAX_AGE': 600, 'CONN_HEALTH_CHECKS': True},
+    }
+    if configured['ENGINE'] == 'django.db.backends.postgresql' and importlib.util.find_spec('psycopg_pool'):
+        pool = configured['OPTIONS'].get('pool') or {'min_size': 1, 'max_size': 2}
+        modes['pooled'] = {**configured, 'OPTIONS': {**options, 'pool': pool}, 'CONN_MAX_AGE': 0}
+    return modes
+
+
+def benchmark_connections(alias='default', number=200, warmup=5):
+    """
+    Time requests that run a single query on alias in each connection mode,
+    opening and releasing connections at request boundaries as Django does.
+    Returns {mode: {'p50_us', 'p95_us', 'saving_us'}}, the saving being the
+    p50 difference to a new connection per request.
+    """
+    results = {}
+    for mode, settings_dict in connection_modes(alias).items():
+        # Separate aliases keep these connections and pools out of the app's.
+        wrapper = load_backend(settings_dict['ENGINE']).DatabaseWrapper(settings_dict, f'{alias}-benchmark-{mode}')
+        samples = []
+        try:
+            for i in range(-warmup, number):
+                started = time.perf_counter()
+                wrapper.close_if_unusable_or_obsolete()
+                with wrapper.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+                    cursor.fetchone()
+                wrapper.close_if_unusable_or_obsolete()
+                if i >= 0:
+                    samples.append((time.perf_counter() - started) * 1e6)
+        finally:
+            wrapper.close()
+            if mode == 'pooled':
+                wrapper.close_pool()
+        results[mode] = {'p50_us': statistics.median(samples), 'p95_us': percentile(samples, 95)}
+    for result in results.values():
+        result['saving_us'] = results['connect']['p50_us'] - result['p50_us']
+    return results
@@ -0,0 +1,163 @@
+import hashlib
+import uuid
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+from rest_framework.response import Response
+from .facets import invalidate_book_facets
+from .models import Book
+from .serializers import BookSerializer
+
+LIST_VERSION_KEY = 'books:list:version'
+
+
+def book_cache_key(pk):
+    return f'books:detail:{pk}'
+
+
+def make_etag(*parts):
+    """Strong ETag over the given parts."""
+    digest = hashlib.md5('|'.join(str(part) for part in parts).encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def _book_entry(book):
+    return {
+        'data': dict(BookSerializer(book).data),
+        'etag': make_etag(book.pk, book.updated_at.isoformat()),
+        'last_modified': int(book.updated_at.timestamp()),
+        'validate_last_modified': True,
+    }
+
+
+def get_cached_book(pk):
+    """
+    Return {'data', 'etag', 'last_modified'} for a book, reading the database
+    only on a cache miss. Raises Book.DoesNotExist like Book.objects.get().
+    """
+    key = book_cache_key(pk)
+    entry = cache.get(key)
+    if entry is None:
+        entry = _book_entry(Book.objects.get(pk=pk))
+        cache.set(key, entry, settings.BOOK_CACHE_TIMEOUT)
+    return entry
+
+
+async def aget_cached_book(pk):
+    """Async get_cached_book()."""
+    key = book_cache_key(pk)
+    entry = await cache.aget(key)
+    if entry is None:
+        entry = _book_entry(await Book.objects.aget(pk=pk))
+        await cache.aset(key, entry, settings.BOOK_CACHE_TIMEOUT)
+    return entry
+
+
+def sparse_entry(entry, fieldset):
+    """A cached entry narrowed to a fieldset, with an ETag of its own."""
+    if fieldset is None:
+        return entry
+    return {
+        **entry,
+        'data': {name: value for name, value in entry['data'].items() if name in fieldset},
+        'etag': make_etag(entry['etag'], *fieldset),
+    }
+
+
+def get_list_version():
+    # A random token rather than a counter, so an evicted version can never
+    # be recreated with a value some client already holds an ETag for.
+    version = cache.get(LIST_VERSION_KEY)
+    if version is None:
+        version = uuid.uuid4().hex
+        cache.add(LIST_VERSION_KEY, version, None)
+        version = cache.get(LIST_VERSION_KEY, version)
+    return version
+
+
+async def aget_list_version():
+    version = await cache.aget(LIST_VERSION_KEY)
+    if version is None:
+        version = uuid.uuid4().hex
+        await cache.aadd(LIST_VERSION_KEY, version, None)
+        version = await cache.aget(LIST_VERSION_KEY, version)
+    return version
+
+
+def _book_list_key(version, request):
+    # The path is part of the key because pagination links are absolute URLs.
+    query = request.META.get('QUERY_STRING', '')
+    return 'books:list:' + hashlib.md5(f'{version}|{request.get_host()}|{request.path}|{query}'.encode()).hexdigest()
+
+
+def _book_list_entry(version, request, payload, last_modified):
+    return {
+        'data': {**payload, 'results': [dict(row) for row in payload['results']]},
+        'etag': make_etag(version, request.get_host(), request.path, request.META.get('QUERY_STRING', '')),
+        'last_modified': int(last_modified.timestamp()) if last_modified else None,
+        'validate_last_modified': False,
+    }
+
+
+def get_cached_book_list(request, build_page):
+    """
+    Cached book list pages, keyed by the list version and the full URL.
+
+    build_page() must return (payload, last_modified) where last_modified is
+    the newest updated_at on the page, or None for an empty page. Deleting a
+    book doesn't move that timestamp, so list pages are only revalidated
+    by ETag; Last-Modified is informational.
+    """
+    version = get_list_version()
+    key = _book_list_key(version, request)
+    entry = cache.get(key)
+    if entry is None:
+        payload, last_modified = build_page()
+        entry = _book_list_entry(version, request, payload, last_modified)
+        cache.set(key, entry, settings.BOOK_CACHE_TIMEOUT)
+    return entry
+
+
+async def aget_cached_book_list(request, build_page):
+    """Async get_cached_book_list(); build_page() must be a coroutine function."""
+    version = await aget_list_version()
+    key = _book_list_key(version, request)
+    entry = await cache.aget(key)
+    if entry is None:
+        payload, last_modified = await build_page()
+        entry = _book_list_entry(version, request, payload, last_modified)
+        await cache.aset(key, entry, settings.BOOK_CACHE_TIMEOUT)
+    return entry
+
+
+def cached_response(request, entry):
+    """
+    Answer with 304 when the client's validators match, else the cached body.
+    Entries hold data rather than rendered bytes, so the ETag sent is the
+    entry's combined with the negotiated media type: the JSON and browsable
+    API renderings of one entry must not validate each other.
+    """
+    etag = make_etag(entry['etag'], getattr(request, 'accepted_media_type', ''))
+    headers = {'ETag': etag}
+    if entry['last_modified'] is not None:
+        headers['Last-Modified'] = http_date(entry['last_modified'])
+
+    not_modified = get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=entry['last_modified'] if entry['validate_last_modified'] else None,
+    )
+    response = not_modified if not_modified is not None else Response(entry['data'])
+    for header, value in headers.items():
+        response[header] = value
+    patch_vary_headers(response, ['Accept'])
+    return response
+
+
+def invalidate_book_caches(book_ids=()):
+    """Drop cached detail entries for the given books and every list page."""
+    if book_ids:
+        cache.delete_many([book_cache_key(pk) for pk in book_ids])
+    cache.set(LIST_VERSION_KEY, uuid.uuid4().hex, None)
+    invalidate_book_facets()
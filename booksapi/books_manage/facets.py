@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+from django.db.models.functions import ExtractYear
+from .models import Book
+
+FACETS_CACHE_KEY = 'books:facets'
+
+
+def compute_book_facets():
+    genres = (
+        Book.objects.values('genre')
+        .annotate(count=Count('id'))
+        .order_by('-count', 'genre')
+    )
+    years = (
+        Book.objects.annotate(year=ExtractYear('publication_date'))
+        .values('year')
+        .annotate(count=Count('id'))
+        .order_by('-year')
+    )
+    return {
+        'genres': list(genres),
+        'years': list(years),
+    }
+
+
+def get_book_facets():
+    """Per-genre and per-year counts, served from the cache between writes."""
+    facets = cache.get(FACETS_CACHE_KEY)
+    if facets is None:
+        facets = compute_book_facets()
+        cache.set(FACETS_CACHE_KEY, facets, settings.BOOK_FACETS_CACHE_TIMEOUT)
+    return facets
+
+
+def invalidate_book_facets():
+    cache.delete(FACETS_CACHE_KEY)
@@ -0,0 +1,48 @@
+"""
+Sparse fieldsets for book responses.
+
+?fields=title,authors keeps only the listed book fields and ?omit=description
+drops the listed ones. The same choice is pushed into the query, through
+values() on the row read path and defer() elsewhere, so columns the
+client didn't ask for are never read.
+"""
+from rest_framework.exceptions import ValidationError
+from .models import Book
+
+BOOK_FIELDS = ('id', 'title', 'authors', 'genre', 'publication_date', 'description', 'created_by', 'created_at', 'updated_at')
+# Always read: pagination cursors, Last-Modified and ETags are built from them.
+ALWAYS_LOADED = ('id', 'created_at', 'updated_at')
+
+
+def book_fieldset(params):
+    """
+    The book fields requested with ?fields= or ?omit=, or None when the
+    client wants them all. Raises ValidationError for unknown names.
+    """
+    fields, omit = params.get('fields'), params.get('omit')
+    if fields is None and omit is None:
+        return None
+    if fields is not None and omit is not None:
+        raise ValidationError({"fields": "Use either 'fields' or 'omit', not both."})
+
+    param = 'fields' if fields is not None else 'omit'
+    names = [name.strip() for name in (fields if fields is not None else omit).split(',') if name.strip()]
+    unknown = sorted(set(names) - set(BOOK_FIELDS))
+    if unknown:
+        raise ValidationError({param: f"Unknown fields: {', '.join(unknown)}. Choose from: {', '.join(BOOK_FIELDS)}."})
+    if fields is not None:
+        return tuple(name for name in BOOK_FIELDS if name in names)
+    return tuple(name for name in BOOK_FIELDS if name not in names)
+
+
+def deferred_book_columns(fieldset, prefix=''):
+    """Book columns to defer() for a fieldset, optionally through a relation prefix like 'book__'."""
+    if fieldset is None:
+        return []
+    return [prefix + field.name for field in Book._meta.concrete_fields
+            if field.name not in fieldset and field.name not in ALWAYS_LOADED]
+
+
+def apply_book_fieldset(queryset, fieldset, prefix=''):
+    deferred = deferred_book_columns(fieldset, prefix)
+    return queryset.defer(*deferred) if deferred else queryset
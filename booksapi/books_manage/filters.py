@@ -0,0 +1,54 @@
+import datetime
+from django.utils.dateparse import parse_date
+from rest_framework.exceptions import ValidationError
+
+
+def _date_param(params, name, end_of_year=False):
+    """Parse a YYYY-MM-DD date, or a bare YYYY year as its first/last day."""
+    value = params.get(name)
+    if not value:
+        return None
+    if len(value) == 4 and value.isdigit():
+        year = int(value)
+        return datetime.date(year, 12, 31) if end_of_year else datetime.date(year, 1, 1)
+    try:
+        parsed = parse_date(value)
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise ValidationError({name: "Enter a date in YYYY-MM-DD format or a four digit year."})
+    return parsed
+
+
+def filter_books(queryset, params):
+    """
+    Apply the catalog filters from the query string. Each filter is an
+    equality or range match on the leading columns of a Book index:
+
+    - genre, authors: exact match
+    - created_by: user id
+    - published_after, published_before: inclusive dates or years
+    """
+    genre = params.get('genre')
+    if genre:
+        queryset = queryset.filter(genre=genre)
+
+    authors = params.get('authors')
+    if authors:
+        queryset = queryset.filter(authors=authors)
+
+    created_by = params.get('created_by')
+    if created_by:
+        if not created_by.isdigit():
+            raise ValidationError({"created_by": "Must be a user id."})
+        queryset = queryset.filter(created_by_id=int(created_by))
+
+    published_after = _date_param(params, 'published_after')
+    if published_after:
+        queryset = queryset.filter(publication_date__gte=published_after)
+
+    published_before = _date_param(params, 'published_before', end_of_year=True)
+    if published_before:
+        queryset = queryset.filter(publication_date__lte=published_before)
+
+    return queryset
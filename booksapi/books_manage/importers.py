@@ -0,0 +1,111 @@
+import logging
+from django.db import IntegrityError, transaction
+from booksapi.feeds import IMPORT_FORMATS, detect_import_format, iter_decoded_lines, parse_csv, parse_ndjson
+from .caching import invalidate_book_caches
+from .models import Book, normalize_book_key
+from .serializers import DUPLICATE_BOOK_ERROR, BookImportRowSerializer
+from .stats import adjust_library_stats
+from .typeahead import typeahead_index
+
+logger = logging.getLogger(__name__)
+
+
+class BookImporter:
+    """
+    Validates and inserts a stream of book rows in fixed-size batches.
+
+    Each batch costs one duplicate-check query and one bulk INSERT, and only
+    the current batch plus a capped error list is ever held in memory.
+    """
+
+    def __init__(self, created_by=None, batch_size=500, max_reported_errors=1000):
+        self.created_by = created_by
+        self.batch_size = batch_size
+        self.max_reported_errors = max_reported_errors
+        self.processed = 0
+        self.created = 0
+        self.duplicates = 0
+        self.invalid = 0
+        self.errors = []
+        self.errors_truncated = False
+
+    def _report_error(self, line_number, errors):
+        if len(self.errors) < self.max_reported_errors:
+            self.errors.append({"line": line_number, "errors": errors})
+        else:
+            self.errors_truncated = True
+
+    def _flush(self, batch, retry=True):
+        if not batch:
+            return
+        keyed = [(line_number, data, normalize_book_key(data['title'], data['authors'])) for line_number, data in batch]
+        existing = set(
+            Book.objects.filter(dedupe_key__in={key for _, _, key in keyed}).values_list('dedupe_key', flat=True)
+        )
+
+        books, duplicates = [], []
+        for line_number, data, key in keyed:
+            if key in existing:
+                duplicates.append(line_number)
+                continue
+            existing.add(key)
+            books.append(Book(created_by=self.created_by, dedupe_key=key, **data))
+
+        try:
+            with transaction.atomic():
+                Book.objects.bulk_create(books)
+                adjust_library_stats(self.created_by.pk if self.created_by else None, books_added=len(books))
+        except IntegrityError:
+            if not retry:
+                raise
+            # A concurrent writer inserted one of these books after the
+            # duplicate check; check again against the committed rows.
+            self._flush(batch, retry=False)
+            return
+
+        self.created += len(books)
+        self.duplicates += len(duplicates)
+        for line_number in duplicates:
+            self._report_error(line_number, {"title": [DUPLICATE_BOOK_ERROR]})
+
+    def run(self, rows):
+        """Consume (line_number, row, error) tuples and return the report."""
+        batch = []
+        for line_number, row, error in rows:
+            self.processed += 1
+            if error is None:
+                serializer = BookImportRowSerializer(data=row)
+                if serializer.is_valid():
+                    batch.append((line_number, serializer.validated_data))
+                else:
+                    error = serializer.errors
+            if error is not None:
+                self.invalid += 1
+                self._report_error(line_number, error)
+            if len(batch) >= self.batch_size:
+                self._flush(batch)
+                batch = []
+        self._flush(batch)
+
+        if self.created:
+            # bulk_create doesn't send post_save, so invalidate explicitly.
+            invalidate_book_caches()
+            typeahead_index.invalidate()
+        logger.info("Book import finished: %s created, %s duplicates, %s invalid", self.created, self.duplicates, self.invalid)
+        return self.report()
+
+    def report(self):
+        return {
+            "processed": self.processed,
+            "created": self.created,
+            "duplicates": self.duplicates,
+            "invalid": self.invalid,
+            "errors": sorted(self.errors, key=lambda error: error["line"]),
+            "errors_truncated": self.errors_truncated,
+        }
+
+
+def import_books(byte_lines, import_format, **kwargs):
+    lines = iter_decoded_lines(byte_lines)
+    rows = parse_csv(lines, null_if_blank=('description',)) if import_format == 'csv' else parse_ndjson(lines)
+    return BookImporter(**kwargs).run(rows)
@@ -0,0 +1,95 @@
+import json
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from authentication.backends import user_cache
+from authentication.blacklist import blacklist_index
+from books_manage.benchmarking import SCENARIOS, compare_to_baseline, missing_scenarios, run_benchmark
+from books_manage.seeding import seed_data
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark every API route in-process against a throwaway test database "
+        "seeded with synthetic data. Reports p50/p95/p99 latency, throughput and "
+        "query counts, and fails when a run regresses against --baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50, help="Timed requests per scenario.")
+        parser.add_argument('--warmup', type=int, default=3, help="Untimed requests per scenario first.")
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--books', type=int, default=1000)
+        parser.add_argument('--lists-per-user', type=float, default=2)
+        parser.add_argument('--items-per-list', type=float, default=15)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--only', nargs='+', help="Scenario keys ('GET book-detail') or URL names to run.")
+        parser.add_argument('--output', help="Write results as JSON, e.g. to use as a later --baseline.")
+        parser.add_argument('--baseline', help="JSON results of an earlier run to compare against.")
+        parser.add_argument('--threshold', type=float, default=0.25,
+                            help="Allowed p95 growth over the baseline, as a fraction (default 0.25).")
+        parser.add_argument('--min-delta-ms', type=float, default=2.0,
+                            help="Ignore p95 growth smaller than this many milliseconds.")
+
+    def handle(self, *args, **options):
+        missing = missing_scenarios()
+        if missing:
+            raise CommandError(f"No benchmark scenario for: {', '.join(missing)}")
+        if options['iterations'] < 1:
+            raise CommandError("--iterations must be positive.")
+        baseline = None
+        if options['baseline']:
+            try:
+                with open(options['baseline']) as f:
+                    baseline = json.load(f)['results']
+            except (OSError, ValueError, KeyError) as e:
+                raise CommandError(f"Could not read baseline: {e}")
+
+        # Like the test runner, work on a fresh database and a private cache
+        # so runs are reproducible and never touch real data.
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'benchmark'}}):
+                cache.clear()
+                user_cache.clear_local()
+                blacklist_index.reset()
+                counts = seed_data(
+                    users=options['users'], books=options['books'], lists_per_user=options['lists_per_user'],
+                    items_per_list=options['items_per_list'], seed=options['seed'],
+                )
+                self.stdout.write(
+                    f"Seeded {counts['users']} users, {counts['books']} books, {counts['reading_lists']} lists, "
+                    f"{counts['reading_list_items']} items on {connection.vendor}."
+                )
+                results = run_benchmark(iterations=options['iterations'], warmup=options['warmup'], only=options['only'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            blacklist_index.reset()
+            user_cache.clear_local()
+
+        self.report(results)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump({'vendor': connection.vendor, 'options': {
+                    key: options[key] for key in ('iterations', 'users', 'books', 'lists_per_user', 'items_per_list', 'seed')
+                }, 'results': results}, f, indent=2, sort_keys=True)
+            self.stdout.write(f"Results written to {options['output']}.")
+
+        failures = [f"{key}: {result['error_count']} unexpected responses, e.g. {result['errors'][0]}"
+                    for key, result in results.items() if result['error_count']]
+        if baseline is not None:
+            failures += compare_to_baseline(results, baseline, options['threshold'], options['min_delta_ms'])
+        if failures:
+            for failure in failures:
+                self.stderr.write(failure)
+            raise CommandError(f"Benchmark failed with {len(failures)} problem(s).")
+        self.stdout.write(self.style.SUCCESS(f"Benchmarked {len(results)} of {len(SCENARIOS)} scenarios."))
+
+    def report(self, results):
+        self.stdout.write(f"{'scenario':<38} {'n':>4} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'req/s':>8} {'queries':>8}")
+        for key, result in results.items():
+            self.stdout.write(
+                f"{key:<38} {result['iterations']:>4} {result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f} "
+                f"{result['p99_ms']:>8.2f} {result['throughput_rps']:>8.1f} {result['queries_p50']:>8g}"
+            )
@@ -0,0 +1,78 @@
+import asyncio
+import statistics
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient
+from rest_framework_simplejwt.tokens import AccessToken
+from authentication.models import User
+from books_manage.benchmarking import percentile
+from books_manage.models import Book, ReadingList
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the sync and async read endpoints through Django's ASGI handler. "
+        "Each route is hit --requests times with --concurrency requests in flight, "
+        "against whatever data is in the configured database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--concurrency', type=int, default=50)
+        parser.add_argument('--username', help="Authenticate as this user; required for the reading list routes.")
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1 or options['concurrency'] < 1:
+            raise CommandError("--requests and --concurrency must be positive.")
+
+        headers = {}
+        routes = [('/api/books/', '/api/async/books/')]
+        book = Book.objects.order_by('id').first()
+        if book:
+            routes.append((f'/api/books/{book.id}/', f'/api/async/books/{book.id}/'))
+        if options['username']:
+            try:
+                user = User.objects.get(username=options['username'])
+            except User.DoesNotExist:
+                raise CommandError(f"User '{options['username']}' does not exist.")
+            headers['Authorization'] = f'Bearer {AccessToken.for_user(user)}'
+            routes.append(('/api/reading-lists/?expand=items', '/api/async/reading-lists/?expand=items'))
+            reading_list = ReadingList.objects.filter(user=user).order_by('id').first()
+            if reading_list:
+                routes.append((f'/api/reading-lists/{reading_list.id}/items/', f'/api/async/reading-lists/{reading_list.id}/items/'))
+
+        self.stdout.write(f"{'route':<48} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+        for sync_path, async_path in routes:
+            for path in (sync_path, async_path):
+                result = asyncio.run(self.run_route(path, headers, options['requests'], options['concurrency']))
+                self.stdout.write(
+                    f"{path:<48} {result['throughput']:>9.1f} {result['p50']:>8.2f} "
+                    f"{result['p95']:>8.2f} {result['p99']:>8.2f} {result['errors']:>7}"
+                )
+
+    async def run_route(self, path, headers, total, concurrency):
+        client = AsyncClient()
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies, errors = [], 0
+
+        async def one():
+            nonlocal errors
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.get(path, headers=headers)
+                latencies.append((time.perf_counter() - started) * 1000)
+                if response.status_code != 200:
+                    errors += 1
+
+        # One warm-up request so both variants start with a filled cache.
+        await client.get(path, headers=headers)
+        started = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(total)))
+        elapsed = time.perf_counter() - started
+        return {
+            'throughput': total / elapsed,
+            'p50': statistics.median(latencies),
+            'p95': percentile(latencies, 95),
+            'p99': percentile(latencies, 99),
+            'errors': errors,
+        }
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from books_manage.benchmarking import benchmark_connections
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure the per-request cost of database connections: a new connection "
+        "per request, a persistent connection with health checks, and a psycopg "
+        "pool checkout on PostgreSQL. Each request runs a single query."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default', help="Database alias to measure.")
+        parser.add_argument('--number', type=int, default=200, help="Timed requests per mode.")
+        parser.add_argument('--warmup', type=int, default=5, help="Untimed requests per mode first.")
+
+    def handle(self, *args, **options):
+        if options['database'] not in connections:
+            raise CommandError(f"Unknown database alias: {options['database']}")
+        if options['number'] < 1 or options['warmup'] < 0:
+            raise CommandError("--number must be positive and --warmup not negative.")
+
+        results = benchmark_connections(options['database'], options['number'], options['warmup'])
+        self.stdout.write(f"{'mode':<12} {'p50 us':>10} {'p95 us':>10} {'saving us':>10}")
+        for mode, result in results.items():
+            self.stdout.write(f"{mode:<12} {result['p50_us']:>10.1f} {result['p95_us']:>10.1f} {result['saving_us']:>10.1f}")
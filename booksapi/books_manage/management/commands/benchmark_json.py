@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+from booksapi.fastjson import FastJSONParser, FastJSONRenderer, orjson
+from books_manage.benchmarking import benchmark_json, sample_payloads
+
+
+class Command(BaseCommand):
+    help = (
+        "Micro-benchmark the orjson-backed renderer and parser against DRF's "
+        "stdlib JSON classes on book list and reading list payloads, and check "
+        "that the rendered bytes are identical."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--books', type=int, default=100, help="Books per payload.")
+        parser.add_argument('--number', type=int, default=200, help="Timed calls per measurement.")
+
+    def handle(self, *args, **options):
+        if options['books'] < 1 or options['number'] < 1:
+            raise CommandError("--books and --number must be positive.")
+        if orjson is None:
+            self.stderr.write("orjson is not installed; the fast classes fall back to the stdlib.")
+
+        results = benchmark_json(FastJSONRenderer, FastJSONParser, sample_payloads(options['books']), options['number'])
+        self.stdout.write(f"{'payload':<14} {'bytes':>8} {'render us':>10} {'fast us':>9} {'speedup':>8} "
+                          f"{'parse us':>9} {'fast us':>9} {'speedup':>8} identical")
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name:<14} {result['bytes']:>8} {result['render_stdlib_us']:>10.1f} {result['render_fast_us']:>9.1f} "
+                f"{result['render_stdlib_us'] / result['render_fast_us']:>7.1f}x {result['parse_stdlib_us']:>9.1f} "
+                f"{result['parse_fast_us']:>9.1f} {result['parse_stdlib_us'] / result['parse_fast_us']:>7.1f}x "
+                f"{'yes' if result['identical'] else 'NO'}"
+            )
+        if not all(result['identical'] for result in results.values()):
+            raise CommandError("The fast renderer's output differs from JSONRenderer.")
@@ -0,0 +1,26 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+from books_manage.related import build_related_books
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the related books table from reading list co-occurrence. "
+        "Needs numpy and scipy; run it periodically, for example nightly."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=20, help="Related books stored per book.")
+        parser.add_argument('--min-shared', type=int, default=2, help="Reading lists two books must share to be related.")
+        parser.add_argument('--chunk-size', type=int, default=1000, help="Books whose co-occurrence rows are computed at once.")
+
+    def handle(self, *args, **options):
+        if min(options['top'], options['min_shared'], options['chunk_size']) < 1:
+            raise CommandError("--top, --min-shared and --chunk-size must be positive.")
+        try:
+            books, rows = build_related_books(
+                top_n=options['top'], min_shared=options['min_shared'], chunk_size=options['chunk_size'],
+            )
+        except ImproperlyConfigured as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(f"Stored {rows} related books for {books} books."))
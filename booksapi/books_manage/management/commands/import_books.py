@@ -0,0 +1,54 @@
+import sys
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from books_manage.importers import IMPORT_FORMATS, detect_import_format, import_books
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Import books from an NDJSON or CSV feed in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Feed file, or '-' to read from stdin.")
+        parser.add_argument('--format', dest='import_format', choices=IMPORT_FORMATS,
+                            help="Feed format. Defaults to the file extension.")
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--created-by', help="Username recorded as the creator of imported books.")
+        parser.add_argument('--max-errors', type=int, default=100, help="Maximum number of row errors to print.")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        import_format = options['import_format'] or detect_import_format(filename=path)
+        if import_format is None:
+            raise CommandError("Could not detect the feed format, pass --format.")
+
+        created_by = None
+        if options['created_by']:
+            try:
+                created_by = User.objects.get(username=options['created_by'])
+            except User.DoesNotExist:
+                raise CommandError(f"User '{options['created_by']}' does not exist.")
+
+        kwargs = {
+            'created_by': created_by,
+            'batch_size': options['batch_size'],
+            'max_reported_errors': options['max_errors'],
+        }
+        if path == '-':
+            report = import_books(sys.stdin.buffer, import_format, **kwargs)
+        else:
+            try:
+                with open(path, 'rb') as feed:
+                    report = import_books(feed, import_format, **kwargs)
+            except OSError as e:
+                raise CommandError(str(e))
+
+        for error in report['errors']:
+            self.stderr.write(f"line {error['line']}: {error['errors']}")
+        if report['errors_truncated']:
+            self.stderr.write("... more errors not shown")
+        self.stdout.write(self.style.SUCCESS(
+            f"Processed {report['processed']} rows: {report['created']} created, "
+            f"{report['duplicates']} duplicates, {report['invalid']} invalid."
+        ))
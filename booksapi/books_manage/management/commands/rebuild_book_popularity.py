@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand, CommandError
+from books_manage.popularity import rebuild_book_popularity
+
+
+class Command(BaseCommand):
+    help = (
+        "Recount the popular books leaderboard from reading list items, fix "
+        "drifted counts and drop daily buckets older than BOOK_POPULARITY_MAX_DAYS."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be positive.")
+        checked, corrected = rebuild_book_popularity(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Checked {checked} books, corrected {corrected}."))
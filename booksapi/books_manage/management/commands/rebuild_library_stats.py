@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+from authentication.models import User
+from books_manage.stats import rebuild_library_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Recount every user's library stats (books added, reading lists and "
+        "reading list items) and fix the stored counters that drifted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', action='append', dest='usernames', help="Only rebuild this user; can be repeated.")
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be positive.")
+        users = User.objects.order_by('id')
+        if options['usernames']:
+            users = users.filter(username__in=options['usernames'])
+            missing = set(options['usernames']) - set(users.values_list('username', flat=True))
+            if missing:
+                raise CommandError(f"Unknown users: {', '.join(sorted(missing))}")
+
+        checked, corrected = rebuild_library_stats(users.values_list('id', flat=True), batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Checked {checked} users, corrected {corrected}."))
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+from books_manage.seeding import SEED_PASSWORD, clear_seed_data, seed_data
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed synthetic users, books, reading lists and items for load testing. "
+        "Seeded usernames start with 'seed' and share one password."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--books', type=int, default=2000)
+        parser.add_argument('--lists-per-user', type=float, default=2, help="Mean reading lists per user.")
+        parser.add_argument('--items-per-list', type=float, default=15, help="Mean items per reading list.")
+        parser.add_argument('--seed', type=int, default=42, help="Random seed; the same seed gives the same data.")
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--clear', action='store_true', help="Delete previously seeded data instead of seeding.")
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            result = clear_seed_data()
+            self.stdout.write(self.style.SUCCESS(f"Deleted {result['deleted_rows']} seeded rows."))
+            return
+        if min(options['users'], options['books'], options['lists_per_user'], options['items_per_list']) < 0:
+            raise CommandError("Volumes must not be negative.")
+
+        counts = seed_data(
+            users=options['users'],
+            books=options['books'],
+            lists_per_user=options['lists_per_user'],
+            items_per_list=options['items_per_list'],
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {counts['users']} users, {counts['books']} books, {counts['reading_lists']} reading lists "
+            f"and {counts['reading_list_items']} reading list items. Seeded users log in with '{SEED_PASSWORD}'."
+        ))
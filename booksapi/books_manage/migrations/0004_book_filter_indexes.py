@@ -0,0 +1,31 @@
+# Generated by Django 5.2.4 on 2026-10-18 05:25
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books_manage', '0003_book_full_text_search'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['genre', 'publication_date'], name='books_genre_pubdate_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['authors', 'publication_date'], name='books_authors_pubdate_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['publication_date'], name='books_pubdate_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['created_by', 'created_at'], name='books_creator_created_idx'),
+        ),
+    ]
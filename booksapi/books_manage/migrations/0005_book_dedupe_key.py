@@ -0,0 +1,46 @@
+# Generated by Django 5.2.4 on 2026-10-18 05:28
+
+import hashlib
+from django.db import migrations, models
+
+
+def normalize_book_key(title, authors):
+    folded = [' '.join((value or '').split()).casefold() for value in (title, authors)]
+    return hashlib.sha256('\x1f'.join(folded).encode()).hexdigest()
+
+
+def populate_dedupe_keys(apps, schema_editor):
+    """
+    Key existing books. Rows that only differ by case or whitespace from an
+    older book predate the constraint, so they are left without a key.
+    """
+    Book = apps.get_model('books_manage', 'Book')
+    seen = set()
+    batch = []
+    for book in Book.objects.order_by('id').only('id', 'title', 'authors').iterator(chunk_size=2000):
+        key = normalize_book_key(book.title, book.authors)
+        if key in seen:
+            continue
+        seen.add(key)
+        book.dedupe_key = key
+        batch.append(book)
+        if len(batch) >= 2000:
+            Book.objects.bulk_update(batch, ['dedupe_key'])
+            batch = []
+    Book.objects.bulk_update(batch, ['dedupe_key'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books_manage', '0004_book_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='dedupe_key',
+            field=models.CharField(editable=False, max_length=64, null=True, unique=True),
+        ),
+        migrations.RunPython(populate_dedupe_keys, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.4 on 2026-10-18 05:53
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0002_token_blacklist_expiry_indexes'),
+        ('books_manage', '0005_book_dedupe_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserLibraryStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='library_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('books_added', models.PositiveIntegerField(default=0)),
+                ('reading_lists', models.PositiveIntegerField(default=0)),
+                ('reading_list_items', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'user_library_stats',
+            },
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 5.2.4 on 2026-10-18 05:55
+
+import datetime
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+
+def backfill_popularity(apps, schema_editor):
+    """Count existing reading list items; later changes are tracked as they happen."""
+    ReadingListItem = apps.get_model('books_manage', 'ReadingListItem')
+    BookPopularity = apps.get_model('books_manage', 'BookPopularity')
+    BookPopularityDaily = apps.get_model('books_manage', 'BookPopularityDaily')
+
+    totals = ReadingListItem.objects.values_list('book_id').annotate(count=Count('id')).order_by()
+    BookPopularity.objects.bulk_create(
+        (BookPopularity(book_id=book_id, list_count=count) for book_id, count in totals.iterator()),
+        batch_size=2000,
+    )
+    since = timezone.localdate() - datetime.timedelta(days=getattr(settings, 'BOOK_POPULARITY_MAX_DAYS', 90) - 1)
+    daily = (
+        ReadingListItem.objects.annotate(day=TruncDate('added_at')).filter(day__gte=since)
+        .values_list('book_id', 'day').annotate(count=Count('id')).order_by()
+    )
+    BookPopularityDaily.objects.bulk_create(
+        (BookPopularityDaily(book_id=book_id, day=day, added=count) for book_id, day, count in daily.iterator()),
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books_manage', '0006_user_library_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookPopularity',
+            fields=[
+                ('book', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='popularity', serialize=False, to='books_manage.book')),
+                ('list_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'book_popularity',
+                'indexes': [models.Index(fields=['-list_count', 'book'], name='book_popularity_rank_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='BookPopularityDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('added', models.PositiveIntegerField(default=0)),
+                ('book', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_popularity', to='books_manage.book')),
+            ],
+            options={
+                'db_table': 'book_popularity_daily',
+                'indexes': [models.Index(fields=['day', 'book'], name='book_popularity_day_idx')],
+                'constraints': [models.UniqueConstraint(fields=('book', 'day'), name='book_popularity_daily_uniq')],
+            },
+        ),
+        migrations.RunPython(backfill_popularity, migrations.RunPython.noop),
+    ]
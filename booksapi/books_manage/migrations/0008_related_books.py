@@ -0,0 +1,29 @@
+# Generated by Django 5.2.4 on 2026-10-18 05:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books_manage', '0007_book_popularity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RelatedBook',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField()),
+                ('shared_lists', models.PositiveIntegerField()),
+                ('book', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='related_books', to='books_manage.book')),
+                ('related', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='books_manage.book')),
+            ],
+            options={
+                'db_table': 'related_books',
+                'constraints': [models.UniqueConstraint(fields=('book', 'rank'), name='related_books_rank_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+from django.db import migrations
+
+# Prefix matches on lower(title) and lower(authors), used for typeahead when
+# the catalog is too large for the in-process index. text_pattern_ops lets
+# LIKE 'prefix%' use the index under any collation.
+POSTGRES_INSTALL_SQL = [
+    "CREATE INDEX IF NOT EXISTS books_title_prefix_idx ON books (lower(title) text_pattern_ops)",
+    "CREATE INDEX IF NOT EXISTS books_authors_prefix_idx ON books (lower(authors) text_pattern_ops)",
+]
+
+POSTGRES_UNINSTALL_SQL = [
+    "DROP INDEX IF EXISTS books_title_prefix_idx",
+    "DROP INDEX IF EXISTS books_authors_prefix_idx",
+]
+
+
+def install(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for sql in POSTGRES_INSTALL_SQL:
+            schema_editor.execute(sql)
+
+
+def uninstall(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for sql in POSTGRES_UNINSTALL_SQL:
+            schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books_manage', '0008_related_books'),
+    ]
+
+    operations = [
+        migrations.RunPython(install, uninstall),
+    ]
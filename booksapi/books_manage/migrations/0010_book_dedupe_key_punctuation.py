@@ -0,0 +1,54 @@
+# Generated by Django 5.2.4 on 2026-10-18 07:10
+
+import hashlib
+import re
+from django.db import migrations
+
+
+def normalize_book_key(title, authors):
+    folded = [' '.join(re.findall(r'\w+', (value or '').casefold())) for value in (title, authors)]
+    return hashlib.sha256('\x1f'.join(folded).encode()).hexdigest()
+
+
+def whitespace_book_key(title, authors):
+    """The key before this migration, which kept punctuation."""
+    folded = [' '.join((value or '').split()).casefold() for value in (title, authors)]
+    return hashlib.sha256('\x1f'.join(folded).encode()).hexdigest()
+
+
+def rekey_books(apps, schema_editor, normalize_book_key=normalize_book_key):
+    """
+    Recompute every key now that punctuation is folded too. Keys are cleared
+    first, so a new key can't collide with an old one mid-way. As in 0005,
+    books that now match an older book are left without a key.
+    """
+    Book = apps.get_model('books_manage', 'Book')
+    Book.objects.update(dedupe_key=None)
+    seen = set()
+    batch = []
+    for book in Book.objects.order_by('id').only('id', 'title', 'authors').iterator(chunk_size=2000):
+        key = normalize_book_key(book.title, book.authors)
+        if key in seen:
+            continue
+        seen.add(key)
+        book.dedupe_key = key
+        batch.append(book)
+        if len(batch) >= 2000:
+            Book.objects.bulk_update(batch, ['dedupe_key'])
+            batch = []
+    Book.objects.bulk_update(batch, ['dedupe_key'])
+
+
+def restore_whitespace_keys(apps, schema_editor):
+    rekey_books(apps, schema_editor, whitespace_book_key)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books_manage', '0009_book_prefix_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(rekey_books, restore_whitespace_keys),
+    ]
@@ -1,6 +1,18 @@
+import hashlib
+import re
 from django.db import models
 from authentication.models import User
 
+
+def normalize_book_key(title, authors):
+    """
+    Uniqueness key for a book: the words of its title and authors with case,
+    punctuation and whitespace folded, hashed so the unique index stays small.
+    """
+    folded = [' '.join(re.findall(r'\w+', (value or '').casefold())) for value in (title, authors)]
+    return hashlib.sha256('\x1f'.join(folded).encode()).hexdigest()
+
+
 class Book(models.Model):
     title = models.CharField(max_length=255)
     authors = models.CharField(max_length=255)
@@ -10,9 +22,26 @@ class Book(models.Model):
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='books')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    dedupe_key = models.CharField(max_length=64, unique=True, null=True, editable=False)
 
     class Meta:
         db_table = 'books'
+        indexes = [
+            # Keyset pagination walks the catalog in (created_at, id) order.
+            models.Index(fields=['created_at', 'id'], name='books_created_id_idx'),
+            # Catalog filters and facet counts.
+            models.Index(fields=['genre', 'publication_date'], name='books_genre_pubdate_idx'),
+            models.Index(fields=['authors', 'publication_date'], name='books_authors_pubdate_idx'),
+            models.Index(fields=['publication_date'], name='books_pubdate_idx'),
+            models.Index(fields=['created_by', 'created_at'], name='books_creator_created_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.dedupe_key = normalize_book_key(self.title, self.authors)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'title', 'authors'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'dedupe_key'}
+        super().save(*args, **kwargs)
 
 class ReadingList(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='reading_lists')
@@ -35,3 +64,68 @@ class ReadingListItem(models.Model):
         db_table = 'reading_list_items'
         unique_together = ('reading_list', 'book')
         ordering = ['order']
+
+
+class UserLibraryStats(models.Model):
+    """
+    Denormalized per-user counters for the profile screen, kept in step
+    with writes by books_manage.stats and repaired by rebuild_library_stats.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='library_stats')
+    books_added = models.PositiveIntegerField(default=0)
+    reading_lists = models.PositiveIntegerField(default=0)
+    reading_list_items = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'user_library_stats'
+
+
+class BookPopularity(models.Model):
+    """
+    How many reading lists contain each book, kept in step with reading
+    list items by books_manage.popularity. The index serves the top-K
+    leaderboard without touching reading_list_items.
+    """
+    book = models.OneToOneField(Book, on_delete=models.CASCADE, primary_key=True, related_name='popularity')
+    list_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = 'book_popularity'
+        indexes = [
+            models.Index(fields=['-list_count', 'book'], name='book_popularity_rank_idx'),
+        ]
+
+
+class BookPopularityDaily(models.Model):
+    """Reading list additions per book and day, still in their lists, for windowed leaderboards."""
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='daily_popularity')
+    day = models.DateField()
+    added = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = 'book_popularity_daily'
+        constraints = [
+            models.UniqueConstraint(fields=['book', 'day'], name='book_popularity_daily_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['day', 'book'], name='book_popularity_day_idx'),
+        ]
+
+
+class RelatedBook(models.Model):
+    """
+    A book's nearest neighbours by reading list co-occurrence, ranked from
+    1 by score. Rebuilt offline by books_manage.related.build_related_books.
+    """
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='related_books')
+    related = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='+')
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+    shared_lists = models.PositiveIntegerField()
+
+    class Meta:
+        db_table = 'related_books'
+        constraints = [
+            models.UniqueConstraint(fields=['book', 'rank'], name='related_books_rank_uniq'),
+        ]
@@ -0,0 +1,142 @@
+"""
+Sparse ordering for reading list items.
+
+Items are spaced ORDER_GAP apart, so a new or moved item can take the
+midpoint between its neighbours and only that one row is written. The
+whole list is renumbered only when two neighbours have no gap left.
+"""
+from django.db.models import Max
+from rest_framework.exceptions import ValidationError
+from .models import ReadingListItem
+from .popularity import record_item_changes
+from .stats import adjust_library_stats
+
+ORDER_GAP = 1024
+# PositiveIntegerField is a 32-bit signed integer on PostgreSQL.
+MAX_ORDER = 2 ** 31 - 1
+
+END = object()
+
+
+def next_order(reading_list):
+    """Order value that appends an item to the end of the list."""
+    last = reading_list.items.aggregate(last=Max('order'))['last']
+    return ORDER_GAP if last is None else last + ORDER_GAP
+
+
+class ReadingListOrdering:
+    """
+    In-memory plan of a reading list's order, built from its current items.
+    Records which items were added, removed or renumbered, so the caller
+    can persist the result with one bulk_create and one bulk_update.
+    """
+
+    def __init__(self, items):
+        self.items = sorted(items, key=lambda item: (item.order, item.id or 0))
+        self.by_book = {item.book_id: item for item in self.items}
+        self.added = []
+        self.removed = []
+        self.changed = set()
+
+    def __contains__(self, book_id):
+        return book_id in self.by_book
+
+    def _index_after(self, after):
+        if after is END:
+            return len(self.items)
+        if after is None:
+            return 0
+        return self.items.index(self.by_book[after]) + 1
+
+    def _renumber(self):
+        for position, item in enumerate(self.items, start=1):
+            if item.order != position * ORDER_GAP:
+                item.order = position * ORDER_GAP
+                self._mark_changed(item)
+
+    def _mark_changed(self, item):
+        if item.pk is not None:
+            self.changed.add(item)
+
+    def _place(self, item, after):
+        index = self._index_after(after)
+        lower = self.items[index - 1].order if index > 0 else 0
+        if index < len(self.items):
+            upper = self.items[index].order
+            order = (lower + upper) // 2 if upper - lower >= 2 else None
+        else:
+            order = lower + ORDER_GAP if lower + ORDER_GAP <= MAX_ORDER else None
+
+        self.items.insert(index, item)
+        if order is None:
+            self._renumber()
+        else:
+            item.order = order
+            self._mark_changed(item)
+
+    def add(self, item, after=END):
+        self.by_book[item.book_id] = item
+        self.added.append(item)
+        self._place(item, after)
+
+    def remove(self, book_id):
+        item = self.by_book.pop(book_id)
+        self.items.remove(item)
+        if item.pk is not None:
+            self.changed.discard(item)
+            self.removed.append(item)
+        else:
+            self.added.remove(item)
+
+    def move(self, book_id, after=END):
+        item = self.by_book[book_id]
+        if after == book_id:
+            return
+        self.items.remove(item)
+        self._place(item, after)
+
+
+def apply_item_batch(reading_list, operations):
+    """
+    Apply validated removes, then adds, then moves to a reading list and
+    write them with at most one DELETE, one bulk INSERT and one bulk UPDATE.
+    Call inside a transaction holding a lock on the reading list row.
+    Raises ValidationError, before writing anything, if an operation
+    refers to a book that is not (or already is) in the list.
+    """
+    items = reading_list.items.only('id', 'reading_list_id', 'book_id', 'order', 'added_at')
+    ordering = ReadingListOrdering(items)
+
+    def anchor(op, key, index):
+        after = op.get('after', END)
+        if after not in (END, None) and after not in ordering:
+            raise ValidationError({key: {index: f"Book {after} is not in this reading list."}})
+        return after
+
+    for index, book_id in enumerate(operations.get('remove', [])):
+        if book_id not in ordering:
+            raise ValidationError({"remove": {index: f"Book {book_id} is not in this reading list."}})
+        ordering.remove(book_id)
+
+    for index, op in enumerate(operations.get('add', [])):
+        if op['book_id'] in ordering:
+            raise ValidationError({"add": {index: f"Book {op['book_id']} is already in this reading list."}})
+        ordering.add(ReadingListItem(reading_list=reading_list, book_id=op['book_id']), anchor(op, 'add', index))
+
+    for index, op in enumerate(operations.get('move', [])):
+        if op['book_id'] not in ordering:
+            raise ValidationError({"move": {index: f"Book {op['book_id']} is not in this reading list."}})
+        ordering.move(op['book_id'], anchor(op, 'move', index))
+
+    if ordering.removed:
+        ReadingListItem.objects.filter(pk__in=[item.pk for item in ordering.removed]).delete()
+    if ordering.added:
+        ReadingListItem.objects.bulk_create(ordering.added)
+    if ordering.changed:
+        ReadingListItem.objects.bulk_update(list(ordering.changed), ['order'])
+    adjust_library_stats(reading_list.user_id, reading_list_items=len(ordering.added) - len(ordering.removed))
+    record_item_changes(
+        added=[(item.book_id, item.added_at) for item in ordering.added],
+        removed=[(item.book_id, item.added_at) for item in ordering.removed],
+    )
+    return ordering
@@ -0,0 +1,79 @@
+from django.core.paginator import InvalidPage
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.response import Response
+
+
+class BookPageNumberPagination(PageNumberPagination):
+    """Page-number pagination, newest first like the cursor mode unless the queryset is already ordered."""
+    ordering = ('-created_at', '-id')
+    page_size = 10
+
+    def ordered(self, queryset):
+        return queryset if queryset.ordered else queryset.order_by(*self.ordering)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return super().paginate_queryset(self.ordered(queryset), request, view)
+
+    async def apaginate_queryset(self, queryset, request):
+        """paginate_queryset() for async views: the count and the page are read with the async ORM."""
+        queryset = self.ordered(queryset)
+        paginator = self.django_paginator_class(queryset, self.get_page_size(request))
+        # Paginator.count is a cached_property; setting it skips the sync count().
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            number = paginator.validate_number(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(page_number=page_number, message=str(exc)))
+
+        bottom = (number - 1) * paginator.per_page
+        top = bottom + paginator.per_page
+        if top + paginator.orphans >= paginator.count:
+            top = paginator.count
+        object_list = [obj async for obj in queryset[bottom:top]]
+        self.page = paginator._get_page(object_list, number, paginator)
+        self.request = request
+        return list(self.page)
+
+
+class BookCursorPagination(CursorPagination):
+    """
+    Cursor pagination over the book catalog, newest first.
+
+    DRF's cursor holds only the created_at of the page boundary plus an
+    offset past the rows that share it; id only breaks ties in the ORDER BY.
+    Each page filters on created_at through books_created_id_idx and skips
+    just those tied rows, instead of OFFSET-scanning every earlier page, so
+    deep pages cost the same as the first unless many books share a
+    created_at. The total count is only computed when the client asks for
+    it with ?count=true.
+    """
+    ordering = ('-created_at', '-id')
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    count_query_param = 'count'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.include_count = request.query_params.get(self.count_query_param, '').lower() in ('1', 'true', 'yes')
+        self.count = queryset.count() if self.include_count else None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        payload = {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        }
+        if self.include_count:
+            payload = {'count': self.count, **payload}
+        return Response(payload)
+
+
+def wants_cursor_pagination(request):
+    """Cursor mode is selected with ?pagination=cursor or by passing a cursor."""
+    return (
+        request.query_params.get('pagination') == 'cursor'
+        or BookCursorPagination.cursor_query_param in request.query_params
+    )
@@ -0,0 +1,129 @@
+"""
+Popular books leaderboard.
+
+BookPopularity holds how many reading lists contain each book, and
+BookPopularityDaily how many of those items were added on each day. Both
+are adjusted in the transaction that adds or removes items: a missing row
+is first inserted at zero (ignoring conflicts) and then incremented, so
+concurrent writers never lose an update. The hooks are the same as for
+the library stats (see stats.py); rebuild_book_popularity repairs drift
+and drops buckets older than BOOK_POPULARITY_MAX_DAYS.
+"""
+import datetime
+from collections import Counter, defaultdict
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum, Value
+from django.db.models.functions import Greatest, TruncDate
+from django.utils import timezone
+from .models import Book, BookPopularity, BookPopularityDaily, ReadingListItem
+from .typeahead import typeahead_index
+
+
+def _day(added_at):
+    return timezone.localdate(added_at) if timezone.is_aware(added_at) else added_at.date()
+
+
+def _apply(model, key_filters, counts, counter):
+    """Add each delta in counts to the counter column, with one UPDATE per distinct delta."""
+    by_delta = defaultdict(list)
+    for key, delta in counts.items():
+        if delta:
+            by_delta[delta].append(key)
+    for delta, keys in by_delta.items():
+        update = F(counter) + delta if delta > 0 else Greatest(F(counter) + delta, Value(0))
+        model.objects.filter(key_filters(keys)).update(**{counter: update})
+
+
+def _book_filter(book_ids):
+    return Q(book_id__in=book_ids)
+
+
+def _bucket_filter(keys):
+    query = Q()
+    for book_id, day in keys:
+        query |= Q(book_id=book_id, day=day)
+    return query
+
+
+def record_item_changes(added=(), removed=()):
+    """
+    Count reading list items added or removed, each given as a
+    (book_id, added_at) pair. Call inside the transaction of the write.
+    """
+    totals, buckets = Counter(), Counter()
+    oldest = timezone.localdate() - datetime.timedelta(days=settings.BOOK_POPULARITY_MAX_DAYS - 1)
+    for sign, items in ((1, added), (-1, removed)):
+        for book_id, added_at in items:
+            totals[book_id] += sign
+            day = _day(added_at)
+            if day >= oldest:
+                buckets[book_id, day] += sign
+
+    new_books = [book_id for book_id, delta in totals.items() if delta > 0]
+    if new_books:
+        BookPopularity.objects.bulk_create([BookPopularity(book_id=book_id) for book_id in new_books], ignore_conflicts=True)
+    new_buckets = [key for key, delta in buckets.items() if delta > 0]
+    if new_buckets:
+        BookPopularityDaily.objects.bulk_create(
+            [BookPopularityDaily(book_id=book_id, day=day) for book_id, day in new_buckets], ignore_conflicts=True,
+        )
+    _apply(BookPopularity, _book_filter, totals, 'list_count')
+    _apply(BookPopularityDaily, _bucket_filter, buckets, 'added')
+    if any(totals.values()):
+        transaction.on_commit(typeahead_index.popularity_changed)
+
+
+def popular_books(limit, days=None):
+    """
+    [(book_id, count)] for the top books: by reading lists containing them,
+    or with days, by additions in the last days days that are still listed.
+    """
+    if days is None:
+        ranked = BookPopularity.objects.filter(list_count__gt=0).order_by('-list_count', 'book_id')
+        return list(ranked.values_list('book_id', 'list_count')[:limit])
+    since = timezone.localdate() - datetime.timedelta(days=days - 1)
+    ranked = (
+        BookPopularityDaily.objects.filter(day__gte=since)
+        .values_list('book_id').annotate(count=Sum('added')).filter(count__gt=0)
+        .order_by('-count', 'book_id')
+    )
+    return list(ranked[:limit])
+
+
+def rebuild_book_popularity(batch_size=2000):
+    """
+    Recount both tables from reading_list_items, a batch of books at a time,
+    and delete buckets older than BOOK_POPULARITY_MAX_DAYS. Each batch locks
+    its BookPopularity rows first, so concurrent item changes are applied
+    either before the count or on top of it. Returns (books, corrected).
+    """
+    oldest = timezone.localdate() - datetime.timedelta(days=settings.BOOK_POPULARITY_MAX_DAYS - 1)
+    BookPopularityDaily.objects.filter(day__lt=oldest).delete()
+
+    checked = corrected = 0
+    book_ids = list(Book.objects.order_by('id').values_list('id', flat=True))
+    for start in range(0, len(book_ids), batch_size):
+        batch = book_ids[start:start + batch_size]
+        with transaction.atomic():
+            stored = dict(BookPopularity.objects.select_for_update().filter(book_id__in=batch).values_list('book_id', 'list_count'))
+            items = ReadingListItem.objects.filter(book_id__in=batch)
+            counts = dict.fromkeys(batch, 0)
+            counts.update(items.values_list('book_id').annotate(count=Count('id')).order_by())
+            stale = [
+                BookPopularity(book_id=book_id, list_count=count) for book_id, count in counts.items()
+                if stored.get(book_id, 0) != count or (count and book_id not in stored)
+            ]
+            BookPopularity.objects.bulk_create(stale, update_conflicts=True, unique_fields=['book'], update_fields=['list_count'])
+
+            daily = (
+                items.annotate(day=TruncDate('added_at')).filter(day__gte=oldest)
+                .values_list('book_id', 'day').annotate(count=Count('id')).order_by()
+            )
+            BookPopularityDaily.objects.filter(book_id__in=batch).delete()
+            BookPopularityDaily.objects.bulk_create([
+                BookPopularityDaily(book_id=book_id, day=day, added=count) for book_id, day, count in daily
+            ])
+        checked += len(batch)
+        corrected += len(stale)
+    return checked, corrected
@@ -0,0 +1,115 @@
+"""
+Related books from reading list co-occurrence.
+
+Books that the same reading lists contain are related. The offline job
+builds the sparse book x reading list membership matrix M and computes
+the co-occurrence counts C = M @ M.T a chunk of books at a time, so only
+chunk_size rows of C are ever in memory. Counts are scored by cosine
+similarity, C[i, j] / sqrt(lists(i) * lists(j)), so books found in most
+lists don't become everyone's neighbour. The top N per book are stored in
+RelatedBook, which the read endpoints query by index.
+
+Only the job needs NumPy and SciPy; the read paths work without them.
+"""
+import itertools
+import logging
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.db.models import Count, Sum
+from .models import ReadingListItem, RelatedBook
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:  # pragma: no cover - only the offline job needs them
+    np = sparse = None
+
+logger = logging.getLogger(__name__)
+
+
+def membership_matrix():
+    """(book_ids, M): the sorted ids of listed books and their CSR book x reading list matrix."""
+    rows = ReadingListItem.objects.order_by().values_list('book_id', 'reading_list_id')
+    pairs = np.fromiter(itertools.chain.from_iterable(rows.iterator(chunk_size=20000)), dtype=np.int64).reshape(-1, 2)
+    book_ids, book_index = np.unique(pairs[:, 0], return_inverse=True)
+    list_ids, list_index = np.unique(pairs[:, 1], return_inverse=True)
+    membership = sparse.csr_matrix(
+        (np.ones(len(pairs), dtype=np.int32), (book_index, list_index)), shape=(len(book_ids), len(list_ids)),
+    )
+    return book_ids, membership
+
+
+def top_neighbours(counts, row, book, lists_per_book, top_n, min_shared):
+    """
+    (columns, scores, shared) of the top_n neighbours of book, which is row
+    row of the co-occurrence chunk counts, best first.
+    """
+    start, end = counts.indptr[row], counts.indptr[row + 1]
+    columns, shared = counts.indices[start:end], counts.data[start:end]
+    # A book always co-occurs with itself.
+    keep = (shared >= min_shared) & (columns != book)
+    columns, shared = columns[keep], shared[keep]
+    scores = shared / np.sqrt(lists_per_book[columns] * lists_per_book[book])
+    if len(scores) > top_n:
+        best = np.argpartition(-scores, top_n)[:top_n]
+        columns, shared, scores = columns[best], shared[best], scores[best]
+    # Best score first, ties broken by the lower book id.
+    order = np.lexsort((columns, -scores))
+    return columns[order], scores[order], shared[order]
+
+
+def build_related_books(top_n=20, min_shared=2, chunk_size=1000):
+    """
+    Recompute every book's top_n related books from reading list items and
+    replace the stored ones, one atomic batch per chunk of books. Pairs that
+    share fewer than min_shared lists are ignored. Returns (books, rows).
+    """
+    if np is None:
+        raise ImproperlyConfigured("Building related books requires numpy and scipy.")
+
+    book_ids, membership = membership_matrix()
+    lists_per_book = np.diff(membership.indptr).astype(np.float64)
+    transposed = membership.T.tocsr()
+    written = 0
+    for start in range(0, len(book_ids), chunk_size):
+        counts = (membership[start:start + chunk_size] @ transposed).tocsr()
+        related = []
+        for row in range(counts.shape[0]):
+            columns, scores, shared = top_neighbours(counts, row, start + row, lists_per_book, top_n, min_shared)
+            related.extend(
+                RelatedBook(book_id=int(book_ids[start + row]), related_id=int(book_ids[column]), rank=rank,
+                            score=round(float(score), 6), shared_lists=int(count))
+                for rank, (column, score, count) in enumerate(zip(columns, scores, shared), start=1)
+            )
+        with transaction.atomic():
+            RelatedBook.objects.filter(book_id__in=book_ids[start:start + chunk_size].tolist()).delete()
+            RelatedBook.objects.bulk_create(related, batch_size=2000)
+        written += len(related)
+        logger.debug("Related books written for %s of %s books", min(start + chunk_size, len(book_ids)), len(book_ids))
+
+    # Books that left every reading list keep no neighbours.
+    unlisted = sorted(set(RelatedBook.objects.values_list('book_id', flat=True).distinct()) - set(book_ids.tolist()))
+    for start in range(0, len(unlisted), chunk_size):
+        RelatedBook.objects.filter(book_id__in=unlisted[start:start + chunk_size]).delete()
+    return len(book_ids), written
+
+
+def related_books(book_id, limit):
+    """[(book_id, score, shared_lists)] for a book's stored neighbours, best first."""
+    ranked = RelatedBook.objects.filter(book_id=book_id).order_by('rank')
+    return list(ranked.values_list('related_id', 'score', 'shared_lists')[:limit])
+
+
+def recommended_books(reading_list_id, limit):
+    """
+    [(book_id, score, sources)]: the stored neighbours of a reading list's
+    books that aren't in it yet, scored by the sum of their similarities to
+    the sources, the listed books they are related to.
+    """
+    listed = ReadingListItem.objects.filter(reading_list_id=reading_list_id).values('book_id')
+    ranked = (
+        RelatedBook.objects.filter(book_id__in=listed).exclude(related_id__in=listed)
+        .values_list('related_id').annotate(total=Sum('score'), sources=Count('id'))
+        .order_by('-total', 'related_id')
+    )
+    return list(ranked[:limit])
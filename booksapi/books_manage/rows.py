@@ -0,0 +1,96 @@
+"""
+Serializer-free read path for large pages.
+
+RowSerializer is compiled once from a serializer instance into a flat list
+of (output name, values() column, conversion) entries, nested serializers
+included. Read views then fetch exactly those columns with values() and
+turn each row into the dict the serializer would have produced, without
+building model instances or running the serializer field by field.
+Strings, integers and primary keys are copied as is, dates and datetimes
+are formatted the way DateField and DateTimeField format them, and any
+other field falls back to its own to_representation().
+"""
+import datetime
+from functools import lru_cache
+from django.conf import settings
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.relations import PrimaryKeyRelatedField
+from rest_framework.settings import api_settings
+from booksapi.instrumentation import serializing
+from .serializers import BookSerializer, ReadingListItemSerializer
+
+PASSTHROUGH_FIELDS = (serializers.CharField, serializers.IntegerField, serializers.ReadOnlyField, PrimaryKeyRelatedField)
+
+# How a column becomes an output value.
+PASS, CALL, DATETIME, NESTED = range(4)
+
+
+def _compile_field(field):
+    if isinstance(field, PASSTHROUGH_FIELDS):
+        return PASS, None
+    if isinstance(field, serializers.DateTimeField) and not hasattr(field, 'timezone'):
+        if getattr(field, 'format', api_settings.DATETIME_FORMAT).lower() == ISO_8601:
+            # DateTimeField looks up the current timezone for every value;
+            # serialize() does it once per call instead.
+            return DATETIME, field.to_representation
+    if isinstance(field, serializers.DateField) and getattr(field, 'format', api_settings.DATE_FORMAT).lower() == ISO_8601:
+        return CALL, datetime.date.isoformat
+    return CALL, field.to_representation
+
+
+class RowSerializer:
+    """Read-only mirror of a serializer's output for values() rows."""
+
+    def __init__(self, serializer, prefix=''):
+        self.fields = []
+        self.columns = []
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            if isinstance(field, serializers.ListSerializer) or field.source == '*' or '.' in field.source:
+                raise ValueError(f"{type(serializer).__name__}.{name} can't be read from a values() row.")
+            if isinstance(field, serializers.Serializer):
+                nested = RowSerializer(field, prefix=f'{prefix}{field.source}__')
+                self.fields.append((name, None, NESTED, nested))
+                self.columns.extend(nested.columns)
+                continue
+            self.fields.append((name, prefix + field.source, *_compile_field(field)))
+            self.columns.append(prefix + field.source)
+
+    def values(self, queryset, *extra):
+        """queryset.values() for these columns, plus any extra ones the caller needs."""
+        return queryset.values(*dict.fromkeys([*self.columns, *extra]))
+
+    def to_representation(self, row, current_timezone=None):
+        data = {}
+        for name, column, kind, converter in self.fields:
+            if kind == NESTED:
+                data[name] = converter.to_representation(row, current_timezone)
+                continue
+            value = row[column]
+            if value is None or kind == PASS:
+                data[name] = value
+            elif kind == DATETIME and current_timezone is not None and value.tzinfo is not None:
+                value = value.astimezone(current_timezone).isoformat()
+                data[name] = value[:-6] + 'Z' if value.endswith('+00:00') else value
+            else:
+                data[name] = converter(value)
+        return data
+
+    def serialize(self, rows):
+        current_timezone = timezone.get_current_timezone() if settings.USE_TZ else None
+        with serializing():
+            return [self.to_representation(row, current_timezone) for row in rows]
+
+
+@lru_cache(maxsize=128)
+def book_rows(fieldset=None):
+    """RowSerializer for BookSerializer, limited to a fieldset from fieldsets.book_fieldset()."""
+    return RowSerializer(BookSerializer(fields=fieldset))
+
+
+@lru_cache(maxsize=128)
+def reading_list_item_rows(book_fields=None):
+    """RowSerializer for ReadingListItemSerializer with its embedded book limited to book_fields."""
+    return RowSerializer(ReadingListItemSerializer(book_fields=book_fields))
@@ -0,0 +1,157 @@
+import logging
+import re
+from django.db import connection
+from django.db.models import Q
+
+logger = logging.getLogger(__name__)
+
+# PostgreSQL: a weighted tsvector kept up to date by the database as a
+# generated column, with a GIN index over it.
+POSTGRES_INSTALL_SQL = [
+    """
+    ALTER TABLE books ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(authors, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(description, '')), 'C')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS books_search_vector_idx ON books USING GIN (search_vector)",
+]
+
+POSTGRES_UNINSTALL_SQL = [
+    "DROP INDEX IF EXISTS books_search_vector_idx",
+    "ALTER TABLE books DROP COLUMN IF EXISTS search_vector",
+]
+
+# SQLite: an external-content FTS5 table over books, kept in sync by triggers.
+SQLITE_TRIGGERS = ['books_fts_ai', 'books_fts_ad', 'books_fts_au']
+
+SQLITE_INSTALL_SQL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS books_fts USING fts5(
+        title, authors, description,
+        content='books', content_rowid='id',
+        tokenize='porter unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS books_fts_ai AFTER INSERT ON books BEGIN
+        INSERT INTO books_fts(rowid, title, authors, description)
+        VALUES (new.id, new.title, new.authors, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS books_fts_ad AFTER DELETE ON books BEGIN
+        INSERT INTO books_fts(books_fts, rowid, title, authors, description)
+        VALUES ('delete', old.id, old.title, old.authors, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS books_fts_au AFTER UPDATE ON books BEGIN
+        INSERT INTO books_fts(books_fts, rowid, title, authors, description)
+        VALUES ('delete', old.id, old.title, old.authors, old.description);
+        INSERT INTO books_fts(rowid, title, authors, description)
+        VALUES (new.id, new.title, new.authors, new.description);
+    END
+    """,
+    "INSERT INTO books_fts(books_fts) VALUES ('rebuild')",
+]
+
+SQLITE_UNINSTALL_SQL = [
+    "DROP TRIGGER IF EXISTS books_fts_ai",
+    "DROP TRIGGER IF EXISTS books_fts_ad",
+    "DROP TRIGGER IF EXISTS books_fts_au",
+    "DROP TABLE IF EXISTS books_fts",
+]
+
+
+def install_search_index(conn):
+    """Create the full-text index for the given connection's vendor."""
+    statements = {
+        'postgresql': POSTGRES_INSTALL_SQL,
+        'sqlite': SQLITE_INSTALL_SQL,
+    }.get(conn.vendor, [])
+    with conn.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def uninstall_search_index(conn):
+    statements = {
+        'postgresql': POSTGRES_UNINSTALL_SQL,
+        'sqlite': SQLITE_UNINSTALL_SQL,
+    }.get(conn.vendor, [])
+    with conn.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def ensure_search_index(sender, using='default', **kwargs):
+    """
+    post_migrate hook. SQLite rebuilds the books table for some schema changes,
+    which silently drops the FTS triggers, so reinstall and reindex if needed.
+    """
+    from django.db import connections
+
+    conn = connections[using]
+    if conn.vendor != 'sqlite':
+        return
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'books'"
+        )
+        existing = {row[0] for row in cursor.fetchall()}
+    if 'books' in conn.introspection.table_names() and not set(SQLITE_TRIGGERS) <= existing:
+        logger.info("Reinstalling books full-text index")
+        install_search_index(conn)
+
+
+def _fts5_query(query):
+    """Quote each term so user input can't inject FTS5 query syntax."""
+    terms = re.findall(r'\w+', query, re.UNICODE)
+    return ' '.join(f'"{term}"' for term in terms)
+
+
+def search_books(query, limit=20, offset=0):
+    """
+    Return a list of (book_id, rank) tuples, best match first.
+    Higher rank means a better match on every backend.
+    """
+    if connection.vendor == 'postgresql':
+        sql = """
+            SELECT id, ts_rank_cd(search_vector, query) AS rank
+            FROM books, websearch_to_tsquery('english', %s) query
+            WHERE search_vector @@ query
+            ORDER BY rank DESC, id DESC
+            LIMIT %s OFFSET %s
+        """
+        params = [query, limit, offset]
+    elif connection.vendor == 'sqlite':
+        match = _fts5_query(query)
+        if not match:
+            return []
+        # bm25() is lower-is-better, and weights title > authors > description.
+        sql = """
+            SELECT rowid, -bm25(books_fts, 10.0, 5.0, 1.0) AS rank
+            FROM books_fts
+            WHERE books_fts MATCH %s
+            ORDER BY rank DESC, rowid DESC
+            LIMIT %s OFFSET %s
+        """
+        params = [match, limit, offset]
+    else:
+        from .models import Book
+
+        logger.warning("No full-text index for %s, falling back to a scan", connection.vendor)
+        ids = (
+            Book.objects
+            .filter(Q(title__icontains=query) | Q(authors__icontains=query) | Q(description__icontains=query))
+            .order_by('-id')
+            .values_list('id', flat=True)[offset:offset + limit]
+        )
+        return [(book_id, 0.0) for book_id in ids]
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [(row[0], float(row[1])) for row in cursor.fetchall()]
@@ -0,0 +1,177 @@
+"""
+Synthetic data for local load testing and benchmarks.
+
+Volumes are configurable and the output is reproducible for a given seed.
+Popularity is skewed the way real catalogs are: a few genres, authors,
+creators and books account for most rows, and reading list sizes vary
+widely around their mean.
+"""
+import bisect
+import datetime
+import itertools
+import logging
+import random
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from authentication.models import User
+from .caching import invalidate_book_caches
+from .models import Book, ReadingList, ReadingListItem, normalize_book_key
+from .ordering import ORDER_GAP
+from .popularity import rebuild_book_popularity
+from .stats import rebuild_library_stats
+from .typeahead import typeahead_index
+
+logger = logging.getLogger(__name__)
+
+SEED_USERNAME_PREFIX = 'seed'
+SEED_PASSWORD = 'Seed#Pass123'
+
+GENRES = {
+    'Fiction': 30, 'Mystery': 14, 'Fantasy': 12, 'Science Fiction': 10, 'Romance': 10,
+    'History': 7, 'Biography': 6, 'Science': 5, 'Poetry': 3, 'Horror': 3,
+}
+FIRST_NAMES = [
+    'Ada', 'Ben', 'Chloe', 'David', 'Elena', 'Farah', 'George', 'Hana', 'Ivan', 'Julia',
+    'Kofi', 'Lena', 'Mateo', 'Nina', 'Omar', 'Priya', 'Quinn', 'Rosa', 'Sam', 'Tariq',
+]
+LAST_NAMES = [
+    'Adams', 'Baker', 'Chen', 'Diaz', 'Evans', 'Fischer', 'Garcia', 'Hughes', 'Ito', 'Jones',
+    'Khan', 'Lopez', 'Moreau', 'Novak', 'Okafor', 'Patel', 'Rossi', 'Silva', 'Tanaka', 'Weber',
+]
+WORDS = [
+    'silent', 'river', 'shadow', 'garden', 'empire', 'winter', 'light', 'stone', 'secret', 'city',
+    'ocean', 'memory', 'fire', 'glass', 'storm', 'house', 'forest', 'star', 'letter', 'road',
+    'island', 'crown', 'night', 'machine', 'song', 'bridge', 'summer', 'wolf', 'mirror', 'journey',
+]
+LIST_NAMES = ['Favorites', 'To Read', 'Summer', 'Book Club', 'Classics', 'Gifts', 'Work', 'Re-read', 'Kids', 'Wishlist']
+
+
+def zipf_sampler(rng, size, exponent=1.1):
+    """Return a function that picks an index in range(size), rank 0 the most likely."""
+    cumulative = list(itertools.accumulate(1 / (rank ** exponent) for rank in range(1, size + 1)))
+    total = cumulative[-1]
+    return lambda: bisect.bisect_left(cumulative, rng.random() * total)
+
+
+def letters(number):
+    """Bijective base-26 suffix: 0 -> 'a', 25 -> 'z', 26 -> 'aa', ..."""
+    suffix = ''
+    number += 1
+    while number:
+        number, remainder = divmod(number - 1, 26)
+        suffix = chr(ord('a') + remainder) + suffix
+    return suffix
+
+
+def seed_username(index):
+    # Usernames must be alphabetic to pass the registration rules.
+    return SEED_USERNAME_PREFIX + letters(index)
+
+
+def seed_data(users=100, books=2000, lists_per_user=2, items_per_list=15, seed=42, batch_size=1000):
+    """
+    Insert seeded users, books, reading lists and items with bulk_create.
+    All seeded users share SEED_PASSWORD. Returns the row counts created.
+    """
+    rng = random.Random(seed)
+    start = User.objects.filter(username__startswith=SEED_USERNAME_PREFIX).count()
+    password = make_password(SEED_PASSWORD)
+
+    with transaction.atomic():
+        new_users = []
+        for index in range(start, start + users):
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            username = seed_username(index)
+            new_users.append(User(
+                username=username, email=f'{username}@example.com', password=password,
+                first_name=first, last_name=last,
+            ))
+        User.objects.bulk_create(new_users, batch_size=batch_size)
+        seeded_users = list(User.objects.filter(username__startswith=SEED_USERNAME_PREFIX).order_by('id'))
+
+        # A minority of users add most of the catalog.
+        pick_creator = zipf_sampler(rng, len(seeded_users), 1.3)
+        creators = rng.sample(seeded_users, len(seeded_users))
+        pick_author = zipf_sampler(rng, max(books // 8, 1))
+        author_names = {}
+        genre_names, genre_weights = list(GENRES), list(GENRES.values())
+        offset = Book.objects.count()
+        today = datetime.date.today()
+
+        new_books = []
+        for number in range(offset, offset + books):
+            author = pick_author()
+            if author not in author_names:
+                author_names[author] = f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {author}'
+            title = f"The {rng.choice(WORDS).title()} {rng.choice(WORDS).title()} {number}"
+            # Most books are recent, with a long tail of older ones.
+            age_days = min(int(rng.expovariate(1 / (15 * 365))), 200 * 365)
+            description = None
+            if rng.random() < 0.8:
+                description = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(10, 40))).capitalize() + '.'
+            new_books.append(Book(
+                title=title,
+                authors=author_names[author],
+                genre=rng.choices(genre_names, genre_weights)[0],
+                publication_date=today - datetime.timedelta(days=age_days),
+                description=description,
+                created_by=creators[pick_creator()] if creators else None,
+                dedupe_key=normalize_book_key(title, author_names[author]),
+            ))
+        Book.objects.bulk_create(new_books, batch_size=batch_size)
+        book_ids = list(Book.objects.order_by('id').values_list('id', flat=True))
+
+        # Reading list contents skew towards a set of popular books.
+        popularity = rng.sample(book_ids, len(book_ids))
+        pick_book = zipf_sampler(rng, len(popularity), 0.9) if popularity else None
+        new_lists = []
+        for user in seeded_users[-users:] if users else []:
+            count = min(int(rng.expovariate(1 / lists_per_user)) if lists_per_user else 0, len(LIST_NAMES))
+            for name in rng.sample(LIST_NAMES, count):
+                new_lists.append(ReadingList(user=user, name=name))
+        ReadingList.objects.bulk_create(new_lists, batch_size=batch_size)
+        new_lists = list(ReadingList.objects.filter(user__in=seeded_users[-users:]).order_by('id')) if users else []
+
+        new_items = []
+        for reading_list in new_lists:
+            if pick_book is None or not items_per_list:
+                break
+            size = min(max(int(rng.lognormvariate(0, 0.8) * items_per_list), 1), len(book_ids), 200)
+            chosen = []
+            seen = set()
+            while len(chosen) < size:
+                book_id = popularity[pick_book()]
+                if book_id not in seen:
+                    seen.add(book_id)
+                    chosen.append(book_id)
+            for position, book_id in enumerate(chosen, start=1):
+                new_items.append(ReadingListItem(reading_list=reading_list, book_id=book_id, order=position * ORDER_GAP))
+            if len(new_items) >= batch_size:
+                ReadingListItem.objects.bulk_create(new_items, batch_size=batch_size)
+                new_items = []
+        ReadingListItem.objects.bulk_create(new_items, batch_size=batch_size)
+        # bulk_create skips the library stats and popularity signals as well.
+        rebuild_library_stats([user.id for user in seeded_users])
+        rebuild_book_popularity()
+
+    # bulk_create doesn't send post_save, so invalidate explicitly.
+    invalidate_book_caches()
+    typeahead_index.invalidate()
+    counts = {
+        'users': users,
+        'books': books,
+        'reading_lists': len(new_lists),
+        'reading_list_items': ReadingListItem.objects.filter(reading_list__in=new_lists).count(),
+    }
+    logger.info("Seeded %s users, %s books, %s reading lists and %s items", counts['users'], counts['books'], counts['reading_lists'], counts['reading_list_items'])
+    return counts
+
+
+def clear_seed_data():
+    """Delete seeded users along with the books they created and their reading lists."""
+    seeded = User.objects.filter(username__startswith=SEED_USERNAME_PREFIX)
+    with transaction.atomic():
+        books = Book.objects.filter(created_by__in=seeded).delete()[0]
+        users = seeded.delete()[0]
+    invalidate_book_caches()
+    return {'deleted_rows': books + users}
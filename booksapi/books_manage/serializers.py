@@ -1,11 +1,38 @@
 import logging
+from django.db import IntegrityError, transaction
 from rest_framework import serializers
-from .models import Book, ReadingList, ReadingListItem
+from .models import Book, ReadingList, ReadingListItem, UserLibraryStats, normalize_book_key
 from authentication.models import User
+from booksapi.instrumentation import serializing
 
 logger = logging.getLogger(__name__)
 
-class BookSerializer(serializers.ModelSerializer):
+DUPLICATE_BOOK_ERROR = "A book with this title and authors already exists."
+
+
+class DuplicateBookError(serializers.ValidationError):
+    """Raised from save() when the dedupe_key unique index rejects a book."""
+
+    def __init__(self, existing):
+        super().__init__({"title": [DUPLICATE_BOOK_ERROR]})
+        self.existing = existing
+
+
+class TimedDataMixin:
+    """Reports building .data as the request's serialize time in Server-Timing and /metrics."""
+
+    @property
+    def data(self):
+        with serializing():
+            return super().data
+
+
+class TimedListSerializer(TimedDataMixin, serializers.ListSerializer):
+    pass
+
+
+class BookSerializer(TimedDataMixin, serializers.ModelSerializer):
+    """Pass fields= (see fieldsets.book_fieldset) to render only some of the fields."""
     created_by = serializers.PrimaryKeyRelatedField(queryset=User.objects.all(), required=False)
 
     class Meta:
@@ -13,6 +40,12 @@ class BookSerializer(serializers.ModelSerializer):
         fields = ['id', 'title', 'authors', 'genre', 'publication_date', 'description', 'created_by', 'created_at', 'updated_at']
         read_only_fields = ['created_by', 'created_at', 'updated_at']
 
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
     def validate(self, data):
         title = data.get('title')
         authors = data.get('authors')
@@ -22,44 +55,136 @@ class BookSerializer(serializers.ModelSerializer):
         if request and request.user.is_authenticated and not data.get('created_by'):
             data['created_by'] = request.user
 
-        # Check for existing book with same title (title + authors)
-        query = Book.objects.filter(title=title)
-        if authors:
-            query = query.filter(authors=authors)
-        
-        if self.instance:
-            query = query.exclude(id=self.instance.id)
-
-        if query.exists():
-            logger.warning(f"Duplicate book creation attempted: title='{title}', authors='{authors}'")
-            raise serializers.ValidationError({"title": "A book with this title and authors already exists."})
-
-        logger.debug(f"Validated book data: title='{title}', authors='{authors}'")
+        # Duplicate titles + authors are rejected by the unique dedupe_key index on save()
+        logger.debug("Validated book data: title='%s', authors='%s'", title, authors)
         return data
 
+    def _raise_if_duplicate(self, title, authors):
+        existing = Book.objects.filter(dedupe_key=normalize_book_key(title, authors))
+        if self.instance:
+            existing = existing.exclude(id=self.instance.id)
+        existing = existing.first()
+        if existing:
+            logger.warning("Duplicate book creation attempted: title='%s', authors='%s'", title, authors)
+            raise DuplicateBookError(existing)
+
     def create(self, validated_data):
         """
         Log successful book creation.
         """
-        book = super().create(validated_data)
-        logger.info(f"Book created: title='{book.title}', created_by='{book.created_by.username}'")
+        try:
+            with transaction.atomic():
+                book = super().create(validated_data)
+        except IntegrityError:
+            self._raise_if_duplicate(validated_data.get('title'), validated_data.get('authors'))
+            raise
+        logger.info("Book created: title='%s', created_by='%s'", book.title, book.created_by.username)
         return book
 
+    def update(self, instance, validated_data):
+        try:
+            with transaction.atomic():
+                return super().update(instance, validated_data)
+        except IntegrityError:
+            self._raise_if_duplicate(
+                validated_data.get('title', instance.title),
+                validated_data.get('authors', instance.authors),
+            )
+            raise
+
+
+class BookImportRowSerializer(serializers.ModelSerializer):
+    """
+    Field-level validation for one imported row. Duplicate detection is done
+    per batch by the importer rather than with a query per row.
+    """
 
-class ReadingListSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Book
+        fields = ['title', 'authors', 'genre', 'publication_date', 'description']
+
+
+class ReadingListSerializer(TimedDataMixin, serializers.ModelSerializer):
     user = serializers.PrimaryKeyRelatedField(read_only=True)
 
     class Meta:
         model = ReadingList
+        list_serializer_class = TimedListSerializer
         fields = ['id', 'user', 'name', 'created_at', 'updated_at']
         read_only_fields = ['user', 'created_at', 'updated_at']
 
 
-class ReadingListItemSerializer(serializers.ModelSerializer):
+class ReadingListItemSerializer(TimedDataMixin, serializers.ModelSerializer):
+    """book_fields= limits the fields of the embedded book."""
     book = BookSerializer(read_only=True)
     book_id = serializers.PrimaryKeyRelatedField(queryset=Book.objects.all(), source='book', write_only=True)
 
     class Meta:
         model = ReadingListItem
         fields = ['id', 'reading_list', 'book', 'book_id', 'order', 'added_at']
-        read_only_fields = ['reading_list', 'book', 'added_at']
\ No newline at end of file
+        read_only_fields = ['reading_list', 'book', 'added_at']
+
+    def __init__(self, *args, book_fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if book_fields is not None:
+            self.fields['book'] = BookSerializer(read_only=True, fields=book_fields)
+
+
+class ReadingListDetailSerializer(ReadingListSerializer):
+    """
+    Reading list with optional embedded items (expand_items), their books
+    limited to book_fields, and item count (include_counts). The view is
+    expected to prefetch items with their books and annotate item_count,
+    so neither adds per-list queries.
+    """
+    items = ReadingListItemSerializer(many=True, read_only=True)
+    item_count = serializers.IntegerField(read_only=True)
+
+    class Meta(ReadingListSerializer.Meta):
+        fields = ReadingListSerializer.Meta.fields + ['items', 'item_count']
+
+    def __init__(self, *args, expand_items=False, include_counts=False, book_fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if not expand_items:
+            self.fields.pop('items')
+        elif book_fields is not None:
+            self.fields['items'] = ReadingListItemSerializer(many=True, read_only=True, book_fields=book_fields)
+        if not include_counts:
+            self.fields.pop('item_count')
+
+
+class UserLibraryStatsSerializer(TimedDataMixin, serializers.ModelSerializer):
+    class Meta:
+        model = UserLibraryStats
+        fields = ['books_added', 'reading_lists', 'reading_list_items', 'updated_at']
+
+
+class ReadingListItemPlacementSerializer(serializers.Serializer):
+    """
+    One add or move in a batch. Leave out 'after' to place the book at the
+    end of the list, or set it to null to place it first.
+    """
+    book_id = serializers.IntegerField(min_value=1)
+    after = serializers.IntegerField(min_value=1, required=False, allow_null=True)
+
+
+class ReadingListItemBatchSerializer(serializers.Serializer):
+    max_operations = 500
+
+    add = ReadingListItemPlacementSerializer(many=True, required=False)
+    remove = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False)
+    move = ReadingListItemPlacementSerializer(many=True, required=False)
+
+    def validate(self, data):
+        operations = sum(len(data.get(key, [])) for key in ('add', 'remove', 'move'))
+        if not operations:
+            raise serializers.ValidationError("Provide at least one of 'add', 'remove' or 'move'.")
+        if operations > self.max_operations:
+            raise serializers.ValidationError(f"A batch can contain at most {self.max_operations} operations.")
+
+        book_ids = {op['book_id'] for op in data.get('add', [])}
+        existing = set(Book.objects.filter(id__in=book_ids).values_list('id', flat=True))
+        missing = sorted(book_ids - existing)
+        if missing:
+            raise serializers.ValidationError({"add": f"Books not found: {missing}"})
+        return data
@@ -0,0 +1,81 @@
+from django.db import transaction
+from django.db.models import Count, QuerySet
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from authentication.models import User
+from .caching import invalidate_book_caches
+from .models import Book, ReadingList, ReadingListItem
+from .popularity import record_item_changes
+from .stats import adjust_library_stats
+from .typeahead import typeahead_index
+
+
+def _deleting_user(origin):
+    """Whether a delete cascades from a user, whose stats row goes with it."""
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return model is User
+
+
+@receiver(post_save, sender=Book)
+@receiver(post_delete, sender=Book)
+def book_changed(sender, instance, **kwargs):
+    invalidate_book_caches([instance.pk])
+
+
+@receiver(post_save, sender=Book)
+def book_saved_typeahead(sender, instance, **kwargs):
+    transaction.on_commit(lambda: typeahead_index.book_changed(instance.pk, instance.title, instance.authors))
+
+
+@receiver(post_delete, sender=Book)
+def book_deleted_typeahead(sender, instance, **kwargs):
+    book_id = instance.pk
+    transaction.on_commit(lambda: typeahead_index.book_changed(book_id))
+
+
+@receiver(pre_delete, sender=User)
+def book_creator_deleted(sender, instance, **kwargs):
+    # created_by is cleared with a bulk UPDATE that sends no Book signals.
+    book_ids = list(instance.books.values_list('id', flat=True))
+    if book_ids:
+        invalidate_book_caches(book_ids)
+
+
+@receiver(post_save, sender=Book)
+def book_created_stats(sender, instance, created, **kwargs):
+    if created:
+        adjust_library_stats(instance.created_by_id, books_added=1)
+
+
+@receiver(post_save, sender=ReadingList)
+def reading_list_created_stats(sender, instance, created, **kwargs):
+    if created:
+        adjust_library_stats(instance.user_id, reading_lists=1)
+
+
+@receiver(post_save, sender=ReadingListItem)
+def reading_list_item_created_stats(sender, instance, created, **kwargs):
+    if created:
+        adjust_library_stats(instance.reading_list.user_id, reading_list_items=1)
+        record_item_changes(added=[(instance.book_id, instance.added_at)])
+
+
+@receiver(pre_delete, sender=Book)
+def book_deleted_stats(sender, instance, **kwargs):
+    adjust_library_stats(instance.created_by_id, pending=True, books_added=-1)
+    # The book's reading list items are about to be cascade-deleted.
+    owners = (
+        ReadingListItem.objects.filter(book=instance)
+        .values_list('reading_list__user_id').annotate(count=Count('pk')).order_by()
+    )
+    for user_id, count in owners:
+        adjust_library_stats(user_id, pending=True, reading_list_items=-count)
+
+
+@receiver(pre_delete, sender=ReadingList)
+def reading_list_deleted_stats(sender, instance, origin=None, **kwargs):
+    items = list(instance.items.values_list('book_id', 'added_at'))
+    # Its books stay, so their popularity drops even when the user goes too.
+    record_item_changes(removed=items)
+    if not _deleting_user(origin):
+        adjust_library_stats(instance.user_id, pending=True, reading_lists=-1, reading_list_items=-len(items))
@@ -0,0 +1,99 @@
+"""
+Per-user library counters (UserLibraryStats).
+
+Single-row creates are counted by post_save receivers in signals.py, in
+the transaction of the write. Book and reading list deletes are counted
+in pre_delete, inside the delete's transaction, including the items they
+cascade to. Reading list items get no delete receivers, which keeps their
+cascades fast deletes, so the code paths that delete or bulk insert items,
+books or lists adjust the counters themselves. Anything else, like raw
+SQL or shell bulk deletes, is fixed by the rebuild_library_stats command.
+"""
+from django.db import transaction
+from django.db.models import Count, F, Value
+from django.db.models.functions import Greatest
+from .models import Book, ReadingList, ReadingListItem, UserLibraryStats
+
+COUNTERS = ('books_added', 'reading_lists', 'reading_list_items')
+
+
+def count_library_stats(user_ids):
+    """Recount every counter for the given users, with three grouped queries."""
+    counts = {user_id: dict.fromkeys(COUNTERS, 0) for user_id in user_ids}
+    queries = (
+        ('books_added', Book.objects.filter(created_by_id__in=user_ids).values_list('created_by_id')),
+        ('reading_lists', ReadingList.objects.filter(user_id__in=user_ids).values_list('user_id')),
+        ('reading_list_items', ReadingListItem.objects.filter(reading_list__user_id__in=user_ids).values_list('reading_list__user_id')),
+    )
+    for counter, rows in queries:
+        for user_id, count in rows.annotate(count=Count('pk')).order_by():
+            counts[user_id][counter] = count
+    return counts
+
+
+def recompute_library_stats(user_id, pending=None):
+    """
+    Store freshly counted stats for one user and return the row. pending
+    holds deltas of a change the count can't see yet, added on top of it.
+    """
+    counts = count_library_stats([user_id])[user_id]
+    for counter, delta in (pending or {}).items():
+        counts[counter] = max(counts[counter] + delta, 0)
+    stats, _ = UserLibraryStats.objects.update_or_create(user_id=user_id, defaults=counts)
+    return stats
+
+
+def get_library_stats(user_id):
+    """The stored stats row, counted on first use."""
+    stats = UserLibraryStats.objects.filter(user_id=user_id).first()
+    return stats if stats is not None else recompute_library_stats(user_id)
+
+
+def adjust_library_stats(user_id, pending=False, **deltas):
+    """
+    Add deltas to a user's counters with one UPDATE. Decrements stop at
+    zero. A user without a stats row yet gets one counted from scratch.
+    That count includes a change already written; pass pending=True when
+    recording one that isn't yet, like a delete from pre_delete, so the
+    deltas are applied on top of it.
+    """
+    deltas = {counter: delta for counter, delta in deltas.items() if delta}
+    if user_id is None or not deltas:
+        return
+    updates = {
+        counter: F(counter) + delta if delta > 0 else Greatest(F(counter) + delta, Value(0))
+        for counter, delta in deltas.items()
+    }
+    if not UserLibraryStats.objects.filter(user_id=user_id).update(**updates):
+        recompute_library_stats(user_id, deltas if pending else None)
+
+
+def rebuild_library_stats(user_ids, batch_size=500):
+    """
+    Recount the stats of the given users and write the rows that are
+    missing or wrong. Returns (checked, corrected).
+
+    Each batch locks its stats rows before counting. A concurrent write
+    then either commits before the count sees it or has its adjustment
+    applied on top of the recounted row, so no change is lost.
+    """
+    checked = corrected = 0
+    user_ids = list(user_ids)
+    for start in range(0, len(user_ids), batch_size):
+        batch = user_ids[start:start + batch_size]
+        with transaction.atomic():
+            stored = {
+                row['user_id']: row
+                for row in UserLibraryStats.objects.select_for_update().filter(user_id__in=batch).values('user_id', *COUNTERS)
+            }
+            counts = count_library_stats(batch)
+            stale = [
+                UserLibraryStats(user_id=user_id, **values) for user_id, values in counts.items()
+                if stored.get(user_id) != {'user_id': user_id, **values}
+            ]
+            UserLibraryStats.objects.bulk_create(
+                stale, update_conflicts=True, unique_fields=['user'], update_fields=[*COUNTERS, 'updated_at'],
+            )
+        checked += len(batch)
+        corrected += len(stale)
+    return checked, corrected
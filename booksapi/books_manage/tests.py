@@ -1,3 +1,1146 @@
-from django.test import TestCase
+import csv
+import datetime
+import io
+import json
+import logging
+import runpy
+import sys
+import tempfile
+import warnings
+from importlib import import_module
+from unittest import mock, skipUnless
+from asgiref.sync import async_to_sync
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.paginator import UnorderedObjectListWarning
+from django.db import connection, connections
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.exceptions import NotFound, ParseError
+from rest_framework.request import Request
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APIRequestFactory
+from booksapi.fastjson import FastJSONParser, FastJSONRenderer
+from booksapi.instrumentation import DB_CONNECTIONS, REQUEST_DURATION, DatabasePoolMetrics
+from booksapi.logging_utils import JSONFormatter, QueuedStreamHandler, SamplingFilter
+from booksapi.throttling import LoadSheddingMiddleware
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.tokens import AccessToken
+from authentication.backends import CachedJWTAuthentication
+from authentication.models import User
+from .models import Book, BookPopularity, ReadingList, ReadingListItem, RelatedBook, UserLibraryStats, normalize_book_key
+from .related import np
+from .benchmarking import benchmark_connections, compare_to_baseline, missing_scenarios, run_benchmark, sample_payloads
+from .exporters import stream_export
+from .importers import BookImporter, parse_ndjson
+from .ordering import MAX_ORDER, ORDER_GAP, ReadingListOrdering
+from .pagination import BookPageNumberPagination
+from .rows import book_rows, reading_list_item_rows
+from .seeding import seed_data
+from .serializers import BookSerializer, ReadingListItemSerializer
+from .typeahead import TypeaheadIndex, typeahead_index
+from .views import BookListCreateView
 
-# Create your tests here.
+
+def make_books(count, user=None, **fields):
+    """Insert count books without signals, returned oldest first."""
+    return Book.objects.bulk_create(
+        Book(title=f"Book {number}", authors="Author", genre="Fiction",
+             publication_date=datetime.date(2020, 1, 1), created_by=user, **fields)
+        for number in range(count)
+    )
+
+
+class PaginationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.client = APIClient()
+        self.newest_first = [book.pk for book in reversed(make_books(105))]
+
+    def ids(self, response):
+        self.assertEqual(response.status_code, 200)
+        return [book['id'] for book in response.data['results']]
+
+    def test_page_numbers_are_ordered_newest_first(self):
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', UnorderedObjectListWarning)
+            first = self.client.get('/api/books/')
+            second = self.client.get('/api/books/?page=2')
+        self.assertEqual(first.data['count'], 105)
+        self.assertEqual(self.ids(first) + self.ids(second), self.newest_first[:20])
+
+    def test_cursor_pages_walk_the_catalog(self):
+        response = self.client.get('/api/books/?pagination=cursor&page_size=40')
+        self.assertNotIn('count', response.data)
+        self.assertIsNone(response.data['previous'])
+        seen = self.ids(response)
+        while response.data['next']:
+            response = self.client.get(response.data['next'])
+            seen += self.ids(response)
+        self.assertEqual(seen, self.newest_first)
+
+        previous = self.client.get(self.client.get(response.data['previous']).data['next'])
+        self.assertEqual(self.ids(previous), self.newest_first[80:])
+
+    def test_cursor_page_size_is_capped_and_count_is_optional(self):
+        response = self.client.get('/api/books/?pagination=cursor&page_size=500&count=true')
+        self.assertEqual(len(self.ids(response)), 100)
+        self.assertEqual(response.data['count'], 105)
+        with self.assertNumQueries(1):
+            self.client.get('/api/books/?pagination=cursor&genre=Fiction')
+        self.assertEqual(self.client.get('/api/books/?cursor=garbage').status_code, 404)
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.river = Book.objects.create(title="The River Road", authors="Ann Lake", genre="Fiction",
+                                         publication_date=datetime.date(2001, 1, 1), description="A quiet journey.")
+        self.mountain = Book.objects.create(title="Mountain Song", authors="Ben Hill", genre="Fiction",
+                                            publication_date=datetime.date(2002, 1, 1), description="They cross a river at dawn.")
+
+    def search(self, query):
+        response = self.client.get('/api/books/search/', {'q': query})
+        self.assertEqual(response.status_code, 200)
+        return [book['id'] for book in response.data['results']]
+
+    def test_title_matches_rank_first(self):
+        self.assertEqual(self.search("rivers"), [self.river.pk, self.mountain.pk])
+        self.assertEqual(self.search("hill"), [self.mountain.pk])
+        # Query syntax is treated as plain words.
+        self.assertEqual(self.search('title:"river" OR NEAR('), [])
+
+    def test_index_follows_updates_and_deletes(self):
+        self.river.title = "The Lake House"
+        self.river.save()
+        self.assertEqual(self.search("road"), [])
+        self.assertEqual(self.search("house"), [self.river.pk])
+        Book.objects.filter(pk=self.mountain.pk).update(description="Snow and stone.")
+        self.assertEqual(self.search("river"), [])
+        self.assertEqual(self.search("snow"), [self.mountain.pk])
+        self.mountain.delete()
+        self.assertEqual(self.search("snow"), [])
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.client.get('/api/books/search/').status_code, 400)
+        self.assertEqual(self.client.get('/api/books/search/', {'q': 'river', 'limit': 'x'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/books/search/', {'q': 'river', 'offset': -1}).status_code, 400)
+
+
+class FilterAndFacetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = User.objects.create_user(username='reader', email='reader@example.com', password='Secure123!')
+        self.client = APIClient()
+        for title, genre, published in (("Alpha", "Fiction", datetime.date(1999, 12, 31)), ("Beta", "Poetry", datetime.date(2000, 1, 1)),
+                                        ("Gamma", "Fiction", datetime.date(2000, 6, 1))):
+            Book.objects.create(title=title, authors="Author", genre=genre, publication_date=published, created_by=self.user)
+
+    def titles(self, **params):
+        response = self.client.get('/api/books/', params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return sorted(book['title'] for book in response.data['results'])
+
+    def test_filters_combine(self):
+        self.assertEqual(self.titles(genre="Fiction"), ["Alpha", "Gamma"])
+        self.assertEqual(self.titles(published_after="2000"), ["Beta", "Gamma"])
+        self.assertEqual(self.titles(published_before="1999"), ["Alpha"])
+        self.assertEqual(self.titles(genre="Fiction", published_after="2000-01-01", created_by=self.user.pk), ["Gamma"])
+        self.assertEqual(self.titles(created_by=self.user.pk + 1), [])
+
+    def test_invalid_filters_are_rejected(self):
+        for params in ({'created_by': 'me'}, {'published_after': '2000-13-01'}, {'published_before': 'last year'}):
+            response = self.client.get('/api/books/', params)
+            self.assertEqual(response.status_code, 400)
+            self.assertIn(next(iter(params)), response.data['error'])
+
+    def test_facets_are_cached_until_a_write(self):
+        facets = self.client.get('/api/books/facets/').data
+        self.assertEqual(facets['genres'], [{'genre': "Fiction", 'count': 2}, {'genre': "Poetry", 'count': 1}])
+        self.assertEqual(facets['years'], [{'year': 2000, 'count': 2}, {'year': 1999, 'count': 1}])
+        with self.assertNumQueries(0):
+            self.client.get('/api/books/facets/')
+
+        self.client.force_authenticate(self.user)
+        self.client.post('/api/books/', {'title': "Delta", 'authors': "Author", 'genre': "Poetry", 'publication_date': '1999-02-02'}, format='json')
+        facets = self.client.get('/api/books/facets/').data
+        self.assertEqual(facets['genres'], [{'genre': "Fiction", 'count': 2}, {'genre': "Poetry", 'count': 2}])
+        self.client.delete(f"/api/books/{Book.objects.get(title='Alpha').pk}/")
+        self.assertEqual(self.client.get('/api/books/facets/').data['years'], [{'year': 2000, 'count': 2}, {'year': 1999, 'count': 1}])
+
+
+def ndjson_feed(*rows):
+    return ('\n'.join(row if isinstance(row, str) else json.dumps(row) for row in rows) + '\n').encode()
+
+
+def book_row(title, **fields):
+    return {'title': title, 'authors': "Author", 'genre': "Fiction", 'publication_date': '2020-01-01', **fields}
+
+
+class ImportTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='reader', email='reader@example.com', password='Secure123!')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_ndjson_feed_reports_each_bad_line(self):
+        feed = ndjson_feed(book_row("One"), '{"title": ', '[1, 2]', '', book_row("Two", publication_date='soon'), book_row("Three"))
+        response = self.client.post('/api/books/import/?input=ndjson', feed, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual({key: response.data[key] for key in ('processed', 'created', 'duplicates', 'invalid')},
+                         {'processed': 5, 'created': 2, 'duplicates': 0, 'invalid': 3})
+        self.assertEqual([error['line'] for error in response.data['errors']], [2, 3, 5])
+        self.assertIn('publication_date', response.data['errors'][2]['errors'])
+        self.assertEqual(set(Book.objects.filter(created_by=self.user).values_list('title', flat=True)), {"One", "Three"})
+        self.assertEqual(UserLibraryStats.objects.get(user=self.user).books_added, 2)
+
+    def test_csv_upload_and_unknown_formats(self):
+        feed = io.BytesIO(b"title,authors,genre,publication_date,description\nOne,Author,Fiction,2020-01-01,\nTwo,Author,,2020-01-01,x\n")
+        feed.name = 'books.csv'
+        response = self.client.post('/api/books/import/', {'file': feed}, format='multipart')
+        self.assertEqual((response.data['created'], response.data['invalid']), (1, 1))
+        self.assertEqual(response.data['errors'][0]['line'], 3)
+        self.assertIsNone(Book.objects.get(title="One").description)
+        response = self.client.post('/api/books/import/', b'<books/>', content_type='application/xml')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.post('/api/books/import/', {}, format='multipart').status_code, 400)
+
+    def test_batches_and_error_cap(self):
+        rows = [book_row(f"Book {number}") for number in range(5)] + [book_row("") for _ in range(4)]
+        importer = BookImporter(created_by=self.user, batch_size=2, max_reported_errors=3)
+        with CaptureQueriesContext(connection) as queries:
+            report = importer.run(parse_ndjson(json.dumps(row) for row in rows))
+        # One duplicate check and one INSERT per batch of valid rows.
+        self.assertEqual(sum(query['sql'].startswith('INSERT INTO "books"') for query in queries), 3)
+        self.assertEqual(sum('"dedupe_key" IN' in query['sql'] for query in queries), 3)
+        self.assertEqual((report['created'], report['invalid'], len(report['errors'])), (5, 4, 3))
+        self.assertTrue(report['errors_truncated'])
+
+        path = self.enterContext(tempfile.TemporaryDirectory()) + '/more.ndjson'
+        with open(path, 'wb') as feed:
+            feed.write(ndjson_feed(book_row("Book 5"), book_row("")))
+        stderr = io.StringIO()
+        call_command('import_books', path, '--created-by', 'reader', stdout=io.StringIO(), stderr=stderr)
+        self.assertIn("line 2:", stderr.getvalue())
+        self.assertEqual(Book.objects.count(), 6)
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='reader', email='reader@example.com', password='Secure123!')
+        self.client = APIClient()
+        self.dune = Book.objects.create(title="Dune", authors="Frank Herbert", genre="Science Fiction", description="Sand, \"spice\"",
+                                        publication_date=datetime.date(1965, 8, 1), created_by=self.user)
+        self.emma = Book.objects.create(title="Emma", authors="Jane Austen", genre="Fiction", publication_date=datetime.date(1815, 12, 23))
+        reading_list = ReadingList.objects.create(user=self.user, name="Classics")
+        ReadingListItem.objects.create(reading_list=reading_list, book=self.emma, order=1)
+
+    def export(self, query):
+        response = self.client.get('/api/books/export/' + query)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_ndjson_matches_the_api(self):
+        response, body = self.export('')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual(rows, [dict(BookSerializer(book).data) for book in (self.dune, self.emma)])
+        _, body = self.export('?genre=Fiction')
+        self.assertEqual([json.loads(line)['title'] for line in body.splitlines()], ["Emma"])
+
+    def test_csv_is_quoted_and_buffered(self):
+        response, body = self.export('?output=csv')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="books.csv"')
+        rows = list(csv.DictReader(io.StringIO(body)))
+        self.assertEqual([(row['title'], row['description'], row['created_by']) for row in rows],
+                         [("Dune", 'Sand, "spice"', str(self.user.pk)), ("Emma", '', '')])
+        chunks = list(stream_export('books', 'csv', buffer_size=1))
+        self.assertEqual((len(chunks), ''.join(chunks)), (3, body))
+
+    def test_reading_list_items_are_staff_only(self):
+        self.assertEqual(self.client.get('/api/books/export/?resource=reading_list_items').status_code, 403)
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.get('/api/books/export/?resource=reading_list_items').status_code, 403)
+        self.assertEqual(self.client.get('/api/books/export/?resource=users').status_code, 400)
+        self.assertEqual(self.client.get('/api/books/export/?output=xml').status_code, 400)
+
+        self.user.is_staff = True
+        self.user.save()
+        _, body = self.export('?resource=reading_list_items')
+        row = json.loads(body)
+        self.assertEqual((row['reading_list_name'], row['user'], row['book'], row['order']), ("Classics", self.user.pk, self.emma.pk, 1))
+
+
+class BookCachingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = User.objects.create_user(username='reader', email='reader@example.com', password='Secure123!')
+        self.client = APIClient()
+        self.book = Book.objects.create(title="Dune", authors="Frank Herbert", genre="Science Fiction",
+                                        publication_date=datetime.date(1965, 8, 1), created_by=self.user)
+        self.detail = f'/api/books/{self.book.pk}/'
+
+    def test_detail_revalidates_until_the_book_changes(self):
+        first = self.client.get(self.detail)
+        self.assertEqual(first.status_code, 200)
+        self.assertIn('Accept', first['Vary'])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(self.detail, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+        self.assertEqual(self.client.get(self.detail, HTTP_IF_MODIFIED_SINCE=first['Last-Modified']).status_code, 304)
+
+        self.book.title = "Dune Messiah"
+        self.book.save()
+        response = self.client.get(self.detail, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual((response.status_code, response.data['title']), (200, "Dune Messiah"))
+        self.assertNotEqual(response['ETag'], first['ETag'])
+        self.book.delete()
+        self.assertEqual(self.client.get(self.detail).status_code, 404)
+
+    def test_list_pages_are_invalidated_by_writes(self):
+        first = self.client.get('/api/books/')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/api/books/', HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+        self.assertNotEqual(self.client.get('/api/books/?page_size=5')['ETag'], first['ETag'])
+
+        self.client.force_authenticate(self.user)
+        self.client.post('/api/books/', {'title': "Emma", 'authors': "Jane Austen", 'genre': "Fiction", 'publication_date': '1815-12-23'}, format='json')
+        response = self.client.get('/api/books/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual((response.status_code, response.data['count']), (200, 2))
+
+    def test_renderings_have_their_own_validators(self):
+        as_json = self.client.get('/api/books/')
+        as_html = self.client.get('/api/books/', HTTP_ACCEPT='text/html')
+        self.assertEqual(as_html['Content-Type'], 'text/html; charset=utf-8')
+        self.assertNotEqual(as_html['ETag'], as_json['ETag'])
+        self.assertEqual(self.client.get('/api/books/', HTTP_ACCEPT='text/html', HTTP_IF_NONE_MATCH=as_json['ETag']).status_code, 200)
+        self.assertEqual(self.client.get(self.detail, HTTP_ACCEPT='text/html', HTTP_IF_NONE_MATCH=self.client.get(self.detail)['ETag']).status_code, 200)
+
+
+class BookDedupeTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = User.objects.create_user(username='reader', email='reader@example.com', password='Secure123!')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.book = Book.objects.create(title="The Lord of the Rings", authors="J. R. R. Tolkien", genre="Fantasy",
+                                        publication_date=datetime.date(1954, 7, 29), created_by=self.user)
+
+    def post(self, title, authors, query='', **fields):
+        return self.client.post('/api/books/' + query, {
+            'title': title, 'authors': authors, 'genre': "Fantasy", 'publication_date': '1954-07-29', **fields,
+        }, format='json')
+
+    def test_variants_collide(self):
+        self.assertEqual(normalize_book_key("  the LORD of the rings ", "J.R.R. Tolkien"), self.book.dedupe_key)
+        for title, authors in (("THE LORD OF THE RINGS", "j. r. r. tolkien"), ("The  Lord of the Rings.", "J.R.R. Tolkien"),
+                               ("The Lord of the Rings!", "J R R Tolkien")):
+            response = self.post(title, authors)
+            self.assertEqual(response.status_code, 400, (title, authors))
+            self.assertEqual(response.data, {'error': {'title': ["A book with this title and authors already exists."]}})
+        self.assertEqual(self.post("The Lord of the Ring", "J. R. R. Tolkien").status_code, 201)
+        self.assertEqual(Book.objects.count(), 2)
+
+    def test_upsert_returns_the_existing_book_unchanged(self):
+        self.client.force_authenticate(User.objects.create_user(username='writer', email='writer@example.com', password='Secure123!'))
+        response = self.post("the lord of the rings", "J.R.R. Tolkien", query='?upsert=true', description="Revised.")
+        self.assertEqual((response.status_code, response.data['id'], response.data['title']), (200, self.book.pk, "The Lord of the Rings"))
+        self.book.refresh_from_db()
+        self.assertEqual((self.book.title, self.book.description, self.book.created_by), ("The Lord of the Rings", None, self.user))
+        self.assertEqual(self.post("Dune", "Frank Herbert", query='?upsert=true').status_code, 201)
+        self.assertEqual(Book.objects.count(), 2)
+
+    def test_importer_dedupes_within_and_across_batches(self):
+        rows = [book_row("Dune", authors="Frank Herbert"), book_row("dune!", authors="frank  herbert"),
+                book_row("The Lord of the Rings", authors="J.R.R. Tolkien"), book_row("Emma")]
+        report = BookImporter(created_by=self.user, batch_size=3).run(parse_ndjson(json.dumps(row) for row in rows))
+        self.assertEqual((report['created'], report['duplicates']), (2, 2))
+        self.assertEqual([error['line'] for error in report['errors']], [2, 3])
+
+    def test_backfill_keys_the_oldest_of_each_duplicate(self):
+        older, newer = Book.objects.bulk_create([
+            Book(title="Emma", authors="Jane Austen", genre="Fiction", publication_date=datetime.date(1815, 12, 23)),
+            Book(title="EMMA.", authors="Jane  Austen", genre="Fiction", publication_date=datetime.date(1815, 12, 23)),
+        ])
+        Book.objects.filter(pk=self.book.pk).update(dedupe_key='stale')
+        import_module('books_manage.migrations.0010_book_dedupe_key_punctuation').rekey_books(apps, None)
+        keys = dict(Book.objects.values_list('pk', 'dedupe_key'))
+        self.assertEqual(keys, {self.book.pk: normalize_book_key(self.book.title, self.book.authors),
+                                older.pk: normalize_book_key("Emma", "Jane Austen"), newer.pk: None})
+
+
+class ReadingListOrderingTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='reader', email='reader@example.com', password='Secure123!')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.books = [book.pk for book in make_books(6)]
+        self.reading_list = ReadingList.objects.create(user=self.user, name="Favorites")
+
+    def plan(self, *orders):
+        return ReadingListOrdering(ReadingListItem(id=book_id, book_id=book_id, order=order) for book_id, order in enumerate(orders, start=1))
+
+    def orders(self, ordering):
+        return [(item.book_id, item.order) for item in ordering.items]
+
+    def batch(self, **operations):
+        return self.client.patch(f'/api/reading-lists/{self.reading_list.pk}/items/', operations, format='json')
+
+    def test_placement_takes_the_midpoint_or_renumbers(self):
+        ordering = self.plan(ORDER_GAP, 2 * ORDER_GAP)
+        ordering.add(ReadingListItem(book_id=3), after=None)
+        self.assertEqual(self.orders(ordering), [(3, ORDER_GAP // 2), (1, ORDER_GAP), (2, 2 * ORDER_GAP)])
+        self.assertEqual(ordering.changed, set())
+
+        # Neighbours with no gap left renumber the whole list.
+        ordering = self.plan(ORDER_GAP, ORDER_GAP + 1)
+        ordering.add(ReadingListItem(book_id=3), after=1)
+        self.assertEqual(self.orders(ordering), [(1, ORDER_GAP), (3, 2 * ORDER_GAP), (2, 3 * ORDER_GAP)])
+        self.assertEqual({item.book_id for item in ordering.changed}, {2})
+
+        ordering = self.plan(ORDER_GAP, MAX_ORDER - 1)
+        ordering.add(ReadingListItem(book_id=3))
+        self.assertEqual(self.orders(ordering), [(1, ORDER_GAP), (2, 2 * ORDER_GAP), (3, 3 * ORDER_GAP)])
+
+        # Legacy lists keep every item at order 0, in insertion order.
+        ordering = self.plan(0, 0, 0)
+        ordering.move(3, after=1)
+        self.assertEqual(self.orders(ordering), [(1, ORDER_GAP), (3, 2 * ORDER_GAP), (2, 3 * ORDER_GAP)])
+        ordering.move(2, after=None)
+        self.assertEqual(self.orders(ordering), [(2, ORDER_GAP // 2), (1, ORDER_GAP), (3, 2 * ORDER_GAP)])
+        self.assertEqual({item.book_id for item in ordering.changed}, {1, 2, 3})
+
+    def test_batch_writes_items_counters_and_order(self):
+        first, second, third, fourth, fifth, sixth = self.books
+        self.client.post(f'/api/reading-lists/{self.reading_list.pk}/items/', {'book_id': first}, format='json')
+        self.client.post(f'/api/reading-lists/{self.reading_list.pk}/items/', {'book_id': second}, format='json')
+        ReadingListItem.objects.filter(book_id=second).update(order=ORDER_GAP + 1)
+
+        response = self.batch(remove=[first], add=[{'book_id': third, 'after': second}, {'book_id': fourth, 'after': None}], move=[{'book_id': second}])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['book']['id'] for item in response.data], [fourth, third, second])
+        self.assertEqual(list(self.reading_list.items.order_by('order').values_list('book_id', flat=True)), [fourth, third, second])
+        self.assertEqual(UserLibraryStats.objects.get(user=self.user).reading_list_items, 3)
+        self.assertEqual(dict(BookPopularity.objects.values_list('book_id', 'list_count')), {first: 0, second: 1, third: 1, fourth: 1})
+
+        # The query count doesn't grow with the size of the batch.
+        with CaptureQueriesContext(connection) as small:
+            self.batch(add=[{'book_id': fifth}], move=[{'book_id': third, 'after': None}])
+        self.batch(remove=[fifth])
+        with CaptureQueriesContext(connection) as large:
+            self.batch(add=[{'book_id': fifth}, {'book_id': sixth, 'after': None}], move=[{'book_id': third, 'after': None}, {'book_id': second, 'after': None}])
+        self.assertEqual(len(large), len(small))
+        # Removes add one DELETE and the counter decrements.
+        with self.assertNumQueries(16):
+            self.batch(remove=[fifth, sixth], add=[{'book_id': first}], move=[{'book_id': fourth}])
+
+    def test_invalid_batches_write_nothing(self):
+        first, second, third = self.books[:3]
+        self.batch(add=[{'book_id': first}, {'book_id': second}])
+        before = list(self.reading_list.items.values_list('book_id', 'order'))
+        for operations in (
+            {'remove': [first], 'add': [{'book_id': third, 'after': first}]},
+            {'remove': [first], 'move': [{'book_id': second, 'after': first}]},
+            {'add': [{'book_id': third}, {'book_id': third}]},
+            {'add': [{'book_id': first}]},
+            {'move': [{'book_id': third}]},
+            {'remove': [third]},
+        ):
+            self.assertEqual(self.batch(**operations).status_code, 400, operations)
+        self.assertEqual(list(self.reading_list.items.values_list('book_id', 'order')), before)
+        self.assertEqual(UserLibraryStats.objects.get(user=self.user).reading_list_items, 2)
+        self.assertEqual(BookPopularity.objects.get(book_id=first).list_count, 1)
+
+    def test_appends_take_the_next_gap(self):
+        first, second = self.books[:2]
+        for book_id in (first, second):
+            self.assertEqual(self.client.post(f'/api/reading-lists/{self.reading_list.pk}/items/', {'book_id': book_id}, format='json').status_code, 201)
+        self.assertEqual(list(self.reading_list.items.order_by('order').values_list('book_id', 'order')), [(first, ORDER_GAP), (second, 2 * ORDER_GAP)])
+
+
+class AsyncViewParityTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = User.objects.create_user(username='reader', email='reader@example.com', password='Secure123!')
+        self.other = User.objects.create_user(username='writer', email='writer@example.com', password='Secure123!')
+        self.books = make_books(25, user=self.user)
+        self.reading_list = ReadingList.objects.create(user=self.user, name="Favorites")
+        for order, book in enumerate(self.books[:3], start=1):
+            ReadingListItem.objects.create(reading_list=self.reading_list, book=book, order=order)
+        self.foreign_list = ReadingList.objects.create(user=self.other, name="Borrowed")
+        self.client = APIClient()
+
+    def assertSameResponse(self, path, **headers):
+        sync = self.client.get(f'/api{path}', **headers)
+        asynchronous = self.client.get(f'/api/async{path}', **headers)
+        self.assertEqual(asynchronous.status_code, sync.status_code, path)
+        self.assertEqual(json.loads(asynchronous.content.decode().replace('/api/async/', '/api/')), json.loads(sync.content), path)
+        # List ETags cover the page links, which name the async routes.
+        headers = ('Content-Type', 'WWW-Authenticate') if path.startswith('/books/?') or path == '/books/' else ('Content-Type', 'ETag', 'WWW-Authenticate')
+        for header in headers:
+            self.assertEqual(asynchronous.get(header), sync.get(header), (path, header))
+        return sync.status_code
+
+    def test_responses_match_the_sync_views(self):
+        book, list_id, foreign_id = self.books[0].pk, self.reading_list.pk, self.foreign_list.pk
+        anonymous = ['/books/', '/books/?page=3', '/books/?page=9', '/books/?genre=Fiction&fields=id,title',
+                     '/books/?fields=nope', f'/books/{book}/', f'/books/{book}/?fields=title', '/books/9999/']
+        private = ['/reading-lists/', f'/reading-lists/{list_id}/', f'/reading-lists/{list_id}/?fields=id,title',
+                   f'/reading-lists/{list_id}/items/', f'/reading-lists/{foreign_id}/', f'/reading-lists/{foreign_id}/items/',
+                   '/reading-lists/9999/', '/reading-lists/?fields=nope']
+        self.assertEqual([self.assertSameResponse(path) for path in anonymous], [200, 200, 404, 200, 400, 200, 200, 404])
+        self.assertEqual({self.assertSameResponse(path) for path in private}, {401})
+        self.assertEqual({self.assertSameResponse(path, HTTP_AUTHORIZATION='Bearer garbage') for path in private[:2]}, {401})
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+        self.assertEqual([self.assertSameResponse(path) for path in private], [200, 200, 200, 200, 404, 404, 404, 400])
+        self.assertEqual(self.assertSameResponse('/books/?page=2'), 200)
+
+    def test_async_authentication_and_pagination(self):
+        factory = APIRequestFactory()
+        auth = CachedJWTAuthentication()
+        token = AccessToken.for_user(self.user)
+        self.assertIsNone(async_to_sync(auth.aauthenticate)(Request(factory.get('/'))))
+        user, validated = async_to_sync(auth.aauthenticate)(Request(factory.get('/', HTTP_AUTHORIZATION=f'Bearer {token}')))
+        self.assertEqual((user.pk, validated['jti']), (self.user.pk, token['jti']))
+        with self.assertRaises(InvalidToken):
+            async_to_sync(auth.aauthenticate)(Request(factory.get('/', HTTP_AUTHORIZATION='Bearer garbage')))
+
+        request = Request(factory.get('/', {'page': 3}))
+        paginator, expected = BookPageNumberPagination(), BookPageNumberPagination()
+        with self.assertNumQueries(2):
+            page = async_to_sync(paginator.apaginate_queryset)(Book.objects.all(), request)
+        self.assertEqual(page, expected.paginate_queryset(Book.objects.all(), request))
+        self.assertEqual(paginator.get_paginated_response([]).data, expected.get_paginated_response([]).data)
+        with self.assertRaises(NotFound):
+            async_to_sync(paginator.apaginate_queryset)(Book.objects.all(), Request(factory.get('/', {'page': 4})))
+
+
+class ReadingListExpansionTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='reader', email='reader@example.com', password='Secure123!')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def add_lists(self, count, items_per_list):
+        for i in range(count):
+            reading_list = ReadingList.objects.create(user=self.user, name=f"List {ReadingList.objects.count()}")
+            for j in range(items_per_list):
+                book = Book.objects.create(
+                    title=f"{reading_list.name} Book {j}",
+                    authors="Author",
+                    genre="Fiction",
+                    publication_date=datetime.date(2020, 1, 1),
+                )
+                ReadingListItem.objects.create(reading_list=reading_list, book=book, order=j)
+
+    def test_expanded_lists_use_constant_queries(self):
+        self.add_lists(2, 3)
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/reading-lists/?expand=items&include=counts')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([len(rl['items']) for rl in response.data], [3, 3])
+        self.assertEqual([rl['item_count'] for rl in response.data], [3, 3])
+        self.assertEqual(response.data[0]['items'][0]['book']['title'], "List 0 Book 0")
+
+        self.add_lists(5, 4)
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/reading-lists/?expand=items&include=counts')
+        self.assertEqual(len(response.data), 7)
+
+    def test_plain_list_is_unchanged(self):
+        self.add_lists(1, 2)
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/reading-lists/')
+        self.assertEqual(set(response.data[0]), {'id', 'user', 'name', 'created_at', 'updated_at'})
+
+    def test_detail_and_items_avoid_n_plus_one(self):
+        self.add_lists(1, 5)
+        reading_list = ReadingList.objects.get()
+        with self.assertNumQueries(2):
+            response = self.client.get(f'/api/reading-lists/{reading_list.pk}/?expand=items&include=counts')
+        self.assertEqual(response.data['item_count'], 5)
+        with self.assertNumQueries(2):
+            response = self.client.get(f'/api/reading-lists/{reading_list.pk}/items/')
+        self.assertEqual(len(response.data), 5)
+
+
+class SparseFieldsetTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='reader', email='reader@example.com', password='Secure123!')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.book = Book.objects.create(
+            title="Dune", authors="Frank Herbert", genre="Science Fiction",
+            publication_date=datetime.date(1965, 8, 1), description="A long description.", created_by=self.user,
+        )
+        self.reading_list = ReadingList.objects.create(user=self.user, name="Favorites")
+        ReadingListItem.objects.create(reading_list=self.reading_list, book=self.book, order=1)
+
+    def test_fields_limit_output_and_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/books/?fields=title,authors')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.data['results'][0]), {'title', 'authors'})
+        self.assertFalse(any('"description"' in query['sql'] for query in queries))
+
+        response = self.client.get(f'/api/books/{self.book.pk}/?omit=description,created_by')
+        self.assertNotIn('description', response.data)
+        self.assertIn('genre', response.data)
+        self.assertNotEqual(response['ETag'], self.client.get(f'/api/books/{self.book.pk}/')['ETag'])
+
+    def test_item_books_are_narrowed(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f'/api/reading-lists/{self.reading_list.pk}/items/?omit=description')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('description', response.data[0]['book'])
+        self.assertIn('order', response.data[0])
+        self.assertFalse(any('"description"' in query['sql'] for query in queries))
+
+        response = self.client.get(f'/api/reading-lists/{self.reading_list.pk}/?expand=items&fields=id,title')
+        self.assertEqual(set(response.data['items'][0]['book']), {'id', 'title'})
+
+    def test_unknown_fields_are_rejected(self):
+        response = self.client.get('/api/books/?fields=title,isbn')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('isbn', str(response.data['error']))
+        response = self.client.get(f'/api/reading-lists/{self.reading_list.pk}/items/?fields=title&omit=genre')
+        self.assertEqual(response.status_code, 400)
+
+
+class RowSerializerParityTests(TestCase):
+    def test_rows_match_serializers(self):
+        user = User.objects.create_user(username='reader', email='reader@example.com', password='Secure123!')
+        books = [
+            Book.objects.create(title="Dune", authors="Frank Herbert", genre="Science Fiction",
+                                publication_date=datetime.date(1965, 8, 1), description="Spice.", created_by=user),
+            Book.objects.create(title="Emma", authors="Jane Austen", genre="Fiction",
+                                publication_date=datetime.date(1815, 12, 23), description=None, created_by=None),
+        ]
+        reading_list = ReadingList.objects.create(user=user, name="Favorites")
+        for order, book in enumerate(books, start=1):
+            ReadingListItem.objects.create(reading_list=reading_list, book=book, order=order * 1024)
+
+        for fieldset in (None, ('title', 'description'), ('id', 'created_by', 'publication_date', 'updated_at')):
+            rows = book_rows(fieldset)
+            expected = BookSerializer(Book.objects.order_by('id'), many=True, fields=fieldset).data
+            self.assertEqual(JSONRenderer().render(rows.serialize(rows.values(Book.objects.order_by('id')))), JSONRenderer().render(expected))
+
+            rows = reading_list_item_rows(fieldset)
+            items = ReadingListItem.objects.filter(reading_list=reading_list).order_by('order')
+            expected = ReadingListItemSerializer(items, many=True, book_fields=fieldset).data
+            self.assertEqual(JSONRenderer().render(rows.serialize(rows.values(items))), JSONRenderer().render(expected))
+
+        with timezone.override('Asia/Kolkata'):
+            rows = book_rows(None)
+            expected = BookSerializer(Book.objects.order_by('id'), many=True).data
+            self.assertEqual(rows.serialize(rows.values(Book.objects.order_by('id'))), expected)
+            self.assertTrue(expected[0]['created_at'].endswith('+05:30'))
+
+
+class LibraryStatsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='reader', email='reader@example.com', password='Secure123!')
+        self.other = User.objects.create_user(username='writer', email='writer@example.com', password='Secure123!')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def stats(self):
+        response = self.client.get('/api/users/profile/stats/')
+        self.assertEqual(response.status_code, 200)
+        return [response.data[counter] for counter in ('books_added', 'reading_lists', 'reading_list_items')]
+
+    def add_book(self, title):
+        response = self.client.post('/api/books/', {
+            'title': title, 'authors': 'Author', 'genre': 'Fiction', 'publication_date': '2020-01-01',
+        }, format='json')
+        return response.data['id']
+
+    def test_counters_follow_writes(self):
+        self.assertEqual(self.stats(), [0, 0, 0])
+        first, second, third = (self.add_book(title) for title in ("One", "Two", "Three"))
+        list_id = self.client.post('/api/reading-lists/', {'name': 'Favorites'}, format='json').data['id']
+        self.client.post(f'/api/reading-lists/{list_id}/items/', {'book_id': first}, format='json')
+        self.client.patch(f'/api/reading-lists/{list_id}/items/', {'add': [{'book_id': second}, {'book_id': third}]}, format='json')
+        self.assertEqual(self.stats(), [3, 1, 3])
+        with self.assertNumQueries(1):
+            self.client.get('/api/users/profile/stats/')
+
+        self.client.patch(f'/api/reading-lists/{list_id}/items/', {'remove': [second]}, format='json')
+        self.client.delete(f'/api/reading-lists/{list_id}/items/{first}/')
+        self.assertEqual(self.stats(), [3, 1, 1])
+
+        # Deleting a book drops it from other users' lists too.
+        other_list = ReadingList.objects.create(user=self.other, name="Borrowed")
+        ReadingListItem.objects.create(reading_list=other_list, book_id=third, order=1)
+        self.client.delete(f'/api/books/{third}/')
+        self.assertEqual(self.stats(), [2, 1, 0])
+        self.assertEqual(UserLibraryStats.objects.get(user=self.other).reading_list_items, 0)
+
+        ReadingListItem.objects.create(reading_list_id=list_id, book_id=first, order=1)
+        self.client.delete(f'/api/reading-lists/{list_id}/')
+        self.assertEqual(self.stats(), [2, 0, 0])
+        self.other.delete()
+
+    def test_deletes_without_a_stats_row_are_not_counted(self):
+        book_id = self.add_book("One")
+        list_id = self.client.post('/api/reading-lists/', {'name': 'Favorites'}, format='json').data['id']
+        self.client.post(f'/api/reading-lists/{list_id}/items/', {'book_id': book_id}, format='json')
+        UserLibraryStats.objects.all().delete()
+        self.assertEqual(self.client.delete(f'/api/books/{book_id}/').status_code, 204)
+        stats = UserLibraryStats.objects.get(user=self.user)
+        self.assertEqual((stats.books_added, stats.reading_lists, stats.reading_list_items), (0, 1, 0))
+
+        UserLibraryStats.objects.all().delete()
+        self.assertEqual(self.client.delete(f'/api/reading-lists/{list_id}/').status_code, 204)
+        stats = UserLibraryStats.objects.get(user=self.user)
+        self.assertEqual((stats.books_added, stats.reading_lists, stats.reading_list_items), (0, 0, 0))
+
+    def test_rebuild_fixes_drift(self):
+        self.add_book("One")
+        self.stats()
+        UserLibraryStats.objects.filter(user=self.user).update(books_added=9, reading_lists=4)
+        Book.objects.create(title="Two", authors="Author", genre="Fiction", publication_date=datetime.date(2020, 1, 1), created_by=self.other)
+        call_command('rebuild_library_stats', stdout=io.StringIO())
+        self.assertEqual(self.stats(), [1, 0, 0])
+        self.assertEqual(UserLibraryStats.objects.get(user=self.other).books_added, 1)
+
+
+class PopularBooksTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='reader', email='reader@example.com', password='Secure123!')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.books = [
+            Book.objects.create(title=f"Book {i}", authors="Author", genre="Fiction", publication_date=datetime.date(2020, 1, 1))
+            for i in range(3)
+        ]
+
+    def ranking(self, query=''):
+        response = self.client.get(f'/api/books/popular/{query}')
+        self.assertEqual(response.status_code, 200)
+        return [(book['id'], book['count']) for book in response.data['results']]
+
+    def test_leaderboard_follows_reading_list_changes(self):
+        first, second, third = (book.id for book in self.books)
+        lists = [self.client.post('/api/reading-lists/', {'name': name}, format='json').data['id'] for name in ("A", "B", "C")]
+        for list_id in lists:
+            self.client.post(f'/api/reading-lists/{list_id}/items/', {'book_id': second}, format='json')
+        self.client.patch(f'/api/reading-lists/{lists[0]}/items/', {'add': [{'book_id': first}, {'book_id': third}]}, format='json')
+        self.client.patch(f'/api/reading-lists/{lists[1]}/items/', {'add': [{'book_id': third}]}, format='json')
+        self.assertEqual(self.ranking(), [(second, 3), (third, 2), (first, 1)])
+        # Items added before the window don't count towards ?days=.
+        ReadingListItem.objects.filter(book_id=first).update(added_at=timezone.now() - datetime.timedelta(days=30))
+        call_command('rebuild_book_popularity', stdout=io.StringIO())
+        self.assertEqual(self.ranking('?days=7'), [(second, 3), (third, 2)])
+
+        self.client.delete(f'/api/reading-lists/{lists[2]}/items/{second}/')
+        self.client.patch(f'/api/reading-lists/{lists[1]}/items/', {'remove': [second]}, format='json')
+        self.client.delete(f'/api/reading-lists/{lists[0]}/')
+        self.assertEqual(self.ranking('?limit=5'), [(third, 1)])
+        self.assertEqual(self.ranking('?days=1&fields=id,title'), [(third, 1)])
+        self.user.delete()
+        self.assertEqual(self.ranking(), [])
+
+    def test_invalid_parameters(self):
+        for query in ('?limit=0', '?days=0', '?days=10000', '?limit=x', '?fields=nope'):
+            self.assertEqual(self.client.get(f'/api/books/popular/{query}').status_code, 400, query)
+
+
+class TypeaheadTests(TestCase):
+    def setUp(self):
+        typeahead_index.reset()
+        self.addCleanup(typeahead_index.reset)
+        self.user = User.objects.create_user(username='reader', email='reader@example.com', password='Secure123!')
+        self.client = APIClient()
+        self.rings, self.jim, self.hobbit, self.emile = (
+            Book.objects.create(title=title, authors=authors, genre="Fiction", publication_date=datetime.date(2020, 1, 1), created_by=self.user)
+            for title, authors in (("The Lord of the Rings", "J. R. R. Tolkien"), ("Lord Jim", "Joseph Conrad"),
+                                   ("The Hobbit", "J. R. R. Tolkien"), ("\u00c9mile", "Jean-Jacques Rousseau, Allan Bloom"))
+        )
+
+    def suggest(self, query):
+        response = self.client.get('/api/books/autocomplete/', {'q': query})
+        self.assertEqual(response.status_code, 200)
+        return [(result['title'], result['matched']) for result in response.data['results']]
+
+    def test_prefixes_match_any_word_start(self):
+        self.assertEqual(self.suggest("lord"), [("Lord Jim", 'title'), ("The Lord of the Rings", 'title')])
+        self.assertEqual(self.suggest("TOLK"), [("The Hobbit", 'authors'), ("The Lord of the Rings", 'authors')])
+        self.assertEqual(self.suggest("emi"), [("\u00c9mile", 'title')])
+        self.assertEqual(self.suggest("bloo"), [("\u00c9mile", 'authors')])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.suggest("the lord o"), [("The Lord of the Rings", 'title')])
+        self.assertEqual(self.client.get('/api/books/autocomplete/').status_code, 400)
+
+    def test_index_follows_book_writes(self):
+        self.suggest("lord")
+        self.client.force_authenticate(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            book_id = self.client.post('/api/books/', {
+                'title': "Lords and Ladies", 'authors': "Terry Pratchett", 'genre': 'Fiction', 'publication_date': '1992-01-01',
+            }, format='json').data['id']
+        self.assertIn(("Lords and Ladies", 'title'), self.suggest("lords"))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f'/api/books/{self.jim.pk}/')
+        self.assertEqual(self.suggest("lord"), [("Lords and Ladies", 'title'), ("The Lord of the Rings", 'title')])
+
+        # Popular books rank first once the index is reloaded.
+        reading_list = ReadingList.objects.create(user=self.user, name="Favorites")
+        ReadingListItem.objects.create(reading_list=reading_list, book=self.rings, order=1)
+        typeahead_index.reset()
+        self.assertEqual(self.suggest("tolk")[0], ("The Lord of the Rings", 'authors'))
+        self.assertIn(book_id, [book['id'] for book in self.client.get('/api/books/autocomplete/', {'q': 'terry'}).data['results']])
+
+    def test_reading_list_changes_rerank_at_most_once_per_interval(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.assertEqual(self.suggest("tolk"), [("The Hobbit", 'authors'), ("The Lord of the Rings", 'authors')])
+        loaded = typeahead_index._version
+        reading_list = ReadingList.objects.create(user=self.user, name="Favorites")
+        with self.captureOnCommitCallbacks(execute=True):
+            ReadingListItem.objects.create(reading_list=reading_list, book=self.rings, order=1)
+        bumped = typeahead_index.shared_version()
+        self.assertNotEqual(bumped, loaded)
+        typeahead_index._load()
+        self.assertEqual(self.suggest("tolk"), [("The Lord of the Rings", 'authors'), ("The Hobbit", 'authors')])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.force_authenticate(self.user)
+            self.client.patch(f'/api/reading-lists/{reading_list.pk}/items/', {'add': [{'book_id': self.hobbit.pk}]}, format='json')
+        self.assertEqual(typeahead_index.shared_version(), bumped)
+
+    def test_precomputed_prefixes_match_scans(self):
+        precomputed, scanned = TypeaheadIndex(heavy_threshold=1), TypeaheadIndex(heavy_threshold=10**6)
+        queries = ("t", "l", "lord", "j", "the", "emile")
+        for index in (precomputed, scanned):
+            index.suggest("t")
+            index.book_changed(self.jim.pk)
+            index.book_changed(9001, "The Last Lord", "Jo Author")
+            index.book_changed(self.hobbit.pk, "The Hobbit, Revised", "J. R. R. Tolkien")
+        self.assertTrue(precomputed._heavy)
+        for query in queries:
+            self.assertEqual(precomputed.suggest(query, 3), scanned.suggest(query, 3), query)
+
+    def test_large_catalogs_are_matched_in_the_database(self):
+        self.addCleanup(setattr, typeahead_index, 'max_books', typeahead_index.max_books)
+        typeahead_index.max_books = 1
+        self.assertEqual(self.suggest("the lord"), [("The Lord of the Rings", 'title')])
+        self.assertEqual(self.suggest("joseph"), [("Lord Jim", 'authors')])
+
+
+@skipUnless(np is not None, "numpy and scipy are not installed")
+class RelatedBooksTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='reader', email='reader@example.com', password='Secure123!')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.a, self.b, self.c, self.d = (
+            Book.objects.create(title=title, authors="Author", genre="Fiction", publication_date=datetime.date(2020, 1, 1))
+            for title in "ABCD"
+        )
+        for name, books in (("L1", "abc"), ("L2", "ab"), ("L3", "acd"), ("L4", "bd")):
+            reading_list = ReadingList.objects.create(user=self.user, name=name)
+            for order, book in enumerate(books, start=1):
+                ReadingListItem.objects.create(reading_list=reading_list, book=getattr(self, book), order=order)
+
+    def related(self, book):
+        response = self.client.get(f'/api/books/{book.pk}/related/')
+        self.assertEqual(response.status_code, 200)
+        return [(result['id'], result['shared_lists']) for result in response.data['results']]
+
+    def test_neighbours_are_ranked_by_cosine_similarity(self):
+        call_command('build_related_books', min_shared=1, stdout=io.StringIO())
+        # a shares 2 of 2 lists with c, 2 of 3 with b and 1 of 2 with d.
+        self.assertEqual(self.related(self.a), [(self.c.pk, 2), (self.b.pk, 2), (self.d.pk, 1)])
+
+        reading_list = ReadingList.objects.get(name="L4")
+        with self.assertNumQueries(3):
+            response = self.client.get(f'/api/reading-lists/{reading_list.pk}/recommendations/')
+        self.assertEqual([(result['id'], result['sources']) for result in response.data['results']], [(self.a.pk, 2), (self.c.pk, 2)])
+
+        call_command('build_related_books', stdout=io.StringIO())
+        self.assertEqual(self.related(self.a), [(self.c.pk, 2), (self.b.pk, 2)])
+        ReadingListItem.objects.filter(book=self.d).delete()
+        call_command('build_related_books', min_shared=1, stdout=io.StringIO())
+        self.assertFalse(RelatedBook.objects.filter(book=self.d).exists())
+        self.assertEqual(self.related(self.d), [])
+        self.assertEqual(self.client.get('/api/books/9999/related/').status_code, 404)
+
+
+def throttle_rates(**rates):
+    return override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': rates})
+
+
+class ThrottlingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = User.objects.create_user(username='reader', email='reader@example.com', password='Secure123!')
+        self.client = APIClient()
+
+    def add_book(self, title):
+        return self.client.post('/api/books/', {
+            'title': title, 'authors': 'Author', 'genre': 'Fiction', 'publication_date': '2020-01-01',
+        }, format='json')
+
+    @throttle_rates(book_create='2/min')
+    def test_writes_spend_the_users_bucket(self):
+        self.client.force_authenticate(self.user)
+        self.assertEqual([self.add_book(title).status_code for title in ("One", "Two", "Three")], [201, 201, 429])
+        throttled = self.add_book("Four")
+        self.assertGreaterEqual(int(throttled['Retry-After']), 1)
+        self.assertEqual(Book.objects.count(), 2)
+        # Reads don't spend tokens. Another user shares this address's
+        # bucket, but not from an address of their own.
+        self.assertEqual(self.client.get('/api/books/').status_code, 200)
+        self.client.force_authenticate(User.objects.create_user(username='writer', email='writer@example.com', password='Secure123!'))
+        self.assertEqual(self.add_book("Five").status_code, 429)
+        self.client.defaults['REMOTE_ADDR'] = '10.0.0.2'
+        self.assertEqual(self.add_book("Six").status_code, 201)
+        # The first user is still out of tokens from any address.
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.add_book("Seven").status_code, 429)
+
+    @throttle_rates(book_create='2/min')
+    def test_a_throttled_write_spends_neither_bucket(self):
+        self.client.force_authenticate(User.objects.create_user(username='writer', email='writer@example.com', password='Secure123!'))
+        self.assertEqual([self.add_book(title).status_code for title in ("One", "Two")], [201, 201])
+        # This address is out of tokens, so the user's own bucket is left alone.
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.add_book("Three").status_code, 429)
+        self.client.defaults['REMOTE_ADDR'] = '10.0.0.2'
+        self.assertEqual([self.add_book(title).status_code for title in ("Four", "Five", "Six")], [201, 201, 429])
+
+    @throttle_rates(login='1/min')
+    def test_forwarded_for_does_not_pick_the_bucket(self):
+        credentials = {'username': 'reader', 'password': 'Secure123!'}
+        self.assertEqual(self.client.post('/api/users/login/', credentials, HTTP_X_FORWARDED_FOR='203.0.113.1').status_code, 200)
+        self.assertEqual(self.client.post('/api/users/login/', credentials, HTTP_X_FORWARDED_FOR='203.0.113.2').status_code, 429)
+        # Behind a trusted proxy the client is the address it forwarded.
+        with override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'NUM_PROXIES': 1}):
+            self.assertEqual(self.client.post('/api/users/login/', credentials, HTTP_X_FORWARDED_FOR='203.0.113.3').status_code, 200)
+            self.assertEqual(self.client.post('/api/users/login/', credentials, HTTP_X_FORWARDED_FOR='203.0.113.3').status_code, 429)
+
+    @throttle_rates(login='1/min', register='1/min')
+    def test_auth_routes_have_their_own_budget_per_ip(self):
+        credentials = {'username': 'reader', 'password': 'Secure123!'}
+        self.assertEqual(self.client.post('/api/users/login/', credentials, REMOTE_ADDR='10.0.0.1').status_code, 200)
+        self.assertEqual(self.client.post('/api/users/login/', credentials, REMOTE_ADDR='10.0.0.1').status_code, 429)
+        self.assertEqual(self.client.post('/api/users/login/', credentials, REMOTE_ADDR='10.0.0.2').status_code, 200)
+        registration = {'username': 'newcomer', 'email': 'newcomer@example.com', 'password': 'Bench#Pass123', 'password2': 'Bench#Pass123'}
+        self.assertEqual(self.client.post('/api/users/register/', registration, REMOTE_ADDR='10.0.0.1').status_code, 201)
+
+    @override_settings(LOAD_SHEDDING={'MAX_IN_FLIGHT': 2, 'RETRY_AFTER': 3})
+    def test_shedding_refuses_throttled_writes_past_the_limit(self):
+        middleware = LoadSheddingMiddleware(lambda request: None)
+        factory = APIRequestFactory()
+        view = BookListCreateView.as_view()
+        middleware.in_flight = 2
+        self.assertIsNone(middleware.process_view(factory.post('/api/books/'), view, (), {}))
+        middleware.in_flight = 3
+        response = middleware.process_view(factory.post('/api/books/'), view, (), {})
+        self.assertEqual((response.status_code, response['Retry-After']), (503, '3'))
+        self.assertIsNone(middleware.process_view(factory.get('/api/books/'), view, (), {}))
+
+
+def log_record(message, *args, level=logging.INFO, name='books_manage.views', exc_info=None, **extra):
+    record = logging.LogRecord(name, level, __file__, 1, message, args, exc_info)
+    record.__dict__.update(extra)
+    return record
+
+
+class LoggingTests(TestCase):
+    def test_json_formatter(self):
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            record = log_record("Book %s saved by %s", 7, 'reader', exc_info=sys.exc_info(), request_id='abc')
+        payload = json.loads(JSONFormatter().format(record))
+        self.assertEqual((payload['level'], payload['logger'], payload['message']), ('INFO', 'books_manage.views', "Book 7 saved by reader"))
+        self.assertEqual(payload['request_id'], 'abc')
+        self.assertIn("ValueError: boom", payload['exc_info'])
+        self.assertTrue(payload['time'].endswith('+00:00'))
+
+    def test_sampling_filter(self):
+        sampling = SamplingFilter({'books_manage': 0.5, 'books_manage.views': 0}, default_rate=1)
+        self.assertEqual([sampling.rate_for(name) for name in ('books_manage.views', 'books_manage.views.x', 'books_manage.caching', 'django')], [0, 0, 0.5, 1])
+        self.assertFalse(sampling.filter(log_record("dropped")))
+        self.assertTrue(sampling.filter(log_record("kept", level=logging.WARNING)))
+        with mock.patch('booksapi.logging_utils.random.random', side_effect=[0.4, 0.6]):
+            self.assertEqual([sampling.filter(log_record("x", name='books_manage.caching')) for _ in range(2)], [True, False])
+
+    def test_queued_handler_resolves_records_before_queueing(self):
+        handler = QueuedStreamHandler(queue_size=2)
+        self.addCleanup(handler.stop)
+        stream = io.StringIO()
+        handler.target.setStream(stream)
+        handler.setFormatter(JSONFormatter())
+        tags = ['fantasy']
+        try:
+            raise KeyError('isbn')
+        except KeyError:
+            handler.handle(log_record("Tags %s", tags, exc_info=sys.exc_info()))
+        tags.append('changed later')
+        handler.stop()
+        payload = json.loads(stream.getvalue())
+        self.assertEqual(payload['message'], "Tags ['fantasy']")
+        self.assertIn("KeyError: 'isbn'", payload['exc_info'])
+
+        # A full queue drops records and reports them once there is room.
+        handler.queue.put_nowait(log_record("one"))
+        handler.queue.put_nowait(log_record("two"))
+        for _ in range(3):
+            handler.handle(log_record("lost"))
+        self.assertEqual(handler.dropped, 3)
+        handler.queue.get_nowait()
+        handler.queue.get_nowait()
+        handler.handle(log_record("kept"))
+        messages = [handler.queue.get_nowait() for _ in range(2)]
+        self.assertEqual([record.msg for record in messages], ["kept", "Dropped 3 log records, the log queue was full"])
+        self.assertEqual((messages[1].levelno, messages[1].dropped_total, messages[1].args), (logging.WARNING, 3, None))
+
+
+class FastJSONTests(TestCase):
+    def test_output_matches_drf_json_renderer(self):
+        user = User.objects.create_user(username='reader', email='reader@example.com', password='Secure123!')
+        client = APIClient()
+        client.force_authenticate(user)
+        book = Book.objects.create(
+            title="Caf\u00e9 \u2028 \"Noir\"", authors="A. Writer", genre="Mystery",
+            publication_date=datetime.date(2001, 2, 3), description="Line one\nline two \u2029", created_by=user,
+        )
+        reading_list = ReadingList.objects.create(user=user, name="Favorites")
+        ReadingListItem.objects.create(reading_list=reading_list, book=book, order=1024)
+
+        payloads = dict(sample_payloads(books=5))
+        for path in ('/api/books/', f'/api/books/{book.pk}/', f'/api/reading-lists/{reading_list.pk}/?expand=items&include=counts'):
+            response = client.get(path)
+            self.assertEqual(response.content, JSONRenderer().render(response.data))
+            payloads[path] = response.data
+        for name, payload in payloads.items():
+            rendered = FastJSONRenderer().render(payload)
+            self.assertEqual(rendered, JSONRenderer().render(payload), name)
+            self.assertEqual(FastJSONParser().parse(io.BytesIO(rendered)), JSONParser().parse(io.BytesIO(rendered)), name)
+
+    def test_parse_errors_match(self):
+        with self.assertRaisesMessage(ParseError, 'JSON parse error - Expecting value: line 1 column 10 (char 9)'):
+            FastJSONParser().parse(io.BytesIO(b'{"title":}'))
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+def instrumentation(**options):
+    return override_settings(INSTRUMENTATION={**settings.INSTRUMENTATION, **options})
+
+
+class InstrumentationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        make_books(3)
+        self.client = APIClient()
+
+    def scrape(self, **extra):
+        response = self.client.get('/metrics', **extra)
+        return response.status_code, response.content.decode()
+
+    def test_server_timing_and_histograms(self):
+        def observed():
+            for line in REQUEST_DURATION.render():
+                if line.startswith('booksapi_request_duration_seconds_count{route="book-list-create",method="GET"}'):
+                    return int(line.rsplit(' ', 1)[1])
+            return 0
+
+        before = observed()
+        response = self.client.get('/api/books/')
+        self.assertEqual(observed(), before + 1)
+        timing = dict(part.split(';', 1) for part in response['Server-Timing'].split(', '))
+        self.assertEqual(list(timing), ['db', 'serialize', 'app', 'render', 'total'])
+        self.assertGreater(float(timing['serialize'].split('=')[1]), 0)
+        queries = int(timing['db'].split('desc="')[1].split()[0])
+        with self.assertNumQueries(queries):
+            self.client.get('/api/books/?genre=Fiction')
+
+        with instrumentation(SERVER_TIMING=False):
+            self.assertNotIn('Server-Timing', self.client.get('/api/books/'))
+
+    def test_metrics_are_closed_unless_allowed(self):
+        self.client.get('/api/books/')
+        self.assertEqual(self.scrape()[0], 403)
+        with override_settings(DEBUG=True):
+            self.assertEqual(self.scrape()[0], 200)
+        # DEBUG=False in the environment must not count as on.
+        for value, debug in (('False', False), ('0', False), ('', False), ('True', True), ('1', True)):
+            with mock.patch.dict('os.environ', {'DEBUG': value}):
+                self.assertIs(runpy.run_path(import_module(settings.SETTINGS_MODULE).__file__)['DEBUG'], debug, value)
+        with instrumentation(METRICS_ALLOWED_IPS=['10.0.0.1']):
+            self.assertEqual(self.scrape()[0], 403)
+            status_code, body = self.scrape(REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(status_code, 200)
+        self.assertIn('# TYPE booksapi_request_duration_seconds histogram', body)
+        self.assertIn('booksapi_requests_total{route="book-list-create",method="GET",status="200"}', body)
+        self.assertIn('booksapi_response_size_bytes_bucket{route="book-list-create",method="GET",le="+Inf"}', body)
+        with instrumentation(METRICS_ALLOWED_IPS=['*']):
+            self.assertEqual(self.scrape()[0], 200)
+
+    def test_pool_metrics_only_read_open_pools(self):
+        wrapper = connections['default']
+        with mock.patch.dict(wrapper.settings_dict['OPTIONS'], {'pool': True}):
+            self.assertEqual(DatabasePoolMetrics().render(), [])
+            pool = mock.Mock(**{'get_stats.return_value': {'pool_size': 2, 'requests_wait_ms': 1500}})
+            with mock.patch.object(type(wrapper), '_connection_pools', {'default': pool}, create=True):
+                lines = DatabasePoolMetrics().render()
+        self.assertIn('booksapi_db_pool_connections{alias="default"} 2', lines)
+        self.assertIn('booksapi_db_pool_wait_seconds_total{alias="default"} 1.5', lines)
+
+    def test_slow_requests_are_logged_with_their_sql(self):
+        with instrumentation(SLOW_REQUEST_MS=0.001), self.assertLogs('booksapi.instrumentation', 'WARNING') as logs:
+            self.client.get('/api/books/?genre=Fiction')
+        self.assertEqual(len(logs.records), 1)
+        message = logs.records[0].getMessage()
+        self.assertIn("Slow request GET /api/books/ (book-list-create)", message)
+        self.assertIn('FROM "books"', message)
+        with self.assertNoLogs('booksapi.instrumentation', 'WARNING'):
+            self.client.get('/api/books/')
+
+
+class BenchmarkSuiteTests(TestCase):
+    def test_every_route_has_a_scenario(self):
+        self.assertEqual(missing_scenarios(), [])
+
+    def test_seeding_is_reproducible(self):
+        seed_data(users=5, books=30, seed=7)
+        first = list(Book.objects.order_by('id').values_list('title', 'genre', 'authors'))
+        Book.objects.all().delete()
+        User.objects.all().delete()
+        seed_data(users=5, books=30, seed=7)
+        self.assertEqual(list(Book.objects.order_by('id').values_list('title', 'genre', 'authors')), first)
+
+    def test_all_scenarios_succeed_on_seeded_data(self):
+        seed_data(users=5, books=60, lists_per_user=2, items_per_list=5)
+        results = run_benchmark(iterations=2, warmup=0)
+        self.assertEqual({key: result['errors'] for key, result in results.items() if result['error_count']}, {})
+
+    def test_baseline_comparison_flags_regressions(self):
+        baseline = {'GET book-detail': {'p95_ms': 1.0, 'queries_p50': 1}}
+        current = {'GET book-detail': {'p95_ms': 1.1, 'queries_p50': 2}}
+        self.assertEqual(compare_to_baseline(current, baseline), ['GET book-detail: queries 1 -> 2'])
+        current = {'GET book-detail': {'p95_ms': 5.0, 'queries_p50': 1}}
+        self.assertEqual(len(compare_to_baseline(current, baseline)), 1)
+
+    def test_persistent_connections_are_reused(self):
+        opened = lambda: DB_CONNECTIONS.value(('default-benchmark-persistent',))
+        before = opened()
+        results = benchmark_connections(number=4, warmup=1)
+        self.assertLessEqual({'connect', 'persistent'}, set(results))
+        self.assertEqual(results['connect']['saving_us'], 0)
+        self.assertEqual(opened() - before, 1)
@@ -0,0 +1,338 @@
+"""
+Typeahead suggestions for book titles and authors.
+
+Each process keeps a TypeaheadIndex: a sorted array with one normalized key
+per word start of every title and author, so "rin" finds "The Lord of the
+Rings" and "tolk" finds "J. R. R. Tolkien". Keys are case-folded and have
+accents and punctuation removed. A prefix is answered with two bisections
+and a scan of the matching range. Short prefixes like "t" match too many
+keys to scan per keystroke, so prefixes of over heavy_threshold keys have
+their top MAX_SUGGESTIONS precomputed and kept up to date on every change.
+Matches at the start of a title or author rank first, then books in more
+reading lists, then shorter titles.
+
+The index is loaded on first use, and wsgi.py and asgi.py warm it when the
+server starts. Committed book saves and deletes update it in place and
+increment a version counter in the shared cache. Other processes see the new
+version within TYPEAHEAD['SYNC_INTERVAL'] seconds and reload in a background
+thread, answering from the previous index meanwhile. Reading list counts
+are read when the index loads; reading list changes bump the version too,
+but at most once per TYPEAHEAD['POPULARITY_REFRESH'] seconds, so popularity
+ranks lag by up to that long plus a reload. Catalogs over
+TYPEAHEAD['MAX_BOOKS'] are never loaded; prefixes are then matched against
+the start of title and authors in the database, using the lower(title) and
+lower(authors) pattern indexes on PostgreSQL.
+"""
+import bisect
+import heapq
+import logging
+import re
+import threading
+import time
+import unicodedata
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import F, Q
+from django.db.models.functions import Length, Lower
+from .models import Book
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = 'books:typeahead:version'
+# Held for popularity_refresh seconds after a popularity-driven reload.
+POPULARITY_KEY = 'books:typeahead:popularity'
+# Word starts indexed per title or author.
+MAX_WORDS = 8
+# Sorts after any character of a normalized key.
+KEY_END = '\U0010ffff'
+# Longest suggestion list; precomputed for heavy prefixes.
+MAX_SUGGESTIONS = 20
+WORD_RE = re.compile(r'\w+')
+
+
+def normalize(text):
+    """Case-folded words of text without accents or punctuation, joined by single spaces."""
+    text = text or ''
+    if not text.isascii():
+        decomposed = unicodedata.normalize('NFKD', text)
+        text = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return ' '.join(WORD_RE.findall(text.casefold()))
+
+
+def book_entries(book_id, title, authors):
+    """{sort key: (book_id, field, word)} for every indexed word start of a book."""
+    entries = {}
+    for field, values in (('title', [title]), ('authors', (authors or '').split(','))):
+        for value in values:
+            words = normalize(value).split()
+            for word in range(min(len(words), MAX_WORDS)):
+                # The book id keeps sort keys unique; '\x00' sorts before any word character.
+                entries.setdefault(f"{' '.join(words[word:])}\x00{book_id}", (book_id, field, word))
+    return entries
+
+
+def database_suggestions(prefix, limit):
+    """Suggestions from books whose lower-cased title or authors start with prefix."""
+    books = (
+        Book.objects.annotate(lower_title=Lower('title'), lower_authors=Lower('authors'))
+        .filter(Q(lower_title__startswith=prefix) | Q(lower_authors__startswith=prefix))
+        .order_by(F('popularity__list_count').desc(nulls_last=True), Length('title'), 'id')
+        .values_list('id', 'title', 'authors', 'lower_title')[:limit]
+    )
+    return [
+        {'id': book_id, 'title': title, 'authors': authors, 'matched': 'title' if lower_title.startswith(prefix) else 'authors'}
+        for book_id, title, authors, lower_title in books
+    ]
+
+
+class TypeaheadIndex:
+    """In-process prefix index over book titles and authors."""
+
+    def __init__(self, max_books=200000, sync_interval=5, heavy_threshold=1000, popularity_refresh=300):
+        self.max_books = max_books
+        self.sync_interval = sync_interval
+        self.popularity_refresh = popularity_refresh
+        self.heavy_threshold = heavy_threshold
+        self._lock = threading.RLock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._keys = None
+            self._entries = []
+            self._books = {}
+            self._heavy = {}
+            self._in_database = False
+            self._version = None
+            self._checked_at = 0.0
+            self._reloading = False
+
+    @staticmethod
+    def shared_version():
+        version = cache.get(VERSION_KEY)
+        if version is None:
+            # Restart from the clock, so a counter lost to eviction never
+            # goes back to a value some process already has.
+            cache.add(VERSION_KEY, time.time_ns(), None)
+            version = cache.get(VERSION_KEY)
+        return version
+
+    def _bump(self):
+        try:
+            return cache.incr(VERSION_KEY)
+        except ValueError:
+            self.shared_version()
+            return cache.incr(VERSION_KEY)
+
+    @staticmethod
+    def _rank(books, book_id, field, word):
+        title, _, popularity = books[book_id]
+        return (word > 0, -popularity, field != 'title', len(title), book_id)
+
+    def _build(self):
+        """
+        (keys, entries, books, heavy) read from the catalog, or None when it
+        has more than max_books. heavy maps every prefix of more than
+        heavy_threshold keys to its precomputed top suggestions.
+        """
+        if Book.objects.count() > self.max_books:
+            return None
+        books, by_key = {}, {}
+        rows = Book.objects.values_list('id', 'title', 'authors', 'popularity__list_count')
+        for book_id, title, authors, popularity in rows.iterator(chunk_size=5000):
+            books[book_id] = (title, authors, popularity or 0)
+            by_key.update(book_entries(book_id, title, authors))
+        keys = sorted(by_key)
+        entries = [by_key[key] for key in keys]
+
+        # Walking the entries best first, each heavy prefix's first
+        # MAX_SUGGESTIONS distinct books are its top suggestions.
+        ranks = [self._rank(books, *entry) for entry in entries]
+        heavy = {prefix: [] for prefix in self._heavy_prefixes(keys)}
+        for index in sorted(range(len(keys)), key=ranks.__getitem__) if heavy else ():
+            key, (book_id, field, _) = keys[index], entries[index]
+            length = 1
+            while key[:length] in heavy:
+                top = heavy[key[:length]]
+                if len(top) < MAX_SUGGESTIONS and all(book_id != listed for _, listed, _ in top):
+                    top.append((ranks[index], book_id, field))
+                length += 1
+        return keys, entries, books, heavy
+
+    def _heavy_prefixes(self, keys):
+        """Prefixes that more than heavy_threshold of the sorted keys start with."""
+        heavy = []
+        ranges = [(0, len(keys), '')]
+        while ranges:
+            longer = []
+            for start, end, parent in ranges:
+                length = len(parent) + 1
+                index = start
+                while index < end:
+                    prefix = keys[index][:length]
+                    if prefix.endswith('\x00'):
+                        # The key is the parent prefix itself.
+                        index += 1
+                        continue
+                    stop = bisect.bisect_left(keys, prefix + KEY_END, index, end)
+                    if stop - index > self.heavy_threshold:
+                        heavy.append(prefix)
+                        longer.append((index, stop, prefix))
+                    index = stop
+            ranges = longer
+        return heavy
+
+    def _load(self):
+        # Read the version first, so changes made while the catalog is read
+        # leave it behind and cause another reload.
+        version = self.shared_version()
+        started = time.perf_counter()
+        built = self._build()
+        with self._lock:
+            if built is None:
+                self._keys, self._entries, self._books, self._heavy, self._in_database = [], [], {}, {}, True
+            else:
+                (self._keys, self._entries, self._books, self._heavy), self._in_database = built, False
+            self._version = version
+        logger.info(
+            "Typeahead index loaded: %s keys for %s books in %.0fms%s", len(self._keys), len(self._books),
+            (time.perf_counter() - started) * 1000, " (catalog too large, using the database)" if built is None else "",
+        )
+
+    def _reload_in_background(self):
+        try:
+            self._load()
+        except Exception as e:
+            logger.error("Typeahead index reload failed: %s", e)
+        finally:
+            self._reloading = False
+            connections.close_all()
+
+    def _start_reload(self):
+        with self._lock:
+            if self._reloading:
+                return
+            self._reloading = True
+        threading.Thread(target=self._reload_in_background, name='typeahead-reload', daemon=True).start()
+
+    def _sync(self):
+        if self._keys is None:
+            with self._lock:
+                if self._keys is None:
+                    self._load()
+                    self._checked_at = time.monotonic()
+            return
+        now = time.monotonic()
+        if now - self._checked_at < self.sync_interval:
+            return
+        self._checked_at = now
+        if self.shared_version() != self._version:
+            self._start_reload()
+
+    def warm(self):
+        """Load the index in a background thread, e.g. when the server starts."""
+        if self._keys is None:
+            self._start_reload()
+
+    def invalidate(self):
+        """Reload in every process, this one included, e.g. after bulk writes that send no signals."""
+        self._bump()
+        self._checked_at = 0.0
+
+    def popularity_changed(self):
+        """Reload everywhere to re-rank by reading list counts, at most once per popularity_refresh seconds."""
+        if self.popularity_refresh and cache.add(POPULARITY_KEY, True, self.popularity_refresh):
+            self.invalidate()
+
+    def _heavy_prefixes_of(self, key):
+        length = 1
+        while key[:length] in self._heavy:
+            yield key[:length]
+            length += 1
+
+    def _remove_book(self, book_id):
+        book = self._books.get(book_id)
+        if book is None:
+            return
+        stale = set()
+        for key in book_entries(book_id, book[0], book[1]):
+            position = bisect.bisect_left(self._keys, key)
+            if position < len(self._keys) and self._keys[position] == key:
+                del self._keys[position]
+                del self._entries[position]
+            stale.update(prefix for prefix in self._heavy_prefixes_of(key)
+                         if any(book_id == listed for _, listed, _ in self._heavy[prefix]))
+        del self._books[book_id]
+        # Something else moves up into the freed place.
+        for prefix in stale:
+            self._heavy[prefix] = self._scan(prefix, MAX_SUGGESTIONS)
+
+    def _add_book(self, book_id, title, authors, popularity):
+        self._books[book_id] = (title, authors, popularity)
+        for key, entry in book_entries(book_id, title, authors).items():
+            position = bisect.bisect_left(self._keys, key)
+            self._keys.insert(position, key)
+            self._entries.insert(position, entry)
+            rank = self._rank(self._books, *entry)
+            for prefix in self._heavy_prefixes_of(key):
+                top = [item for item in self._heavy[prefix] if item[1] != book_id or item[0] < rank]
+                if all(item[1] != book_id for item in top):
+                    bisect.insort(top, (rank, book_id, entry[1]))
+                self._heavy[prefix] = top[:MAX_SUGGESTIONS]
+
+    def book_changed(self, book_id, title=None, authors=None):
+        """
+        Apply a committed book save, given its title and authors, or a
+        delete, given neither, and tell other processes to reload.
+        """
+        version = self._bump()
+        with self._lock:
+            if self._keys is None or self._in_database:
+                return
+            popularity = self._books.get(book_id, (None, None, 0))[2]
+            self._remove_book(book_id)
+            if title is not None:
+                self._add_book(book_id, title, authors, popularity)
+            # Nothing else changed since our version: no need to reload.
+            if version == self._version + 1:
+                self._version = version
+
+    def _scan(self, prefix, limit):
+        """[(rank, book_id, field)] for the best limit books matching prefix, from its range of keys."""
+        start = bisect.bisect_left(self._keys, prefix)
+        end = bisect.bisect_left(self._keys, prefix + KEY_END, start)
+        best = {}
+        for book_id, field, word in self._entries[start:end]:
+            rank = self._rank(self._books, book_id, field, word)
+            if book_id not in best or rank < best[book_id][0]:
+                best[book_id] = (rank, book_id, field)
+        return heapq.nsmallest(limit, best.values())
+
+    def suggest(self, query, limit=8):
+        """
+        Up to limit {'id', 'title', 'authors', 'matched'} suggestions for
+        books with a title or author word starting with query, best first.
+        """
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        limit = min(limit, MAX_SUGGESTIONS)
+        self._sync()
+        if self._in_database:
+            return database_suggestions(prefix, limit)
+
+        with self._lock:
+            top = self._heavy.get(prefix)
+            top = top[:limit] if top is not None else self._scan(prefix, limit)
+            return [
+                {'id': book_id, 'title': self._books[book_id][0], 'authors': self._books[book_id][1], 'matched': field}
+                for _, book_id, field in top
+            ]
+
+
+typeahead_index = TypeaheadIndex(
+    max_books=settings.TYPEAHEAD['MAX_BOOKS'],
+    sync_interval=settings.TYPEAHEAD['SYNC_INTERVAL'],
+    popularity_refresh=settings.TYPEAHEAD['POPULARITY_REFRESH'],
+)
@@ -1,12 +1,27 @@
 from django.urls import path
-from .views import BookListCreateView, BookDetailView, ReadingListListCreateView, ReadingListDetailView, ReadingListItemCreateDeleteView
+from .async_views import AsyncBookListView, AsyncBookDetailView, AsyncReadingListListView, AsyncReadingListDetailView, AsyncReadingListItemListView
+from .views import BookListCreateView, BookSearchView, BookAutocompleteView, BookImportView, BookExportView, BookFacetsView, BookPopularView, BookRelatedView, BookDetailView, ReadingListListCreateView, ReadingListDetailView, ReadingListItemCreateDeleteView, ReadingListRecommendationsView
 
 urlpatterns = [
     path('books/', BookListCreateView.as_view(), name='book-list-create'),
+    path('books/search/', BookSearchView.as_view(), name='book-search'),
+    path('books/autocomplete/', BookAutocompleteView.as_view(), name='book-autocomplete'),
+    path('books/import/', BookImportView.as_view(), name='book-import'),
+    path('books/export/', BookExportView.as_view(), name='book-export'),
+    path('books/facets/', BookFacetsView.as_view(), name='book-facets'),
+    path('books/popular/', BookPopularView.as_view(), name='book-popular'),
     path('books/<int:pk>/', BookDetailView.as_view(), name='book-detail'),
+    path('books/<int:pk>/related/', BookRelatedView.as_view(), name='book-related'),
     path('reading-lists/', ReadingListListCreateView.as_view(), name='reading-list-list-create'),
     path('reading-lists/<int:pk>/', ReadingListDetailView.as_view(), name='reading-list-detail'),
     path('reading-lists/<int:pk>/items/', ReadingListItemCreateDeleteView.as_view(), name='reading-list-item-create'),
     path('reading-lists/<int:pk>/items/<int:book_id>/', ReadingListItemCreateDeleteView.as_view(), name='reading-list-item-delete'),
+    path('reading-lists/<int:pk>/recommendations/', ReadingListRecommendationsView.as_view(), name='reading-list-recommendations'),
+    # Async read-only variants, served natively under ASGI.
+    path('async/books/', AsyncBookListView.as_view(), name='async-book-list'),
+    path('async/books/<int:pk>/', AsyncBookDetailView.as_view(), name='async-book-detail'),
+    path('async/reading-lists/', AsyncReadingListListView.as_view(), name='async-reading-list-list'),
+    path('async/reading-lists/<int:pk>/', AsyncReadingListDetailView.as_view(), name='async-reading-list-detail'),
+    path('async/reading-lists/<int:pk>/items/', AsyncReadingListItemListView.as_view(), name='async-reading-list-items'),
 
 ]
\ No newline at end of file
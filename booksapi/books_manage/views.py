@@ -1,85 +1,394 @@
 import logging
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Prefetch
+from django.http import StreamingHttpResponse
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly
 from rest_framework import status
+from rest_framework.exceptions import NotFound, ValidationError
 from .models import Book, ReadingList, ReadingListItem
-from .serializers import BookSerializer, ReadingListSerializer, ReadingListItemSerializer
-from rest_framework.pagination import PageNumberPagination
+from .serializers import BookSerializer, DuplicateBookError, ReadingListSerializer, ReadingListDetailSerializer, ReadingListItemSerializer, ReadingListItemBatchSerializer
+from .ordering import apply_item_batch, next_order
+from .search import search_books
+from .filters import filter_books
+from .facets import get_book_facets
+from .caching import cached_response, get_cached_book, get_cached_book_list, sparse_entry
+from .fieldsets import ALWAYS_LOADED, apply_book_fieldset, book_fieldset
+from .rows import book_rows, reading_list_item_rows
+from .popularity import popular_books, record_item_changes
+from .related import recommended_books, related_books
+from .stats import adjust_library_stats
+from .typeahead import MAX_SUGGESTIONS, typeahead_index
+from .exporters import EXPORT_CONTENT_TYPES, EXPORT_FORMATS, stream_export
+from .importers import IMPORT_FORMATS, detect_import_format, import_books
+from .pagination import BookPageNumberPagination, BookCursorPagination, wants_cursor_pagination
 
 logger = logging.getLogger(__name__)
 
 class BookListCreateView(APIView):
     permission_classes = [IsAuthenticatedOrReadOnly]
-    pagination_class = PageNumberPagination
+    throttle_scope = 'book_create'
+    pagination_class = BookPageNumberPagination
+    cursor_pagination_class = BookCursorPagination
+
+    def build_page(self, request):
+        rows = book_rows(book_fieldset(request.query_params))
+        books = rows.values(filter_books(Book.objects.all(), request.query_params), *ALWAYS_LOADED)
+        if wants_cursor_pagination(request):
+            paginator = self.cursor_pagination_class()
+        else:
+            paginator = self.pagination_class()
+        page = paginator.paginate_queryset(books, request)
+        last_modified = max((book['updated_at'] for book in page), default=None)
+        return paginator.get_paginated_response(rows.serialize(page)).data, last_modified
 
     def get(self, request):
         try:
-            books = Book.objects.all()
-            paginator = self.pagination_class()
-            paginator.page_size = 10
-            page = paginator.paginate_queryset(books, request)
-            serializer = BookSerializer(page, many=True, context={'request': request})
-            logger.info(f"Retrieved paginated book list by {request.user.username if request.user.is_authenticated else 'anonymous'}")
-            return paginator.get_paginated_response(serializer.data)
+            entry = get_cached_book_list(request, lambda: self.build_page(request))
+            logger.info("Retrieved paginated book list by %s", request.user.username if request.user.is_authenticated else 'anonymous')
+            return cached_response(request, entry)
+        except ValidationError as e:
+            logger.warning("Invalid book list filters: %s", e.detail)
+            return Response({"error": e.detail}, status=status.HTTP_400_BAD_REQUEST)
+        except NotFound as e:
+            logger.warning("Invalid book list page requested: %s", e)
+            return Response({"error": str(e.detail)}, status=status.HTTP_404_NOT_FOUND)
         except Exception as e:
-            logger.error(f"Book list retrieval error: {str(e)}")
+            logger.error("Book list retrieval error: %s", e)
             return Response({"error": "Something went wrong"},status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
     def post(self, request):
         try:
             serializer = BookSerializer(data=request.data, context={'request': request})
             if serializer.is_valid():
-                serializer.save(created_by=request.user)
-                logger.info(f"Book created by {request.user.username}: {serializer.data.get('title', 'unknown')}")
+                try:
+                    serializer.save(created_by=request.user)
+                except DuplicateBookError as e:
+                    if request.query_params.get('upsert', '').lower() in ('1', 'true', 'yes'):
+                        logger.info("Existing book returned for upsert by %s: ID %s", request.user.username, e.existing.id)
+                        return Response(BookSerializer(e.existing).data, status=status.HTTP_200_OK)
+                    logger.warning("Book creation failed: %s", e.detail)
+                    return Response({"error": e.detail}, status=status.HTTP_400_BAD_REQUEST)
+                logger.info("Book created by %s: %s", request.user.username, serializer.data.get('title', 'unknown'))
                 return Response(serializer.data, status=status.HTTP_201_CREATED)
-            logger.warning(f"Book creation failed: {serializer.errors}")
+            logger.warning("Book creation failed: %s", serializer.errors)
             return Response({"error": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
-            logger.error(f"Book creation error for {request.user.username}: {str(e)}")
+            logger.error("Book creation error for %s: %s", request.user.username, e)
             return Response({"error": "Something went wrong"},status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+class BookSearchView(APIView):
+    permission_classes = [IsAuthenticatedOrReadOnly]
+    default_limit = 20
+    max_limit = 50
+
+    def get(self, request):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({"error": "The 'q' query parameter is required."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = min(int(request.query_params.get('limit', self.default_limit)), self.max_limit)
+            offset = int(request.query_params.get('offset', 0))
+            if limit < 1 or offset < 0:
+                raise ValueError
+        except ValueError:
+            return Response({"error": "'limit' and 'offset' must be non-negative integers."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            fieldset = book_fieldset(request.query_params)
+        except ValidationError as e:
+            return Response({"error": e.detail}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            ranked = search_books(query, limit=limit, offset=offset)
+            books = apply_book_fieldset(Book.objects.all(), fieldset).in_bulk([book_id for book_id, _ in ranked])
+            results = []
+            for book_id, rank in ranked:
+                if book_id in books:
+                    data = BookSerializer(books[book_id], fields=fieldset).data
+                    data['rank'] = rank
+                    results.append(data)
+            logger.info("Book search for '%s' returned %s results", query, len(results))
+            return Response({"query": query, "limit": limit, "offset": offset, "results": results}, status=status.HTTP_200_OK)
+        except Exception as e:
+            logger.error("Book search error: %s", e)
+            return Response({"error": "Something went wrong"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class BookAutocompleteView(APIView):
+    """
+    Title and author suggestions as the user types, from the in-process
+    typeahead index. Any word of a title or author can match the prefix.
+    """
+    permission_classes = [IsAuthenticatedOrReadOnly]
+    default_limit = 8
+    max_limit = MAX_SUGGESTIONS
+
+    def get(self, request):
+        query = request.query_params.get('q', '')
+        if not query.strip():
+            return Response({"error": "The 'q' query parameter is required."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = min(int(request.query_params.get('limit', self.default_limit)), self.max_limit)
+            if limit < 1:
+                raise ValueError
+        except ValueError:
+            return Response({"error": "'limit' must be a positive integer."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            results = typeahead_index.suggest(query, limit)
+            logger.debug("Typeahead for '%s' returned %s suggestions", query, len(results))
+            return Response({"query": query, "results": results}, status=status.HTTP_200_OK)
+        except Exception as e:
+            logger.error("Typeahead error: %s", e)
+            return Response({"error": "Something went wrong"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class BookImportView(APIView):
+    """
+    Bulk import from an NDJSON or CSV feed, sent either as the raw request
+    body or as a multipart upload in the 'file' field. The body is read
+    line by line, so the feed is never loaded into memory at once.
+    """
+    permission_classes = [IsAuthenticated]
+    batch_size = 500
+
+    def post(self, request):
+        upload = None
+        if request.content_type.startswith('multipart/form-data'):
+            upload = request.FILES.get('file')
+            if upload is None:
+                return Response({"error": "Upload the feed in the 'file' field."}, status=status.HTTP_400_BAD_REQUEST)
+
+        import_format = request.query_params.get('input') or detect_import_format(
+            upload.content_type if upload else request.content_type,
+            upload.name if upload else '',
+        )
+        if import_format not in IMPORT_FORMATS:
+            return Response({"error": "Send the feed as NDJSON or CSV, or set ?input=ndjson|csv."}, status=status.HTTP_400_BAD_REQUEST)
+
+        stream = upload if upload is not None else request.stream
+        if stream is None:
+            return Response({"error": "The import feed is empty."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            report = import_books(stream, import_format, created_by=request.user, batch_size=self.batch_size)
+            logger.info("Books imported by %s: %s created", request.user.username, report['created'])
+            return Response(report, status=status.HTTP_200_OK)
+        except Exception as e:
+            logger.error("Book import error for %s: %s", request.user.username, e)
+            return Response({"error": "Something went wrong"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class BookExportView(APIView):
+    """
+    Streams the whole catalog as NDJSON or CSV. Staff can also export
+    reading list contents with ?resource=reading_list_items.
+    """
+    permission_classes = [IsAuthenticatedOrReadOnly]
+
+    def get(self, request):
+        export_format = request.query_params.get('output', 'ndjson')
+        if export_format not in EXPORT_FORMATS:
+            return Response({"error": "'output' must be one of: ndjson, csv."}, status=status.HTTP_400_BAD_REQUEST)
+
+        resource = request.query_params.get('resource', 'books')
+        if resource == 'books':
+            try:
+                queryset = filter_books(Book.objects.order_by('id'), request.query_params)
+            except ValidationError as e:
+                return Response({"error": e.detail}, status=status.HTTP_400_BAD_REQUEST)
+        elif resource == 'reading_list_items':
+            if not request.user.is_staff:
+                logger.warning("Unauthorized reading list export attempt by %s", request.user.username if request.user.is_authenticated else 'anonymous')
+                return Response({"error": "Only staff can export reading lists."}, status=status.HTTP_403_FORBIDDEN)
+            queryset = None
+        else:
+            return Response({"error": "'resource' must be one of: books, reading_list_items."}, status=status.HTTP_400_BAD_REQUEST)
+
+        response = StreamingHttpResponse(
+            stream_export(resource, export_format, queryset=queryset),
+            content_type=EXPORT_CONTENT_TYPES[export_format],
+        )
+        response['Content-Disposition'] = f'attachment; filename="{resource}.{export_format}"'
+        logger.info("Started %s export as %s for %s", resource, export_format, request.user.username if request.user.is_authenticated else 'anonymous')
+        return response
+
+
+class BookFacetsView(APIView):
+    permission_classes = [IsAuthenticatedOrReadOnly]
+
+    def get(self, request):
+        try:
+            return Response(get_book_facets(), status=status.HTTP_200_OK)
+        except Exception as e:
+            logger.error("Book facets retrieval error: %s", e)
+            return Response({"error": "Something went wrong"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+def ranked_book_results(rows, ranked):
+    """
+    Render ranked [(book_id, extra fields)] as book rows in the same order,
+    with the extra fields added. Books deleted since ranking are skipped.
+    """
+    books = list(rows.values(Book.objects.filter(id__in=[book_id for book_id, _ in ranked]), 'id'))
+    books = dict(zip((book['id'] for book in books), rows.serialize(books)))
+    return [{**books[book_id], **extra} for book_id, extra in ranked if book_id in books]
+
+
+class BookPopularView(APIView):
+    """
+    Books in the most reading lists, or with ?days=N those added to the
+    most reading lists in the last N days. Read from the precomputed
+    leaderboard tables, never from reading_list_items.
+    """
+    permission_classes = [IsAuthenticatedOrReadOnly]
+    default_limit = 10
+    max_limit = 50
+
+    def get(self, request):
+        try:
+            limit = min(int(request.query_params.get('limit', self.default_limit)), self.max_limit)
+            days = request.query_params.get('days')
+            days = int(days) if days is not None else None
+            if limit < 1 or (days is not None and not 1 <= days <= settings.BOOK_POPULARITY_MAX_DAYS):
+                raise ValueError
+        except ValueError:
+            return Response(
+                {"error": f"'limit' must be a positive integer and 'days' between 1 and {settings.BOOK_POPULARITY_MAX_DAYS}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            rows = book_rows(book_fieldset(request.query_params))
+        except ValidationError as e:
+            return Response({"error": e.detail}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            results = ranked_book_results(rows, [(book_id, {'count': count}) for book_id, count in popular_books(limit, days)])
+            logger.info("Popular books retrieved: %s results for days=%s", len(results), days)
+            return Response({"days": days, "results": results}, status=status.HTTP_200_OK)
+        except Exception as e:
+            logger.error("Popular books retrieval error: %s", e)
+            return Response({"error": "Something went wrong"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class BookRelatedView(APIView):
+    """Books most often found in the same reading lists, from the precomputed RelatedBook table."""
+    permission_classes = [IsAuthenticatedOrReadOnly]
+    default_limit = 10
+    max_limit = 50
+
+    def get(self, request, pk):
+        try:
+            limit = min(int(request.query_params.get('limit', self.default_limit)), self.max_limit)
+            if limit < 1:
+                raise ValueError
+            rows = book_rows(book_fieldset(request.query_params))
+        except ValueError:
+            return Response({"error": "'limit' must be a positive integer."}, status=status.HTTP_400_BAD_REQUEST)
+        except ValidationError as e:
+            return Response({"error": e.detail}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            ranked = related_books(pk, limit)
+            if not ranked and not Book.objects.filter(pk=pk).exists():
+                logger.error("Book not found: ID %s", pk)
+                return Response({"error": "Book not found."}, status=status.HTTP_404_NOT_FOUND)
+            results = ranked_book_results(rows, [
+                (book_id, {'score': score, 'shared_lists': shared}) for book_id, score, shared in ranked
+            ])
+            logger.info("Related books retrieved for book ID %s: %s results", pk, len(results))
+            return Response({"book": pk, "results": results}, status=status.HTTP_200_OK)
+        except Exception as e:
+            logger.error("Related books retrieval error for book ID %s: %s", pk, e)
+            return Response({"error": "Something went wrong"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
 class BookDetailView(APIView):
     permission_classes = [IsAuthenticatedOrReadOnly]
 
     def get(self, request, pk):
         try:
-            book = Book.objects.get(pk=pk)
-            serializer = BookSerializer(book)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            fieldset = book_fieldset(request.query_params)
+            return cached_response(request, sparse_entry(get_cached_book(pk), fieldset))
+        except ValidationError as e:
+            return Response({"error": e.detail}, status=status.HTTP_400_BAD_REQUEST)
         except Book.DoesNotExist:
-            logger.error(f"Book not found: ID {pk}")
+            logger.error("Book not found: ID %s", pk)
             return Response({"error": "Book not found."}, status=status.HTTP_404_NOT_FOUND)
 
     def delete(self, request, pk):
         try:
             book = Book.objects.get(pk=pk)
             if book.created_by != request.user:
-                logger.warning(f"Unauthorized delete attempt by {request.user.username} for book ID {pk}")
+                logger.warning("Unauthorized delete attempt by %s for book ID %s", request.user.username, pk)
                 return Response({"error": "You are not authorized to delete this book."}, status=status.HTTP_403_FORBIDDEN)
             book.delete()
-            logger.info(f"Book deleted by {request.user.username}: ID {pk}")
+            logger.info("Book deleted by %s: ID %s", request.user.username, pk)
             return Response({"message": "Book deleted successfully."}, status=status.HTTP_204_NO_CONTENT)
         except Book.DoesNotExist:
-            logger.error(f"Book not found for deletion: ID {pk}")
+            logger.error("Book not found for deletion: ID %s", pk)
             return Response({"error": "Book not found."}, status=status.HTTP_404_NOT_FOUND)
         
+def reading_list_read_options(request):
+    """Parse ?expand=items, ?include=counts and the book ?fields= or ?omit=."""
+    expand = request.query_params.get('expand', '').split(',')
+    include = request.query_params.get('include', '').split(',')
+    return {
+        'expand_items': 'items' in expand,
+        'include_counts': 'counts' in include,
+        'book_fields': book_fieldset(request.query_params),
+    }
+
+
+def reading_list_item_values(reading_list, book_fields=None):
+    """A list's items in order as values() rows, with the RowSerializer that renders them."""
+    rows = reading_list_item_rows(book_fields)
+    return rows, rows.values(ReadingListItem.objects.filter(reading_list=reading_list).order_by('order'))
+
+
+def reading_list_items_for_read(book_fields=None):
+    """Items in list order with their books, deferring book columns outside book_fields."""
+    items = ReadingListItem.objects.select_related('book').order_by('order')
+    return apply_book_fieldset(items, book_fields, prefix='book__')
+
+
+def reading_lists_for_read(user, expand_items=False, include_counts=False, book_fields=None):
+    """
+    A user's reading lists, with items and their books prefetched in one
+    extra query and the item count annotated, as requested.
+    """
+    reading_lists = ReadingList.objects.filter(user=user)
+    if expand_items:
+        items = reading_list_items_for_read(book_fields)
+        reading_lists = reading_lists.prefetch_related(Prefetch('items', queryset=items))
+    if include_counts:
+        reading_lists = reading_lists.annotate(item_count=Count('items'))
+    return reading_lists
+
+
 class ReadingListListCreateView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        reading_lists = ReadingList.objects.filter(user=request.user)
-        serializer = ReadingListSerializer(reading_lists, many=True)
+        try:
+            options = reading_list_read_options(request)
+        except ValidationError as e:
+            return Response({"error": e.detail}, status=status.HTTP_400_BAD_REQUEST)
+        reading_lists = reading_lists_for_read(request.user, **options)
+        serializer = ReadingListDetailSerializer(reading_lists, many=True, **options)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     def post(self, request):
         serializer = ReadingListSerializer(data=request.data, context={'request': request})
         if serializer.is_valid():
-            serializer.save(user=request.user)
-            logger.info(f"Reading list created by {request.user.username}: {serializer.data.get('name')}")
+            with transaction.atomic():
+                serializer.save(user=request.user)
+            logger.info("Reading list created by %s: %s", request.user.username, serializer.data.get('name'))
             return Response(serializer.data, status=status.HTTP_201_CREATED)
-        logger.error(f"Reading list creation failed: {serializer.errors}")
+        logger.error("Reading list creation failed: %s", serializer.errors)
         return Response({"error": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
     
 
@@ -88,11 +397,14 @@ class ReadingListDetailView(APIView):
 
     def get(self, request, pk):
         try:
-            reading_list = ReadingList.objects.get(pk=pk, user=request.user)
-            serializer = ReadingListSerializer(reading_list)
+            options = reading_list_read_options(request)
+            reading_list = reading_lists_for_read(request.user, **options).get(pk=pk)
+            serializer = ReadingListDetailSerializer(reading_list, **options)
             return Response(serializer.data, status=status.HTTP_200_OK)
+        except ValidationError as e:
+            return Response({"error": e.detail}, status=status.HTTP_400_BAD_REQUEST)
         except ReadingList.DoesNotExist:
-            logger.error(f"Reading list not found or unauthorized: ID {pk}")
+            logger.error("Reading list not found or unauthorized: ID %s", pk)
             return Response({"error": "Reading list not found or you do not have permission to access it."}, status=status.HTTP_404_NOT_FOUND)
 
     def put(self, request, pk):
@@ -101,22 +413,22 @@ class ReadingListDetailView(APIView):
             serializer = ReadingListSerializer(reading_list, data=request.data, partial=True, context={'request': request})
             if serializer.is_valid():
                 serializer.save()
-                logger.info(f"Reading list updated by {request.user.username}: ID {pk}")
+                logger.info("Reading list updated by %s: ID %s", request.user.username, pk)
                 return Response(serializer.data, status=status.HTTP_200_OK)
-            logger.error(f"Reading list update failed: {serializer.errors}")
+            logger.error("Reading list update failed: %s", serializer.errors)
             return Response({"error": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
         except ReadingList.DoesNotExist:
-            logger.error(f"Reading list not found or unauthorized: ID {pk}")
+            logger.error("Reading list not found or unauthorized: ID %s", pk)
             return Response({"error": "Reading list not found or you do not have permission to access it."}, status=status.HTTP_404_NOT_FOUND)
 
     def delete(self, request, pk):
         try:
             reading_list = ReadingList.objects.get(pk=pk, user=request.user)
             reading_list.delete()
-            logger.info(f"Reading list deleted by {request.user.username}: ID {pk}")
+            logger.info("Reading list deleted by %s: ID %s", request.user.username, pk)
             return Response({"message": "Reading list deleted successfully."}, status=status.HTTP_204_NO_CONTENT)
         except ReadingList.DoesNotExist:
-            logger.error(f"Reading list not found or unauthorized: ID {pk}")
+            logger.error("Reading list not found or unauthorized: ID %s", pk)
             return Response({"error": "Reading list not found or you do not have permission to access it."}, status=status.HTTP_404_NOT_FOUND)
     
 
@@ -125,40 +437,110 @@ class ReadingListItemCreateDeleteView(APIView):
 
     def get(self, request, pk):
         try:
+            book_fields = book_fieldset(request.query_params)
             reading_list = ReadingList.objects.get(pk=pk, user=request.user)
-            items = ReadingListItem.objects.filter(reading_list=reading_list).order_by('order')
-            serializer = ReadingListItemSerializer(items, many=True, context={'request': request})
-            logger.info(f"Retrieved items for reading list by {request.user.username}: List ID {pk}")
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            rows, items = reading_list_item_values(reading_list, book_fields)
+            logger.info("Retrieved items for reading list by %s: List ID %s", request.user.username, pk)
+            return Response(rows.serialize(items), status=status.HTTP_200_OK)
+        except ValidationError as e:
+            return Response({"error": e.detail}, status=status.HTTP_400_BAD_REQUEST)
         except ReadingList.DoesNotExist:
-            logger.error(f"Reading list not found or unauthorized: ID {pk}")
+            logger.error("Reading list not found or unauthorized: ID %s", pk)
             return Response({"error": "Reading list not found or you do not have permission to access it."}, status=status.HTTP_404_NOT_FOUND)
 
     def post(self, request, pk):
         try:
             reading_list = ReadingList.objects.get(pk=pk, user=request.user)
         except ReadingList.DoesNotExist:
-            logger.error(f"Reading list not found or unauthorized: ID {pk}")
+            logger.error("Reading list not found or unauthorized: ID %s", pk)
             return Response({"error": "Reading list not found or you do not have permission to access it."}, status=status.HTTP_404_NOT_FOUND)
 
         serializer = ReadingListItemSerializer(data=request.data, context={'request': request})
         if serializer.is_valid():
-            serializer.save(reading_list=reading_list)
-            logger.info(f"Book added to reading list by {request.user.username}: List ID {pk}, Book ID {serializer.data.get('book')}")
+            with transaction.atomic():
+                # Lock the list as patch() does, so concurrent appends can't read the same last order.
+                reading_list = ReadingList.objects.select_for_update().get(pk=reading_list.pk)
+                # Without an explicit order, append after the last item.
+                extra = {} if 'order' in serializer.validated_data else {'order': next_order(reading_list)}
+                serializer.save(reading_list=reading_list, **extra)
+            logger.info("Book added to reading list by %s: List ID %s, Book ID %s", request.user.username, pk, serializer.data.get('book'))
             return Response(serializer.data, status=status.HTTP_201_CREATED)
-        logger.error(f"Failed to add book to reading list ID {pk}: {serializer.errors}")
+        logger.error("Failed to add book to reading list ID %s: %s", pk, serializer.errors)
         return Response({"error": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
 
+    def patch(self, request, pk):
+        """Apply a batch of adds, removes and moves in one transaction."""
+        try:
+            book_fields = book_fieldset(request.query_params)
+        except ValidationError as e:
+            return Response({"error": e.detail}, status=status.HTTP_400_BAD_REQUEST)
+        serializer = ReadingListItemBatchSerializer(data=request.data)
+        if not serializer.is_valid():
+            logger.error("Invalid reading list batch for list ID %s: %s", pk, serializer.errors)
+            return Response({"error": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            with transaction.atomic():
+                reading_list = ReadingList.objects.select_for_update().get(pk=pk, user=request.user)
+                result = apply_item_batch(reading_list, serializer.validated_data)
+        except ReadingList.DoesNotExist:
+            logger.error("Reading list not found or unauthorized: ID %s", pk)
+            return Response({"error": "Reading list not found or you do not have permission to access it."}, status=status.HTTP_404_NOT_FOUND)
+        except ValidationError as e:
+            logger.error("Reading list batch rejected for list ID %s: %s", pk, e.detail)
+            return Response({"error": e.detail}, status=status.HTTP_400_BAD_REQUEST)
+
+        logger.info("Reading list batch applied by %s: List ID %s, %s added, %s removed, %s reordered", request.user.username, pk, len(result.added), len(result.removed), len(result.changed))
+        rows, items = reading_list_item_values(reading_list, book_fields)
+        return Response(rows.serialize(items), status=status.HTTP_200_OK)
+
     def delete(self, request, pk, book_id):
         try:
             reading_list = ReadingList.objects.get(pk=pk, user=request.user)
             item = ReadingListItem.objects.get(reading_list=reading_list, book_id=book_id)
-            item.delete()
-            logger.info(f"Book removed from reading list by {request.user.username}: List ID {pk}, Book ID {book_id}")
+            with transaction.atomic():
+                item.delete()
+                adjust_library_stats(request.user.id, reading_list_items=-1)
+                record_item_changes(removed=[(item.book_id, item.added_at)])
+            logger.info("Book removed from reading list by %s: List ID %s, Book ID %s", request.user.username, pk, book_id)
             return Response({"message": "Book removed from reading list successfully."}, status=status.HTTP_204_NO_CONTENT)
         except ReadingList.DoesNotExist:
-            logger.error(f"Reading list not found or unauthorized: ID {pk}")
+            logger.error("Reading list not found or unauthorized: ID %s", pk)
             return Response({"error": "Reading list not found or you do not have permission to access it."}, status=status.HTTP_404_NOT_FOUND)
         except ReadingListItem.DoesNotExist:
-            logger.error(f"Book not found in reading list: List ID {pk}, Book ID {book_id}")
-            return Response({"error": "Book not found in this reading list."}, status=status.HTTP_404_NOT_FOUND)
\ No newline at end of file
+            logger.error("Book not found in reading list: List ID %s, Book ID %s", pk, book_id)
+            return Response({"error": "Book not found in this reading list."}, status=status.HTTP_404_NOT_FOUND)
+
+class ReadingListRecommendationsView(APIView):
+    """
+    Books related to the ones in a reading list and not yet in it, from the
+    precomputed RelatedBook table. Each result's score sums its similarity
+    to the listed books it is related to, and sources counts those books.
+    """
+    permission_classes = [IsAuthenticated]
+    default_limit = 10
+    max_limit = 50
+
+    def get(self, request, pk):
+        try:
+            limit = min(int(request.query_params.get('limit', self.default_limit)), self.max_limit)
+            if limit < 1:
+                raise ValueError
+            rows = book_rows(book_fieldset(request.query_params))
+        except ValueError:
+            return Response({"error": "'limit' must be a positive integer."}, status=status.HTTP_400_BAD_REQUEST)
+        except ValidationError as e:
+            return Response({"error": e.detail}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not ReadingList.objects.filter(pk=pk, user=request.user).exists():
+            logger.error("Reading list not found or unauthorized: ID %s", pk)
+            return Response({"error": "Reading list not found or you do not have permission to access it."}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            results = ranked_book_results(rows, [
+                (book_id, {'score': round(score, 6), 'sources': sources}) for book_id, score, sources in recommended_books(pk, limit)
+            ])
+            logger.info("Recommendations retrieved by %s for list ID %s: %s results", request.user.username, pk, len(results))
+            return Response({"reading_list": pk, "results": results}, status=status.HTTP_200_OK)
+        except Exception as e:
+            logger.error("Recommendations retrieval error for list ID %s: %s", pk, e)
+            return Response({"error": "Something went wrong"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -12,5 +12,16 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'booksapi.settings')
+# Persistent connections belong to a thread, and async views run their
+# queries on short-lived threads, so under ASGI connections are closed after
+# each request unless DATABASE_CONN_MAX_AGE says otherwise (or pooling is on).
+os.environ.setdefault('DATABASE_CONN_MAX_AGE', '0')
 
 application = get_asgi_application()
+
+# Load the typeahead index now rather than on the first keystroke.
+from django.conf import settings  # noqa: E402
+from books_manage.typeahead import typeahead_index  # noqa: E402
+
+if settings.TYPEAHEAD['WARM_ON_STARTUP']:
+    typeahead_index.warm()
@@ -0,0 +1,65 @@
+"""
+orjson-backed drop-in replacements for DRF's JSONRenderer and JSONParser.
+
+The output is byte for byte what JSONRenderer produces: dates, datetimes,
+decimals and lazy strings still go through DRF's JSONEncoder.default, and
+U+2028/U+2029 are escaped the same way. Anything orjson can't encode the
+same way (indented output, ASCII-only output, integers wider than 64 bits,
+non-string keys) is handed to the stdlib implementation. Without orjson
+installed both classes behave exactly like their DRF parents.
+
+The exceptions: floats below 1e-4 or from 1e16 up are formatted
+differently (0.00001 and 1e16 rather than 1e-05 and 1e+16), and
+NaN/Infinity become null instead of raising. These are the same numbers, but the bytes differ.
+When parsing, integers wider than 64 bits may come back as floats.
+"""
+import io
+from django.conf import settings
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speed-up
+    orjson = None
+
+UTF8_NAMES = {'utf-8', 'utf8'}
+
+
+class FastJSONRenderer(JSONRenderer):
+    # Let DRF's encoder format these rather than orjson's native handling.
+    orjson_options = (orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS) if orjson else 0
+    default = staticmethod(JSONEncoder().default)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=self.default, option=self.orjson_options)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+class FastJSONParser(JSONParser):
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or not self.strict or encoding.lower() not in UTF8_NAMES:
+            return super().parse(stream, media_type, parser_context)
+
+        body = stream.read()
+        try:
+            return orjson.loads(body)
+        except orjson.JSONDecodeError:
+            # The stdlib parser accepts a few inputs orjson doesn't (e.g. lone
+            # surrogate escapes) and words its errors the way clients expect.
+            return super().parse(io.BytesIO(body), media_type, parser_context)
@@ -0,0 +1,331 @@
+"""
+Per-request instrumentation: DB query count and time, view, serializer
+and render time, and response size. Reported in a Server-Timing header, aggregated
+into Prometheus histograms served at /metrics, and optionally written to
+a slow-request log together with the SQL that ran. Database connection
+opens and, with DATABASE_POOL, the psycopg pools' statistics are
+exported too.
+
+Metrics are kept per process. With several workers, scrape each one or
+aggregate downstream.
+"""
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.core.signals import request_started
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse, HttpResponseForbidden
+
+logger = logging.getLogger(__name__)
+
+_current = ContextVar('request_metrics', default=None)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+# Cap on SQL statements kept for the slow-request log.
+MAX_LOGGED_QUERIES = 100
+
+
+class Histogram:
+    """A labelled Prometheus histogram."""
+
+    def __init__(self, name, help_text, labels, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_values, value):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series['buckets'][index] += 1
+            series['sum'] += value
+            series['count'] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for label_values, series in sorted(self._series.items()):
+                labels = ','.join(f'{name}="{value}"' for name, value in zip(self.labels, label_values))
+                for bound, count in zip(self.buckets, series['buckets']):
+                    lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f'{self.name}_bucket{{{labels},le="+Inf"}} {series["count"]}')
+                lines.append(f'{self.name}_sum{{{labels}}} {series["sum"]}')
+                lines.append(f'{self.name}_count{{{labels}}} {series["count"]}')
+        return lines
+
+
+class Counter:
+    """A labelled Prometheus counter."""
+
+    def __init__(self, name, help_text, labels):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, label_values):
+        with self._lock:
+            return self._values.get(label_values, 0)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                labels = ','.join(f'{name}="{value}"' for name, value in zip(self.labels, label_values))
+                lines.append(f'{self.name}{{{labels}}} {value}')
+        return lines
+
+
+REQUESTS = Counter('booksapi_requests_total', "Requests handled.", ('route', 'method', 'status'))
+REQUEST_DURATION = Histogram('booksapi_request_duration_seconds', "Total request latency.", ('route', 'method'), LATENCY_BUCKETS)
+DB_DURATION = Histogram('booksapi_request_db_seconds', "Time spent in database queries per request.", ('route', 'method'), LATENCY_BUCKETS)
+DB_QUERIES = Histogram('booksapi_request_db_queries', "Database queries per request.", ('route', 'method'), QUERY_BUCKETS)
+SERIALIZE_DURATION = Histogram('booksapi_request_serialize_seconds', "Time spent serializing response data, less its queries.", ('route', 'method'), LATENCY_BUCKETS)
+RENDER_DURATION = Histogram('booksapi_request_render_seconds', "Time spent rendering the response.", ('route', 'method'), LATENCY_BUCKETS)
+RESPONSE_SIZE = Histogram('booksapi_response_size_bytes', "Response body size.", ('route', 'method'), SIZE_BUCKETS)
+DB_CONNECTIONS = Counter('booksapi_db_connections_total', "Database connections opened, or checked out of a pool.", ('alias',))
+
+
+class DatabasePoolMetrics:
+    """The statistics of each database alias's psycopg pool, read when scraped if the pool exists."""
+    GAUGES = (
+        ('pool_max', 'booksapi_db_pool_max_size', "Most connections the pool may hold."),
+        ('pool_size', 'booksapi_db_pool_connections', "Connections held by the pool, in use or idle."),
+        ('pool_available', 'booksapi_db_pool_available', "Idle connections ready to be checked out."),
+        ('requests_waiting', 'booksapi_db_pool_waiting', "Checkouts waiting for a connection."),
+    )
+    COUNTERS = (
+        ('requests_num', 'booksapi_db_pool_checkouts_total', "Connections checked out of the pool."),
+        ('requests_queued', 'booksapi_db_pool_waits_total', "Checkouts that had to wait for a connection."),
+        ('requests_wait_ms', 'booksapi_db_pool_wait_seconds_total', "Seconds checkouts spent waiting."),
+        ('requests_errors', 'booksapi_db_pool_timeouts_total', "Checkouts that timed out or found the queue full."),
+        ('connections_num', 'booksapi_db_pool_connections_opened_total', "Connections opened by the pool."),
+        ('connections_lost', 'booksapi_db_pool_connections_lost_total', "Connections found broken and discarded."),
+    )
+    # psycopg reports durations in milliseconds; Prometheus expects seconds.
+    SCALE = {'requests_wait_ms': 0.001}
+
+    def render(self):
+        stats = []
+        for alias in connections:
+            if not connections.settings[alias]['OPTIONS'].get('pool'):
+                continue
+            # The pool property would create the pool; only read one a request already opened.
+            pool = getattr(connections[alias], '_connection_pools', {}).get(alias)
+            if pool is not None:
+                stats.append((alias, pool.get_stats()))
+        lines = []
+        for kind, metrics in (('gauge', self.GAUGES), ('counter', self.COUNTERS)):
+            for key, name, help_text in metrics if stats else ():
+                scale = self.SCALE.get(key, 1)
+                lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+                lines += [f'{name}{{alias="{alias}"}} {values.get(key, 0) * scale}' for alias, values in stats]
+        return lines
+
+
+METRICS = [REQUESTS, REQUEST_DURATION, DB_DURATION, DB_QUERIES, SERIALIZE_DURATION, RENDER_DURATION, RESPONSE_SIZE, DB_CONNECTIONS, DatabasePoolMetrics()]
+
+
+class SlowQueries:
+    """Formats the captured SQL only when the log record is actually written."""
+
+    def __init__(self, queries):
+        self.queries = queries
+
+    def __str__(self):
+        return '\n'.join(f'  {duration * 1000:.2f}ms {sql}' for duration, sql in self.queries)
+
+
+class RequestMetrics:
+    """Measurements for one request, collected through a context variable."""
+
+    def __init__(self, keep_sql):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.serialize_time = 0.0
+        self.serializing = False
+        self.render_time = 0.0
+        self.keep_sql = keep_sql
+        self.sql = []
+
+    def record_query(self, sql, duration):
+        self.queries += 1
+        self.db_time += duration
+        if self.keep_sql and len(self.sql) < MAX_LOGGED_QUERIES:
+            self.sql.append((duration, sql))
+
+
+def record_query(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.record_query(sql, time.perf_counter() - started)
+
+
+@contextmanager
+def serializing():
+    """
+    Count the enclosed block as serialization time of the current request,
+    minus the queries it runs. Nested blocks are counted once.
+    """
+    metrics = _current.get()
+    if metrics is None or metrics.serializing:
+        yield
+        return
+    metrics.serializing = True
+    started, db_time = time.perf_counter(), metrics.db_time
+    try:
+        yield
+    finally:
+        metrics.serializing = False
+        metrics.serialize_time += time.perf_counter() - started - (metrics.db_time - db_time)
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    # Connections are per thread, and async views run their queries on
+    # worker threads, so the recorder goes on every connection and finds
+    # the current request through the context variable.
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def install_on_open_connections(sender, **kwargs):
+    # request_started runs on the thread that serves the request's queries,
+    # which covers connections opened before this module was imported.
+    for connection in connections.all(initialized_only=True):
+        install_query_recorder(sender, connection)
+
+
+def count_connection(sender, connection, **kwargs):
+    DB_CONNECTIONS.inc((connection.alias,))
+
+
+connection_created.connect(install_query_recorder)
+connection_created.connect(count_connection)
+request_started.connect(install_on_open_connections)
+
+
+class RequestMetricsMiddleware:
+    """
+    Times each request and adds a Server-Timing header. Works natively in
+    both sync and async mode, so async views are not pushed onto a thread.
+    Put it first in MIDDLEWARE so the total covers the other middleware.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+            self.process_template_response = self._aprocess_template_response
+        else:
+            self.process_template_response = self._process_template_response
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        metrics = RequestMetrics(keep_sql=bool(settings.INSTRUMENTATION['SLOW_REQUEST_MS']))
+        token = _current.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.finish(request, response, metrics)
+        return response
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics(keep_sql=bool(settings.INSTRUMENTATION['SLOW_REQUEST_MS']))
+        token = _current.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.finish(request, response, metrics)
+        return response
+
+    def _process_template_response(self, request, response):
+        metrics = _current.get()
+        if metrics is not None:
+            render_started = time.perf_counter()
+
+            def rendered(response):
+                metrics.render_time += time.perf_counter() - render_started
+
+            response.add_post_render_callback(rendered)
+        return response
+
+    async def _aprocess_template_response(self, request, response):
+        return self._process_template_response(request, response)
+
+    def finish(self, request, response, metrics):
+        total = time.perf_counter() - metrics.started
+        app = max(total - metrics.db_time - metrics.serialize_time - metrics.render_time, 0.0)
+        match = getattr(request, 'resolver_match', None)
+        route = match.url_name if match and match.url_name else 'unmatched'
+        labels = (route, request.method)
+
+        REQUESTS.inc((route, request.method, str(response.status_code)))
+        REQUEST_DURATION.observe(labels, total)
+        DB_DURATION.observe(labels, metrics.db_time)
+        DB_QUERIES.observe(labels, metrics.queries)
+        SERIALIZE_DURATION.observe(labels, metrics.serialize_time)
+        RENDER_DURATION.observe(labels, metrics.render_time)
+        size = None if response.streaming else len(response.content)
+        if size is not None:
+            RESPONSE_SIZE.observe(labels, size)
+
+        if settings.INSTRUMENTATION['SERVER_TIMING']:
+            response['Server-Timing'] = ', '.join([
+                f'db;dur={metrics.db_time * 1000:.2f};desc="{metrics.queries} queries"',
+                f'serialize;dur={metrics.serialize_time * 1000:.2f}',
+                f'app;dur={app * 1000:.2f};desc="view and middleware"',
+                f'render;dur={metrics.render_time * 1000:.2f}',
+                f'total;dur={total * 1000:.2f}',
+            ])
+
+        slow_ms = settings.INSTRUMENTATION['SLOW_REQUEST_MS']
+        if slow_ms and total * 1000 >= slow_ms:
+            logger.warning(
+                "Slow request %s %s (%s): %.1fms total, %s queries in %.1fms, serialize %.1fms, render %.1fms, %s bytes\n%s",
+                request.method, request.path, route, total * 1000, metrics.queries, metrics.db_time * 1000,
+                metrics.serialize_time * 1000, metrics.render_time * 1000, size if size is not None else 'streamed', SlowQueries(metrics.sql),
+            )
+
+
+def metrics_view(request):
+    """
+    Prometheus text exposition of this process's request metrics. Closed
+    unless METRICS_ALLOWED_IPS lists the client (or '*'), or DEBUG is on.
+    """
+    allowed = settings.INSTRUMENTATION['METRICS_ALLOWED_IPS']
+    if not (settings.DEBUG if not allowed else '*' in allowed or request.META.get('REMOTE_ADDR') in allowed):
+        return HttpResponseForbidden()
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    return HttpResponse('\n'.join(lines) + '\n', content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,148 @@
+"""
+Logging that stays off the request path.
+
+QueuedStreamHandler only puts records on an in-memory queue; a background
+thread formats and writes them. The message and any traceback are
+resolved before queueing, while their arguments are still current; the
+JSON encoding and the write happen on that thread. If the queue is full,
+records are dropped rather than blocking the worker, counted in dropped
+and reported with a warning once the queue has room again.
+SamplingFilter thins out high-volume INFO records per logger before they
+are queued.
+"""
+import atexit
+import copy
+import datetime
+import json
+import logging
+import os
+import queue
+import random
+import sys
+from logging.handlers import QueueHandler, QueueListener
+
+# Attributes every LogRecord has; anything else was passed through extra=.
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'taskName'}
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line, including any extra= fields."""
+
+    def format(self, record):
+        payload = {
+            'time': datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith('_'):
+                payload[key] = value
+        if record.exc_info:
+            payload['exc_info'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            payload['exc_info'] = record.exc_text
+        if record.stack_info:
+            payload['stack_info'] = self.formatStack(record.stack_info)
+        return json.dumps(payload, default=str, ensure_ascii=False)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps a fraction of records at or below INFO, per logger. rates maps
+    logger names to a fraction between 0 and 1 and also applies to child
+    loggers; the most specific name wins. Warnings and errors always pass.
+    """
+
+    def __init__(self, rates=None, default_rate=1.0):
+        super().__init__()
+        self.rates = dict(rates or {})
+        self.default_rate = default_rate
+        self._resolved = {}
+
+    def rate_for(self, name):
+        rate = self._resolved.get(name)
+        if rate is None:
+            rate = self.default_rate
+            candidate = name
+            while candidate:
+                if candidate in self.rates:
+                    rate = self.rates[candidate]
+                    break
+                candidate = candidate.rpartition('.')[0]
+            self._resolved[name] = rate
+        return rate
+
+    def filter(self, record):
+        if record.levelno > logging.INFO:
+            return True
+        rate = self.rate_for(record.name)
+        return rate >= 1 or random.random() < rate
+
+
+class QueuedStreamHandler(QueueHandler):
+    """
+    Queue in front of a StreamHandler that a QueueListener thread drains.
+    The formatter set on this handler is used by the writer thread.
+    """
+
+    def __init__(self, stream='stdout', queue_size=10000):
+        super().__init__(queue.Queue(queue_size))
+        self.target = logging.StreamHandler(sys.stderr if stream == 'stderr' else sys.stdout)
+        self.dropped = 0
+        self._reported_dropped = 0
+        self._listener = None
+        self._pid = None
+        self._start()
+        atexit.register(self.stop)
+
+    def _start(self):
+        self._listener = QueueListener(self.queue, self.target)
+        self._listener.start()
+        self._pid = os.getpid()
+
+    def setFormatter(self, fmt):
+        super().setFormatter(fmt)
+        self.target.setFormatter(fmt)
+
+    def prepare(self, record):
+        # Resolve the message and traceback on the calling thread, so the
+        # queued record holds no references to the caller's arguments.
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = (self.formatter or logging.Formatter()).formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        if self._pid != os.getpid():
+            # The writer thread doesn't survive a fork (e.g. preloading
+            # servers); start one in this process.
+            self._start()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            return
+        if self.dropped > self._reported_dropped:
+            self._report_dropped()
+
+    def _report_dropped(self):
+        notice = logging.LogRecord(
+            __name__, logging.WARNING, __file__, 0, "Dropped %s log records, the log queue was full",
+            (self.dropped - self._reported_dropped,), None,
+        )
+        notice.dropped_total = self.dropped
+        try:
+            self.queue.put_nowait(self.prepare(notice))
+        except queue.Full:
+            return
+        self._reported_dropped = self.dropped
+
+    def stop(self):
+        if self._listener is not None and self._pid == os.getpid():
+            self._listener.stop()
+            self._listener = None
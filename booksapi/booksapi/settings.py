@@ -32,7 +32,7 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 SECRET_KEY = os.getenv('SECRET_KEY')
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = os.getenv('DEBUG')
+DEBUG = os.getenv('DEBUG', '').lower() in ('1', 'true', 'yes')
 
 ALLOWED_HOSTS = ["*"]
 
@@ -54,6 +54,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'booksapi.instrumentation.RequestMetricsMiddleware',
+    'booksapi.throttling.LoadSheddingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -95,7 +97,7 @@ if os.getenv("DATABASE_URL"):
 else:
     DATABASES = {
         'default': {
-            'ENGINE': 'django.db.backends.postgresql_psycopg2',
+            'ENGINE': 'django.db.backends.postgresql',
             'NAME': os.getenv('DATABASE_NAME'),
             'USER': os.getenv('DATABASE_USER'),
             'PASSWORD': os.getenv('DATABASE_PASSWORD'),
@@ -104,17 +106,105 @@ else:
         }
     }
 
+# Connections are kept open for CONN_MAX_AGE seconds and checked before
+# they are reused by a new request. asgi.py defaults it to 0. With DATABASE_POOL=True, PostgreSQL
+# connections come from a psycopg pool in each worker process instead, so
+# the server sees at most workers * DATABASE_POOL_MAX_SIZE connections.
+DATABASES['default'].update({
+    'CONN_MAX_AGE': int(os.getenv('DATABASE_CONN_MAX_AGE', 60)),
+    'CONN_HEALTH_CHECKS': os.getenv('DATABASE_CONN_HEALTH_CHECKS', 'True') == 'True',
+})
+if os.getenv('DATABASE_POOL', 'False') == 'True' and DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql':
+    # Pooled connections go back to the pool after each request.
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default'].setdefault('OPTIONS', {})['pool'] = {
+        'min_size': int(os.getenv('DATABASE_POOL_MIN_SIZE', 1)),
+        'max_size': int(os.getenv('DATABASE_POOL_MAX_SIZE', 4)),
+        # Seconds a checkout waits for a free connection before failing.
+        'timeout': float(os.getenv('DATABASE_POOL_TIMEOUT', 10)),
+        # Checkouts allowed to wait at once; 0 is unlimited.
+        'max_waiting': int(os.getenv('DATABASE_POOL_MAX_WAITING', 0)),
+        'max_idle': float(os.getenv('DATABASE_POOL_MAX_IDLE', 300)),
+        'max_lifetime': float(os.getenv('DATABASE_POOL_MAX_LIFETIME', 3600)),
+    }
+
     
 AUTH_USER_MODEL = "authentication.User"
 
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'authentication.backends.CachedJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
     ],
+    # orjson-backed, with the same output as DRF's JSON classes.
+    'DEFAULT_RENDERER_CLASSES': [
+        'booksapi.fastjson.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'booksapi.fastjson.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    # Token buckets per throttle_scope, per IP and per user; unset scopes are unlimited.
+    'DEFAULT_THROTTLE_CLASSES': [
+        'booksapi.throttling.ScopedTokenBucketThrottle',
+    ],
+    # Proxies in front of the app that append to X-Forwarded-For. With 0,
+    # throttling keys on REMOTE_ADDR and ignores the header.
+    'NUM_PROXIES': int(os.getenv('NUM_PROXIES', 0)),
+    'DEFAULT_THROTTLE_RATES': {
+        'register': os.getenv('THROTTLE_REGISTER_RATE', '5/min'),
+        'login': os.getenv('THROTTLE_LOGIN_RATE', '10/min'),
+        'book_create': os.getenv('THROTTLE_BOOK_CREATE_RATE', '30/min'),
+    },
+}
+
+
+# Cache
+# Local memory by default; point CACHE_BACKEND/CACHE_LOCATION at a shared
+# backend (e.g. django.core.cache.backends.redis.RedisCache) in production.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+# Throttle buckets are only shared between processes through a shared
+# cache; on Redis they are updated atomically.
+THROTTLE_CACHE = os.getenv('THROTTLE_CACHE', 'default')
+
+# Past MAX_IN_FLIGHT concurrent requests in a process, throttled writes get
+# a 503 with Retry-After before any work is done. 0 disables shedding.
+LOAD_SHEDDING = {
+    'MAX_IN_FLIGHT': int(os.getenv('LOAD_SHEDDING_MAX_IN_FLIGHT', 0)),
+    'RETRY_AFTER': int(os.getenv('LOAD_SHEDDING_RETRY_AFTER', 1)),
+}
+
+# Cached catalog reads are invalidated on writes, these are upper bounds.
+BOOK_CACHE_TIMEOUT = int(os.getenv('BOOK_CACHE_TIMEOUT', 300))
+BOOK_FACETS_CACHE_TIMEOUT = int(os.getenv('BOOK_FACETS_CACHE_TIMEOUT', 300))
+
+# Daily popularity buckets are kept this many days; it is also the longest
+# window /books/popular/?days= accepts.
+BOOK_POPULARITY_MAX_DAYS = int(os.getenv('BOOK_POPULARITY_MAX_DAYS', 90))
+
+# Title and author suggestions come from an in-process prefix index, loaded
+# when the server starts unless WARM_ON_STARTUP is False. Processes reload it
+# at most every SYNC_INTERVAL seconds after another process changed a book,
+# and at most every POPULARITY_REFRESH seconds (0 to never) to re-rank books
+# after reading list changes. Catalogs over MAX_BOOKS are matched in the
+# database instead.
+TYPEAHEAD = {
+    'MAX_BOOKS': int(os.getenv('TYPEAHEAD_MAX_BOOKS', 200000)),
+    'SYNC_INTERVAL': int(os.getenv('TYPEAHEAD_SYNC_INTERVAL', 5)),
+    'POPULARITY_REFRESH': int(os.getenv('TYPEAHEAD_POPULARITY_REFRESH', 300)),
+    'WARM_ON_STARTUP': os.getenv('TYPEAHEAD_WARM_ON_STARTUP', 'True') == 'True',
 }
 
 
@@ -163,20 +253,81 @@ SIMPLE_JWT = {
     'SLIDING_TOKEN_REFRESH_EXP_CLAIM': 'refresh_exp',
     'SLIDING_TOKEN_LIFETIME': timedelta(minutes=5),
     'SLIDING_TOKEN_REFRESH_LIFETIME': timedelta(days=1),
+
+    'TOKEN_REFRESH_SERIALIZER': 'authentication.serializers.FastBlacklistTokenRefreshSerializer',
+}
+
+# Blacklisted refresh tokens are checked against an in-process Bloom filter
+# that is topped up from the database every SYNC_INTERVAL seconds. It needs
+# a shared CACHE_BACKEND; with local memory every check queries the database.
+TOKEN_BLACKLIST_FILTER = {
+    'CAPACITY': int(os.getenv('TOKEN_BLACKLIST_FILTER_CAPACITY', 100000)),
+    'ERROR_RATE': float(os.getenv('TOKEN_BLACKLIST_FILTER_ERROR_RATE', 0.01)),
+    'SYNC_INTERVAL': int(os.getenv('TOKEN_BLACKLIST_FILTER_SYNC_INTERVAL', 30)),
+}
+
+# Users resolved from JWTs are cached per process for LOCAL_TTL seconds and
+# in the shared cache for SHARED_TTL seconds, and invalidated on save.
+AUTH_USER_CACHE = {
+    'LOCAL_MAXSIZE': int(os.getenv('AUTH_USER_CACHE_LOCAL_MAXSIZE', 1024)),
+    'LOCAL_TTL': int(os.getenv('AUTH_USER_CACHE_LOCAL_TTL', 5)),
+    'SHARED_TTL': int(os.getenv('AUTH_USER_CACHE_SHARED_TTL', 60)),
+}
+
+# Per-request timings. SLOW_REQUEST_MS > 0 logs slower requests with their
+# SQL. /metrics only answers the clients in METRICS_ALLOWED_IPS ('*' for
+# all); while it is empty, only DEBUG opens it.
+INSTRUMENTATION = {
+    'SERVER_TIMING': os.getenv('SERVER_TIMING', 'True') == 'True',
+    'SLOW_REQUEST_MS': int(os.getenv('SLOW_REQUEST_MS', 0)),
+    'METRICS_ALLOWED_IPS': [ip.strip() for ip in os.getenv('METRICS_ALLOWED_IPS', '').split(',') if ip.strip()],
+}
+
+# Records are queued and written to stdout by a background thread, as JSON
+# lines unless LOG_FORMAT=text. LOG_SAMPLE_RATES keeps only a fraction of
+# INFO and DEBUG records from noisy loggers, e.g.
+# "books_manage.views=0.1,authentication=0.5"; warnings are never sampled.
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+LOG_SAMPLE_RATES = {
+    name.strip(): float(rate)
+    for name, _, rate in (entry.partition('=') for entry in os.getenv('LOG_SAMPLE_RATES', '').split(',') if entry.strip())
 }
 
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
+    'formatters': {
+        'json': {
+            '()': 'booksapi.logging_utils.JSONFormatter',
+        },
+        'text': {
+            'format': '%(asctime)s %(levelname)s %(name)s: %(message)s',
+        },
+    },
+    'filters': {
+        'sampling': {
+            '()': 'booksapi.logging_utils.SamplingFilter',
+            'rates': LOG_SAMPLE_RATES,
+        },
+    },
     'handlers': {
-        'console': {
-            'class': 'logging.StreamHandler',
+        'queue': {
+            '()': 'booksapi.logging_utils.QueuedStreamHandler',
+            'queue_size': int(os.getenv('LOG_QUEUE_SIZE', 10000)),
+            'formatter': 'text' if os.getenv('LOG_FORMAT', 'json') == 'text' else 'json',
+            'filters': ['sampling'],
         },
     },
+    'root': {
+        'handlers': ['queue'],
+        'level': LOG_LEVEL,
+    },
     'loggers': {
-        'posts': {
-            'handlers': ['console'],
-            'level': 'INFO',
+        # Replace Django's own console handler so its records aren't written twice.
+        'django': {
+            'handlers': ['queue'],
+            'level': LOG_LEVEL,
+            'propagate': False,
         },
     },
 }
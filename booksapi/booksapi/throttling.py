@@ -0,0 +1,203 @@
+"""
+Rate limiting and load shedding for the write and auth endpoints.
+
+Views opt in with a throttle_scope, whose rate ("N/period", e.g.
+"5/min") in REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'] sets a token bucket
+of N requests refilled over the period, so short bursts pass while the
+sustained rate stays bounded. Buckets are kept per scope and per client
+IP; authenticated requests also spend a bucket of their user, so neither
+one account spread over many addresses nor many accounts from one address
+get past the rate. A request takes a token from both buckets or from
+neither. The IP is REMOTE_ADDR unless REST_FRAMEWORK['NUM_PROXIES'] says
+how many proxies in front of the app append to X-Forwarded-For, so
+clients can't pick their own bucket with that header. Only unsafe
+methods spend tokens, so a scoped list-create view still serves reads
+freely.
+
+Buckets live in the THROTTLE_CACHE cache. On Redis each update is a Lua
+script run on the server with the server's clock, so every process sees
+one set of buckets. Other backends update them with gets and sets under
+a process lock: exact for the local memory cache used in development and
+tests, best effort across processes.
+
+LoadSheddingMiddleware counts the requests in flight in this process and,
+past LOAD_SHEDDING['MAX_IN_FLIGHT'], answers scoped writes with a 503
+before the view runs, so no queries or password hashing are spent on
+them while reads keep being served.
+"""
+import logging
+import math
+import threading
+import time
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache
+from django.http import JsonResponse
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+# KEYS: the buckets. ARGV: capacity, tokens refilled per second. A token
+# is taken from every bucket or, if any is empty, from none.
+# Returns {allowed, seconds until a token is available in all of them}.
+TAKE_TOKEN_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local refill = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local levels = {}
+local allowed, wait = 1, 0
+for i, key in ipairs(KEYS) do
+    local state = redis.call('HMGET', key, 'tokens', 'at')
+    local tokens = tonumber(state[1]) or capacity
+    local at = tonumber(state[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - at) * refill)
+    if tokens < 1 then
+        allowed, wait = 0, math.max(wait, (1 - tokens) / refill)
+    end
+    levels[i] = tokens
+end
+for i, key in ipairs(KEYS) do
+    redis.call('HSET', key, 'tokens', tostring(levels[i] - allowed), 'at', tostring(now))
+    redis.call('EXPIRE', key, math.ceil(capacity / refill) + 1)
+end
+return {allowed, tostring(wait)}
+"""
+
+
+def parse_rate(rate):
+    """(capacity, tokens refilled per second) for a rate like "10/min", or None for no limit."""
+    if rate is None:
+        return None
+    count, _, period = rate.partition('/')
+    capacity = int(count)
+    return capacity, capacity / PERIODS[period.strip()[0]]
+
+
+class TokenBuckets:
+    """Token buckets stored in a Django cache."""
+
+    def __init__(self, alias):
+        self.alias = alias
+        self._lock = threading.Lock()
+        self._script = None
+
+    def take(self, keys, capacity, refill):
+        """
+        Take a token from each bucket in keys, or from none if any is empty;
+        (allowed, seconds until all of them have one).
+        """
+        cache = caches[self.alias]
+        if isinstance(cache, RedisCache):
+            return self._take_on_redis(cache, keys, capacity, refill)
+
+        with self._lock:
+            now = time.time()
+            levels = []
+            for key in keys:
+                tokens, at = cache.get(key, (capacity, now))
+                levels.append(min(capacity, tokens + max(0.0, now - at) * refill))
+            allowed = all(tokens >= 1 for tokens in levels)
+            for key, tokens in zip(keys, levels):
+                cache.set(key, (tokens - 1 if allowed else tokens, now), math.ceil(capacity / refill) + 1)
+        return allowed, 0.0 if allowed else max((1 - tokens) / refill for tokens in levels if tokens < 1)
+
+    def _take_on_redis(self, cache, keys, capacity, refill):
+        keys = [cache.make_and_validate_key(key) for key in keys]
+        client = cache._cache.get_client(keys[0], write=True)
+        if self._script is None:
+            self._script = client.register_script(TAKE_TOKEN_SCRIPT)
+        allowed, wait = self._script(keys=keys, args=[capacity, refill], client=client)
+        return bool(allowed), float(wait)
+
+
+token_buckets = TokenBuckets(settings.THROTTLE_CACHE)
+
+
+class ScopedTokenBucketThrottle(BaseThrottle):
+    """Token buckets per view throttle_scope, per IP and per user, spent by unsafe methods."""
+
+    def __init__(self):
+        self._wait = None
+
+    def allow_request(self, request, view):
+        scope = getattr(view, 'throttle_scope', None)
+        if scope is None or request.method in SAFE_METHODS:
+            return True
+        rate = parse_rate(api_settings.DEFAULT_THROTTLE_RATES.get(scope))
+        if rate is None:
+            return True
+
+        clients = [f'ip:{self.get_ident(request)}']
+        user = request.user
+        if user and user.is_authenticated:
+            clients.insert(0, f'user:{user.pk}')
+        allowed, wait = token_buckets.take([f'throttle:{scope}:{client}' for client in clients], *rate)
+        if not allowed:
+            self._wait = wait
+            logger.warning("Throttled %s %s for %s", request.method, scope, ' and '.join(clients))
+        return allowed
+
+    def wait(self):
+        return self._wait
+
+
+class LoadSheddingMiddleware:
+    """
+    Refuses throttled writes with a 503 while more than MAX_IN_FLIGHT
+    requests are being served by this process. Put it right after
+    RequestMetricsMiddleware, so shed requests are still counted.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.in_flight = 0
+        self._lock = threading.Lock()
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+            self.process_view = self._aprocess_view
+        else:
+            self.process_view = self._process_view
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        with self._lock:
+            self.in_flight += 1
+        try:
+            return self.get_response(request)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    async def __acall__(self, request):
+        with self._lock:
+            self.in_flight += 1
+        try:
+            return await self.get_response(request)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def _process_view(self, request, view_func, view_args, view_kwargs):
+        max_in_flight = settings.LOAD_SHEDDING['MAX_IN_FLIGHT']
+        if not max_in_flight or self.in_flight <= max_in_flight or request.method in SAFE_METHODS:
+            return None
+        scope = getattr(getattr(view_func, 'cls', None), 'throttle_scope', None)
+        if scope is None:
+            return None
+        logger.warning("Shed %s %s with %s requests in flight", request.method, scope, self.in_flight)
+        response = JsonResponse({"error": "Server is busy, please retry shortly."}, status=503)
+        response['Retry-After'] = str(settings.LOAD_SHEDDING['RETRY_AFTER'])
+        return response
+
+    async def _aprocess_view(self, request, view_func, view_args, view_kwargs):
+        return self._process_view(request, view_func, view_args, view_kwargs)
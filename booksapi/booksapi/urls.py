@@ -16,9 +16,11 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path,include
+from .instrumentation import metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/',include('authentication.urls')),
-    path('api/',include('books_manage.urls'))
+    path('api/',include('books_manage.urls')),
+    path('metrics', metrics_view, name='metrics'),
 ]
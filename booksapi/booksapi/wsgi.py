@@ -14,3 +14,10 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'booksapi.settings')
 
 application = get_wsgi_application()
+
+# Load the typeahead index now rather than on the first keystroke.
+from django.conf import settings  # noqa: E402
+from books_manage.typeahead import typeahead_index  # noqa: E402
+
+if settings.TYPEAHEAD['WARM_ON_STARTUP']:
+    typeahead_index.warm()